@@ -0,0 +1,94 @@
+"""Propagator benchmarks in asv style: every class is a suite, `setup(param)` prepares state, `time_*` methods are
+measured for every value of `params`. All of them use the frozen TLE catalog from fixtures and fixed dates, so the
+results do not depend on the current date and nothing is downloaded.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from ground_station.propagator.batch_propagate import get_sessions_for_sats
+from ground_station.propagator.context import PropagationContext, set_context
+from ground_station.propagator.propagate import (SatellitePath, angle_points_for_linspace_time,
+                                                 get_sat_from_local_tle_file, get_sessions_for_sat)
+from ground_station.propagator.tle_catalog import TLECatalog
+
+
+FIXTURES_DIR: str = os.path.join(os.path.dirname(__file__), 'fixtures')
+CATALOG_PATH: str = os.path.join(FIXTURES_DIR, 'catalog_tle.txt')
+# epochs of the fixture catalog are 2022-12-16..19
+START: datetime = datetime(2022, 12, 20, tzinfo=timezone.utc)
+SAT_NAME: str = 'BENCH-000'
+BATCH_SIZE: int = 50
+
+
+def use_fixture_context() -> PropagationContext:
+    context: PropagationContext = PropagationContext(tle_path=CATALOG_PATH)
+    context.catalog.snapshot_path = os.path.join(tempfile.gettempdir(), 'benchmark_catalog_tle.txt.snapshot')
+    set_context(context.warm_up())
+    return context
+
+
+class CatalogSuite:
+    def setup(self) -> None:
+        self.context: PropagationContext = use_fixture_context()
+        self.snapshot_path: str = self.context.catalog.snapshot_path
+        self.norad_id: int = self.context.catalog.records()[-1].norad_id
+
+    def time_parse(self) -> None:
+        TLECatalog(CATALOG_PATH, snapshot_path=self.snapshot_path).reload(force=True)
+
+    def time_snapshot_load(self) -> None:
+        TLECatalog(CATALOG_PATH, snapshot_path=self.snapshot_path).reload()
+
+    def time_lookup_by_name(self) -> None:
+        get_sat_from_local_tle_file(SAT_NAME)
+
+    def time_lookup_by_norad_id(self) -> None:
+        self.context.catalog.get_by_norad_id(self.norad_id)
+
+
+class PassPredictionSuite:
+    params: list[int] = [1, 7, 30]
+    param_names: list[str] = ['days']
+
+    def setup(self, days: int) -> None:
+        self.context: PropagationContext = use_fixture_context()
+        self.names: list[str] = [record.name for record in self.context.catalog.records()[:BATCH_SIZE]]
+        self.t_1: str = START.date().isoformat()
+        self.t_2: str = (START + timedelta(days=days)).date().isoformat()
+
+    def time_single_satellite(self, _days: int) -> None:
+        get_sessions_for_sat(SAT_NAME, self.context.observers, self.t_1, self.t_2, use_cache=False)
+
+    def time_batch(self, _days: int) -> None:
+        get_sessions_for_sats(self.names, self.context.observers, self.t_1, self.t_2)
+
+
+class PathSuite:
+    params: list[float] = [1, 3.3333, 10]
+    param_names: list[str] = ['sampling_rate']
+
+    def setup(self, _sampling_rate: float) -> None:
+        use_fixture_context()
+        self.t_1: datetime = START + timedelta(hours=1)
+        self.t_2: datetime = self.t_1 + timedelta(minutes=15)
+
+    def time_angle_points(self, sampling_rate: float) -> None:
+        angle_points_for_linspace_time(SAT_NAME, 'NSU', self.t_1, self.t_2, sampling_rate)
+
+
+class SerializationSuite:
+    def setup(self) -> None:
+        use_fixture_context()
+        self.path: SatellitePath = angle_points_for_linspace_time(SAT_NAME, 'NSU', START, START + timedelta(minutes=15))
+        self.blob: bytes = self.path.to_bytes()
+
+    def time_to_bytes(self) -> None:
+        self.path.to_bytes()
+
+    def time_from_bytes(self) -> None:
+        SatellitePath.from_bytes(self.blob)
+
+    def time_to_dict(self) -> None:
+        self.path.to_dict()
@@ -0,0 +1,44 @@
+"""RADANT rotator protocol parser benchmarks over the recorded session stream of the regression corpus and round trips
+through the controller simulator."""
+from __future__ import annotations
+
+import os
+import serial
+from ground_station.hardware.rotator.radant_parser import RadantParser
+from ground_station.hardware.rotator.simulator import RadantSimulator
+
+
+CORPUS_DIR: str = os.path.join(os.path.dirname(__file__), 'fixtures', 'radant')
+REPEATS: int = 200
+
+
+class RadantParserSuite:
+    params: list[int] = [1, 64, 4096]
+    param_names: list[str] = ['chunk_size']  # bytes per port read
+
+    def setup(self, chunk_size: int) -> None:
+        with open(os.path.join(CORPUS_DIR, 'session.bin'), 'rb') as stream_file:
+            stream: bytes = stream_file.read() * REPEATS
+        self.chunks: list[bytes] = [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+    def time_parse_session(self, _chunk_size: int) -> None:
+        parser: RadantParser = RadantParser()
+        for chunk in self.chunks:
+            parser.feed(chunk)
+
+
+class RotatorSimulatorSuite:
+    def setup(self) -> None:
+        self.simulator: RadantSimulator = RadantSimulator(tick=0.001)
+        rx_port, tx_port = self.simulator.start()
+        self.reciever: serial.Serial = serial.Serial(rx_port, 115200, timeout=2)
+        self.transmitter: serial.Serial = serial.Serial(tx_port, 115200, write_timeout=2)
+
+    def teardown(self) -> None:
+        self.reciever.close()
+        self.transmitter.close()
+        self.simulator.stop()
+
+    def time_position_round_trip(self) -> None:
+        self.transmitter.write(b'Y\r')
+        self.reciever.read_until(b'\r')
@@ -0,0 +1,149 @@
+"""Run benchmark suites, save results and compare them with the previous run of the same machine.
+
+    python -m benchmarks.run                       # run everything, save results to benchmarks/results
+    python -m benchmarks.run -k PassPrediction     # only benchmarks which names contain the substring
+    python -m benchmarks.run --no-save --fail      # CI style: exit with code 1 on regression
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import glob
+import importlib
+import inspect
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+from typing import Any, Callable
+import numpy as np
+import skyfield
+
+
+BENCHMARK_MODULES: tuple[str, ...] = ('benchmarks.propagator', 'benchmarks.scheduler', 'benchmarks.rotator')
+RESULTS_DIR: str = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def discover(name_filter: str = '') -> list[tuple[str, type, str, Any]]:
+    """Returns (benchmark name, suite class, method name, parameter) for every benchmark."""
+    benchmarks: list[tuple[str, type, str, Any]] = []
+    for module_name in BENCHMARK_MODULES:
+        module = importlib.import_module(module_name)
+        for class_name, suite in inspect.getmembers(module, inspect.isclass):
+            if suite.__module__ != module_name:
+                continue
+            methods: list[str] = [name for name in dir(suite) if name.startswith('time_')]
+            for param in getattr(suite, 'params', [None]):
+                for method in methods:
+                    name: str = f'{module_name.split(".")[-1]}.{class_name}.{method}'
+                    if param is not None:
+                        name += f'({param})'
+                    if name_filter in name:
+                        benchmarks.append((name, suite, method, param))
+    return benchmarks
+
+
+def measure(function: Callable[[], Any], repeat: int, min_time: float) -> dict[str, float]:
+    """Number of calls per sample is chosen so that sample lasts at least `min_time` seconds."""
+    timer: timeit.Timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    number = max(int(np.ceil(number * min_time / 0.2)), 1)
+    samples: list[float] = [sample / number for sample in timer.repeat(repeat=repeat, number=number)]
+    return {'median': statistics.median(samples), 'min': min(samples), 'number': number, 'repeat': repeat}
+
+
+def run(benchmarks: list[tuple[str, type, str, Any]], repeat: int, min_time: float) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    for name, suite, method, param in benchmarks:
+        args: tuple = () if param is None else (param,)
+        with contextlib.redirect_stdout(io.StringIO()):  # propagator prints a lot
+            instance = suite()
+            if hasattr(instance, 'setup'):
+                instance.setup(*args)
+            try:
+                bound: Callable = getattr(instance, method)
+                results[name] = measure(lambda: bound(*args), repeat, min_time)  # pylint: disable=cell-var-from-loop
+            finally:
+                if hasattr(instance, 'teardown'):
+                    instance.teardown(*args)
+        print(f'{name:60s} {format_time(results[name]["median"])}')
+    return results
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:8.2f} {unit}'
+    return f'{seconds / 1e-9:8.2f} ns'
+
+
+def previous_results(machine: str) -> dict[str, Any] | None:
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')), reverse=True):
+        with open(path, 'r', encoding='utf-8') as results_file:
+            saved: dict[str, Any] = json.load(results_file)
+        if saved.get('machine') == machine:
+            return saved
+    return None
+
+
+def compare(results: dict[str, dict[str, float]], previous: dict[str, Any], threshold: float) -> list[str]:
+    """Print ratio to previous medians. Returns names of benchmarks which are slower more than `threshold` times."""
+    print(f'\nComparison with {previous["commit"]} ({previous["date"]}):')
+    regressions: list[str] = []
+    for name, result in results.items():
+        old: dict[str, float] | None = previous['results'].get(name)
+        if old is None:
+            continue
+        ratio: float = result['median'] / old['median']
+        mark: str = ''
+        if ratio > threshold:
+            mark = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            mark = 'improved'
+        print(f'{name:60s} {format_time(old["median"])} -> {format_time(result["median"])} {ratio:6.2f}x {mark}')
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Propagator benchmarks')
+    parser.add_argument('-k', dest='name_filter', default='', help='run only benchmarks containing this substring')
+    parser.add_argument('--repeat', type=int, default=5, help='samples per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimal duration of one sample, sec')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio treated as regression')
+    parser.add_argument('--no-save', action='store_true', help='do not save results')
+    parser.add_argument('--fail', action='store_true', help='exit with code 1 when there are regressions')
+    args = parser.parse_args()
+
+    machine: str = platform.node()
+    previous: dict[str, Any] | None = previous_results(machine)
+    results: dict[str, dict[str, float]] = run(discover(args.name_filter), args.repeat, args.min_time)
+    commit: str = git_commit()
+    date: str = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    regressions: list[str] = compare(results, previous, args.threshold) if previous is not None else []
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path: str = os.path.join(RESULTS_DIR, f'{date}-{commit}.json')
+        with open(path, 'w', encoding='utf-8') as results_file:
+            json.dump({'commit': commit, 'date': date, 'machine': machine, 'cpu_count': os.cpu_count(),
+                       'python': platform.python_version(), 'numpy': np.__version__,
+                       'skyfield': skyfield.__version__, 'results': results}, results_file, indent=2)
+        print(f'\nResults are saved to {path}')
+    return 1 if args.fail and regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Session scheduler benchmarks over 10k candidate passes of the frozen catalog with random priorities."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import numpy as np
+from benchmarks.propagator import START, use_fixture_context
+from ground_station.propagator.batch_propagate import get_sessions_for_sats
+from ground_station.scheduler import Booking, SessionScheduler
+
+
+CANDIDATES: int = 10000
+QUERIES: int = 1000
+
+
+def candidate_passes(count: int = CANDIDATES, seed: int = 0) -> list[Booking]:
+    """Every pass of the fixture catalog is a request of the whole pass with random priority 0..9."""
+    context = use_fixture_context()
+    names: list[str] = [record.name for record in context.catalog.records()]
+    rng: np.random.Generator = np.random.default_rng(seed)
+    requests: list[Booking] = []
+    days: int = 0
+    while len(requests) < count:
+        t_1: datetime = START + timedelta(days=days)
+        sessions = get_sessions_for_sats(names, context.observers, t_1.date(), (t_1 + timedelta(days=1)).date())
+        for name, sat_sessions in sessions.items():
+            for session in sat_sessions:
+                start: float = datetime.fromisoformat(session['start_time']).timestamp()
+                requests.append(Booking(f'{name}-{len(requests)}', session['station'], start,
+                                        start + session['duration_sec'], int(rng.integers(10))))
+        days += 1
+    return requests[:count]
+
+
+class SchedulerSuite:
+    def setup(self) -> None:
+        self.requests: list[Booking] = candidate_passes()
+        self.scheduler: SessionScheduler = SessionScheduler(gap_sec=30)
+        self.scheduler.replan(self.requests)
+        rng: np.random.Generator = np.random.default_rng(1)
+        self.queries: list[Booking] = [self.requests[i] for i in rng.integers(len(self.requests), size=QUERIES)]
+
+    def time_book_in_arrival_order(self) -> None:
+        scheduler: SessionScheduler = SessionScheduler(gap_sec=30)
+        for request in self.requests:
+            scheduler.book(request)
+
+    def time_replan(self) -> None:
+        SessionScheduler(gap_sec=30).replan(self.requests)
+
+    def time_conflict_queries(self) -> None:
+        for request in self.queries:
+            self.scheduler.conflicts(request.station, request.start, request.finish)
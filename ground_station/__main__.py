@@ -2,6 +2,7 @@ from ground_station.main import app
 argv = [
     'worker',
     '--loglevel=INFO',
-    '--hostname=NSU'
+    '--hostname=NSU',
+    '--queues=celery,booking'  # the prefork pool books sessions in free processes while a pass is running
 ]
 app.worker_main(argv)
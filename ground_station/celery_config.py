@@ -16,4 +16,7 @@ task_track_started = True
 # task_ignore_result = True\
 visibility_timeout = 60000000
 result_backend_transport_options = broker_transport_options = { 'visibility_timeout': 60000000 }
-# timezone = 'Asia/Novosibirsk'
\ No newline at end of file
+# timezone = 'Asia/Novosibirsk'
+# bookings are kept in Redis, any worker serves them, the station worker runs passes one by one
+task_routes = {'ground_station.celery_tasks.book_session': {'queue': 'booking'},
+               'ground_station.celery_tasks.cancel_session': {'queue': 'booking'}}
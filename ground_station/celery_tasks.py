@@ -1,24 +1,56 @@
 from __future__ import annotations
 
+import base64
 from io import StringIO
+import json
 import os
 from threading import Thread
 from tempfile import NamedTemporaryFile
 from datetime import datetime, timezone
 import time
+from typing import Callable
+from uuid import UUID
 from pylint.lint import Run
 from pylint.reporters.text import TextReporter
 from celery.exceptions import SoftTimeLimitExceeded
 # from celery.signals import task_prerun, task_postrun
 from ground_station.main import app
 from ground_station.hardware.naku_device_api import NAKU, session_routine
-from ground_station.models.db import ResultSessionModel, UserScriptModel, SessionModel
+from ground_station.hardware.station_lock import StationLock
+from ground_station.hardware.radio.doppler import DopplerWorker, retune_table
+from ground_station.models.db import ResultSessionModel, RotatorTelemetryModel, UserScriptModel, SessionModel
 
+from ground_station.propagator.ground_track import ground_tracks
 from ground_station.propagator.propagate import SatellitePath, angle_points_for_linspace_time, TestSatellitePath
+from ground_station.propagator.trajectory_store import get_trajectory_store
+from ground_station.scheduler import Booking, RedisSessionScheduler, get_session_scheduler, session_parts
 from ground_station.scripts_store import UserStore, script_store
 from ground_station.web_secket_client import WebSocketClient
 
 
+def session_scheduler() -> RedisSessionScheduler:
+    """Timetable in the Redis of the broker, shared by the booking worker and the station worker."""
+    return get_session_scheduler(app.conf.broker_url)
+
+
+def run_booked_session(worker: Callable[..., None], **kwargs) -> None:
+    """Run the session worker when the session is booked and the station is free. NAKU is a single device, so the
+    session which overlaps the running one in any worker process is rejected instead of sharing the hardware."""
+    session: SessionModel = SessionModel.parse_obj(kwargs)
+    if session_scheduler().booked_part(session.time_range_id, session.start.timestamp(),
+                                       session.finish.timestamp()) is None:
+        print(f'Session {session.time_range_id} is not booked, reject it')
+        return
+    station_lock: StationLock = StationLock(session.station)
+    if not station_lock.acquire():
+        print(f'Station {session.station} is busy with another session, reject session {session.time_range_id}')
+        return
+    try:
+        worker(**kwargs)
+    finally:
+        station_lock.release()
+
+
 @app.task
 def connect_naku():
     return NAKU().connect_default()
@@ -76,8 +108,53 @@ def calculate_angles(sat: str, t_1: str, t_2: str):
     print(path.to_dict())
     return path.to_dict()
 
+@app.task
+def calculate_path(sat: str, t_1: str, t_2: str) -> str:
+    """Returns the whole path as base64 string of SatellitePath.to_bytes() blob.
+    Restore it with SatellitePath.from_bytes(base64.b64decode(result))."""
+    path: SatellitePath = angle_points_for_linspace_time(sat, 'NSU', datetime.fromisoformat(t_1.replace('Z', '+00:00')),
+                                                         datetime.fromisoformat(t_2.replace('Z', '+00:00')))
+    return base64.b64encode(path.to_bytes()).decode('ascii')
+
+@app.task
+def calculate_ground_tracks(names: list[str], t_1: str, t_2: str, points: int = 500, footprint_points: int = 1,
+                            footprint_vertices: int = 36) -> str:
+    """Returns sub-satellite tracks and footprints as base64 string of GroundTracks.to_bytes() blob.
+    Restore it with GroundTracks.from_bytes(base64.b64decode(result))."""
+    tracks = ground_tracks(names, datetime.fromisoformat(t_1.replace('Z', '+00:00')).timestamp(),
+                           datetime.fromisoformat(t_2.replace('Z', '+00:00')).timestamp(), points,
+                           footprint_points, footprint_vertices)
+    return base64.b64encode(tracks.to_bytes()).decode('ascii')
+
+@app.task
+def precompute_trajectories(sessions: list[dict], local_tle: bool = True) -> int:
+    """Store paths of accepted sessions ahead of time, call it on every schedule or TLE update.
+    Paths of finished sessions are removed. Returns the number of sessions which failed."""
+    store = get_trajectory_store()
+    store.prune()
+    return store.refresh([SessionModel.parse_obj(session) for session in sessions], local_tle)
+
+@app.task
+def book_session(session: dict, allow_split: bool = True) -> dict[str, list]:
+    """Book the session request in the station timetable before it is enqueued. It is routed to the 'booking'
+    queue, so it does not wait behind a running pass on the station worker.
+    Returns session parts to enqueue as radio_task, empty when the request is rejected, and time_range_id of
+    less important requests which were preempted and have to be revoked."""
+    session_model: SessionModel = SessionModel.parse_obj(session)
+    result = session_scheduler().book(Booking.from_session(session_model), allow_split)
+    return {'sessions': [json.loads(part.json()) for part in session_parts(session_model, result.booked)],
+            'preempted': sorted({str(booking.key) for booking in result.preempted})}
+
+@app.task
+def cancel_session(time_range_id: str) -> int:
+    """Free the time of the session request. Returns the number of removed parts."""
+    return len(session_scheduler().cancel(UUID(time_range_id)))
+
 @app.task
 def radio_task(**kwargs) -> None:
+    run_booked_session(radio_session, **kwargs)
+
+def radio_session(**kwargs) -> None:
     session: SessionModel = SessionModel.parse_obj(kwargs)
     session.start = session.start.astimezone(timezone.utc)
     session.finish = session.finish.astimezone(timezone.utc)
@@ -90,6 +167,7 @@ def radio_task(**kwargs) -> None:
     ws_client: WebSocketClient = WebSocketClient(session.user_id)
     ws_client.send(f'start session with {session.sat_name}')
     NAKU().connect_default()
+    NAKU().rotator.telemetry.clear_session()  # no statistics of the previous pass in this result
     NAKU().radio.onReceive(ws_client.send)
     NAKU().radio.onTrancieve(ws_client.send)
     test_flag = kwargs.get('test', None)
@@ -101,6 +179,12 @@ def radio_task(**kwargs) -> None:
         print('Run TEST session')
     rotator_thread: Thread = Thread(name='rotator_thread', target=rotator_callback, kwargs=kwargs, daemon=True)
     rotator_thread.start()
+    doppler: DopplerWorker | None = None
+    doppler_path: SatellitePath | None = get_trajectory_store().load_for_session(session) if test_flag is None else None
+    if doppler_path is not None:
+        doppler = DopplerWorker(NAKU().radio, retune_table(doppler_path, NAKU().radio.freq), NAKU().radio.freq).start()
+    else:
+        print('Run session without Doppler correction')
     # if test_flag is not None:
     #     time.sleep(60)
     try:
@@ -120,6 +204,9 @@ def radio_task(**kwargs) -> None:
     except SoftTimeLimitExceeded as exc:
         print(exc)
     ws_client.send('time is over')
+    if doppler is not None:
+        doppler.stop()
+        print(f'Doppler retunes: {doppler.retunes}, max lateness: {doppler.max_lateness:.3f} sec')
     NAKU().disconnect()
     if rotator_thread.is_alive():
         print('rotator thread still alive!')
@@ -136,6 +223,9 @@ def radio_task(**kwargs) -> None:
                                         registration_time=session.registration_time, start_time=session.start,
                                         priority=session.priority, duration_sec=session.duration_sec, status='SUCCESS')
     session_result.result = NAKU().radio.get_rx_buffer()
+    # None when the rotator thread did not start tracking, e.g. the session was aborted before the pass
+    rotator_summary: dict | None = NAKU().rotator.telemetry.finish_session()
+    session_result.rotator = RotatorTelemetryModel.parse_obj(rotator_summary) if rotator_summary is not None else None
     UserStore('10.6.1.74', 'root', 'rootpassword').save_session_result(session_result)
     print('result saved in database')
     NAKU().radio.clear_rx_buffer()
@@ -153,20 +243,31 @@ def rotator_worker(**kwargs):
     session = SessionModel.parse_obj(kwargs)
     print(f'{session.start=}, {session.finish=}')
     try:
-        path_points: SatellitePath = angle_points_for_linspace_time(session.sat_name, session.station,
-                                                                    session.start, session.finish)
+        # precomputed path is mapped from disk, so tracking starts without TLE request and propagation
+        path_points: SatellitePath | None = get_trajectory_store().load_for_session(session)
+        if path_points is None:
+            print('There is no precomputed trajectory, propagate it now')
+            path_points = angle_points_for_linspace_time(session.sat_name, session.station,
+                                                         session.start, session.finish)
         session_routine(path_points)
     except SoftTimeLimitExceeded as exc:
         print(exc)
 
 @app.task
 def rotator_task_emulation(**kwargs) -> None:
-    rotator_worker_test(**kwargs)
+    station_lock: StationLock = StationLock(kwargs.get('station', 'NSU'))
+    if not station_lock.acquire():
+        print('Station is busy with another session, reject rotator emulation')
+        return
+    try:
+        rotator_worker_test(**kwargs)
+    finally:
+        station_lock.release()
 
 
 @app.task
 def rotator_task(**kwargs) -> None:
-    rotator_worker(**kwargs)
+    run_booked_session(rotator_worker, **kwargs)
 
 # @task_prerun.connect(sender=radio_task)
 # def task_prerun_notifier(**kwargs):
@@ -1,10 +1,11 @@
 from __future__ import annotations
 import time
 from datetime import datetime # , timedelta
-from pytz import utc
 from serial.serialutil import SerialException
 from ground_station.hardware.radio.radio_controller import RadioController
 from ground_station.hardware.rotator.rotator_driver import RotatorDriver
+from ground_station.hardware.rotator.rotator_planner import RotatorPlan, axis_ranges_known, plan_rotator_path
+from ground_station.hardware.rotator.tracking import TrackingLoop
 from ground_station.hardware.serial_utils import convert_to_port, get_available_ports
 from ground_station.propagator.propagate import SatellitePath
 
@@ -73,65 +74,47 @@ class NAKU(metaclass=Singleton):
             print('NAKU disconnected')
 
 
-def session_routine(path_points: SatellitePath) -> None:
+def plan_session_path(path_points: SatellitePath, timeout: float = 3.0) -> SatellitePath:
+    """Rotator command trajectory of the pass. Axis parameters are requested when they have not been received yet,
+    e.g. right after connection. Without them the satellite path is tracked as is."""
+    rotator: RotatorDriver = NAKU().rotator
+    if not axis_ranges_known(rotator.rotator_model):
+        rotator.queue_request_condition()
+        deadline: float = time.monotonic() + timeout
+        while not axis_ranges_known(rotator.rotator_model) and time.monotonic() < deadline:
+            time.sleep(0.1)
+    try:
+        plan: RotatorPlan = plan_rotator_path(path_points, rotator.rotator_model)
+    except ValueError as err:
+        print(f'WARNING: rotator path is not planned, satellite path is tracked without limits check: {err}')
+        return path_points
+    print(f'Rotator plan mode: {plan.mode}, slew: {plan.slew_deg:.1f} deg, clipped points: {plan.clipped_points}')
+    return plan.path
+
+
+def session_routine(path_points: SatellitePath) -> TrackingLoop:
     print(f'Start rotator session routine:\n{path_points.__repr__}')
+    path_points = plan_session_path(path_points)
     normal_speed: int = 4
     fast_speed: int = 6
-    az_step: float = 0.15
-    az_trim_angle: float = az_step * path_points.az_rotation_direction
     NAKU().rotator.set_speed(fast_speed, fast_speed)
     # prepare rotator position
     NAKU().rotator.set_angle(path_points.azimuth[0], path_points.altitude[0])
-    if path_points.azimuth[-1] > 360:
-        NAKU().rotator.set_boundary_maximum_angle('1', path_points.azimuth[-1] + 1)
-    elif path_points.azimuth[-1] < 0:
-        NAKU().rotator.set_boundary_minimum_angle('1', path_points.azimuth[-1] - 1)
+    tracking: TrackingLoop = TrackingLoop(NAKU().rotator, path_points)
 
-    if path_points.t_points[0].tzinfo is None:
-        path_points.t_points = [t.astimezone(utc) for t in path_points.t_points]
-
-    while datetime.now().astimezone(utc) < path_points.t_points[0]:  # waiting for start session
-        time.sleep(1)
-        print(f'start time wating: {(path_points.t_points[0] - datetime.now().astimezone(utc)).seconds}')
+    start: float = time.monotonic() + path_points.t[0] - time.time()
+    while time.monotonic() < start:  # waiting for start session
+        print(f'start time wating: {start - time.monotonic():.0f}')
+        time.sleep(min(1.0, max(start - time.monotonic(), 0.0)))
     while NAKU().rotator.rotator_model.azimuth.speed is None:
         NAKU().rotator.set_speed(normal_speed, normal_speed)
         time.sleep(0.2)
     print('start rotator session routine')
-    point_count = len(path_points.t_points)
-    for i, (altitude, azimuth, time_point) in enumerate(path_points):
-        print(f'next point: ({azimuth:.2f}, {altitude:.2f})\tstep {i}/{point_count}')
-        i+=1
-        # if NAKU().rotator.rotator_model.azimuth.speed > normal_speed:
-        #     NAKU().rotator.set_speed(normal_speed, normal_speed)
-            # Unsupported operand types for > ("datetime" and "timedelta")
-        if abs(datetime.now().astimezone(utc) - time_point.astimezone(utc)).seconds > 1.5:
-            print(f'skip point: {datetime.now().astimezone(utc), time_point}')
-            continue
-        if datetime.now().astimezone(utc) < time_point:
-            while datetime.now().astimezone(utc) < time_point:  # waiting for next point
-                time.sleep(0.01)
-        NAKU().rotator.set_angle(azimuth + az_trim_angle, altitude)
-
-        current_pos = NAKU().rotator.current_position
-        if current_pos is not None:
-            az_diff: float = current_pos[0] - azimuth
-            el_diff: float = current_pos[1] - altitude
-            # if abs(az_diff) > 3:
-            #     NAKU().rotator.set_speed(fast_speed, fast_speed)
-            # elif abs(az_diff) < 2:
-            #     NAKU().rotator.set_speed(normal_speed, normal_speed)
-            if 0 < az_diff < 1:
-                az_step = 0.15
-            elif 0 < az_diff < 2:
-                az_step = 1
-            elif 0 < az_diff < 3:
-                az_step = 2
-            elif 0 > az_diff > -1:
-                az_step = 0.15
-            elif 0 > az_diff > -2:
-                az_step = 0.05
-            elif 0 > az_diff > -3:
-                az_step = 0.02
-            # print(f'current pos: {device.rotator.current_position} target pos: {azimuth:.2f}, {altitude:.2f}')
-            print(f'Az,El diff: ({az_diff:.2f}, {el_diff:.2f}) '  # type: ignore
-                  f'current pos: ({current_pos[0]:.2f}, {current_pos[1]:.2f})')  # type: ignore
+    NAKU().rotator.telemetry.start_session(path_points.t, path_points.azimuth, path_points.altitude)
+    try:
+        tracking.run()
+    finally:
+        telemetry_summary: dict | None = NAKU().rotator.telemetry.finish_session()
+    print(f'Rotator session finished: {tracking.summary()}')
+    print(f'Rotator telemetry: {telemetry_summary}')
+    return tracking
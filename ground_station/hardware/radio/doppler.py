@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import time
+import numpy as np
+from ground_station.hardware.radio.scheduled_worker import ScheduledWorker
+from ground_station.hardware.radio.sx127x_driver import SX127x_Driver
+from ground_station.propagator.propagate import SatellitePath
+
+
+SPEED_OF_LIGHT_KM_S: float = 299792.458
+# SX127x synthesizer: F = Fxosc * Frf / 2^19
+FXOSC_HZ: float = 32e6
+FREQ_STEP_HZ: float = FXOSC_HZ / 2 ** 19
+# LoRa demodulator tolerates carrier offset up to a quarter of the bandwidth
+LORA_OFFSET_TOLERANCE: float = 0.25
+# moments of retune (POSIX time), frequency in Hz and its synthesizer register value
+RETUNE_DTYPE: np.dtype = np.dtype([('t', 'f8'), ('freq', 'i8'), ('frf', 'i8')])
+
+
+def doppler_frequency(freq_hz: float, dist_rate_km_s: np.ndarray, uplink: bool = False) -> np.ndarray:
+    """Frequency which the station should use: received carrier for downlink, pre-compensated one for uplink,
+    so the satellite receives `freq_hz`."""
+    beta: np.ndarray = np.asarray(dist_rate_km_s) / SPEED_OF_LIGHT_KM_S
+    return freq_hz * (1 + beta) if uplink else freq_hz * (1 - beta)
+
+
+def frequency_to_frf(freq_hz: np.ndarray | float) -> np.ndarray:
+    return np.round(np.asarray(freq_hz) / FREQ_STEP_HZ).astype(np.int64)
+
+
+def retune_table(path: SatellitePath, freq_hz: float, threshold_hz: float = 500.0,
+                 uplink: bool = False) -> np.ndarray:
+    """Retune schedule of the pass. Corrected frequency is quantized by `threshold_hz` levels, a retune is emitted
+    only when the level changes, so residual offset stays within threshold / 2 plus one synthesizer step and
+    the radio is retuned about (total Doppler swing / threshold) times per pass.
+
+    Args:
+        path (SatellitePath): path of the pass with distance rate.
+        freq_hz (float): nominal frequency of the satellite.
+        threshold_hz (float, optional): retune step. Defaults to 500.0.
+        uplink (bool, optional): pre-compensate transmission instead of reception. Defaults to False.
+
+    Returns:
+        np.ndarray: RETUNE_DTYPE rows in time order, the first row is the frequency for the start of the pass.
+    """
+    if threshold_hz < FREQ_STEP_HZ:
+        raise ValueError(f'Retune threshold must not be less than synthesizer step {FREQ_STEP_HZ:.1f} Hz')
+    if len(path) == 0:
+        return np.zeros(0, dtype=RETUNE_DTYPE)
+    levels: np.ndarray = np.round((doppler_frequency(freq_hz, path.dist_rate, uplink) - freq_hz) / threshold_hz)
+    changes: np.ndarray = np.concatenate(([0], np.flatnonzero(np.diff(levels)) + 1))
+    table: np.ndarray = np.zeros(len(changes), dtype=RETUNE_DTYPE)
+    table['t'] = path.t[changes]
+    table['frf'] = frequency_to_frf(freq_hz + levels[changes] * threshold_hz)
+    table['freq'] = np.round(table['frf'] * FREQ_STEP_HZ)
+    table = table[np.concatenate(([True], np.diff(table['frf']) != 0))]
+    return table
+
+
+def tuned_frequency(table: np.ndarray, t: np.ndarray, freq_hz: float) -> np.ndarray:
+    """Frequency of the radio at POSIX times `t` when it follows the table, `freq_hz` before the first retune."""
+    index: np.ndarray = np.searchsorted(table['t'], t, side='right') - 1
+    return np.where(index >= 0, table['freq'][np.maximum(index, 0)], freq_hz) if len(table) \
+        else np.full(np.shape(t), float(freq_hz))
+
+
+def doppler_metrics(path: SatellitePath, table: np.ndarray, freq_hz: float, bandwidth_hz: float,
+                    packet_interval: float) -> dict[str, float | int]:
+    """Offline comparison of reception with and without correction. Packets are sent every `packet_interval`
+    seconds of the path, a packet is received when the carrier offset is within LoRa tolerance.
+
+    Returns:
+        dict[str, float | int]: packet counts, max residual offsets in Hz and number of retunes.
+    """
+    t_packets: np.ndarray = np.arange(path.t[0], path.t[-1], packet_interval) if len(path) else np.zeros(0)
+    carrier: np.ndarray = doppler_frequency(freq_hz, np.interp(t_packets, path.t, path.dist_rate))
+    uncorrected: np.ndarray = np.abs(carrier - freq_hz)
+    corrected: np.ndarray = np.abs(carrier - tuned_frequency(table, t_packets, freq_hz))
+    tolerance: float = LORA_OFFSET_TOLERANCE * bandwidth_hz
+    return {'packets': len(t_packets),
+            'received_uncorrected': int(np.count_nonzero(uncorrected <= tolerance)),
+            'received_corrected': int(np.count_nonzero(corrected <= tolerance)),
+            'max_offset_uncorrected_hz': float(uncorrected.max(initial=0.0)),
+            'max_offset_corrected_hz': float(corrected.max(initial=0.0)),
+            'retunes': len(table)}
+
+
+class DopplerWorker(ScheduledWorker):
+    """Retunes the radio by the table at the right moments and restores nominal frequency at the end.
+    Every retune is a single write of changed frequency register bytes, nothing is read back.
+    """
+    thread_name: str = 'doppler thread'
+
+    def __init__(self, radio: SX127x_Driver, table: np.ndarray, freq_hz: float, lead_time: float = 0.0) -> None:
+        """
+        Args:
+            radio (SX127x_Driver): connected radio.
+            table (np.ndarray): retune_table() result.
+            freq_hz (float): nominal frequency which is restored by stop().
+            lead_time (float, optional): retune this number of seconds earlier, e.g. serial latency. Defaults to 0.0.
+        """
+        super().__init__(radio, table['t'], lead_time)
+        self.table: np.ndarray = table
+        self.freq_hz: float = freq_hz
+        self._frf: int | None = None
+
+    @property
+    def retunes(self) -> int:
+        return self.applied
+
+    def _retune(self, frf: int) -> bool:
+        if frf == self._frf:
+            return False
+        self.radio.set_frf(frf, self._frf)
+        self._frf = frf
+        return True
+
+    def apply(self, index: int) -> bool:
+        return self._retune(int(self.table['frf'][index]))
+
+    def restore(self) -> bool:
+        return self._frf is not None and self._retune(int(frequency_to_frf(self.freq_hz)))
+
+
+if __name__ == '__main__':
+    # packets received with and without Doppler correction for passes of the day
+    # python -m ground_station.hardware.radio.doppler [satellite name] [threshold Hz]
+    import contextlib
+    import io
+    import sys
+    from datetime import date, datetime
+    from ground_station.lora import BANDWIDTH_HZ, lora_airtime
+    from ground_station.propagator.context import get_context
+    from ground_station.propagator.propagate import angle_points_for_linspace_time, get_sessions_for_sat
+
+    sat_name: str = sys.argv[1] if len(sys.argv) > 1 else 'NORBI'
+    threshold: float = float(sys.argv[2]) if len(sys.argv) > 2 else 500.0
+    nominal: float = 436.7e6
+    with contextlib.redirect_stdout(io.StringIO()):
+        sessions = get_sessions_for_sat(sat_name, get_context().observers, date.today(), use_cache=False)
+        paths: list[SatellitePath] = [angle_points_for_linspace_time(sat_name, session['station'],
+                                                                     datetime.fromisoformat(session['start_time']),
+                                                                     datetime.fromisoformat(session['finish_time']))
+                                      for session in sessions]
+    for bandwidth in BANDWIDTH_HZ[:5] + BANDWIDTH_HZ[7:8]:
+        interval: float = lora_airtime(64, 10 if bandwidth > 20e3 else 7, bandwidth).Tpkt / 1000
+        totals: dict[str, float] = {}
+        table_time: float = 0.0
+        for pass_path in paths:
+            start_time: float = time.perf_counter()
+            retunes: np.ndarray = retune_table(pass_path, nominal, threshold)
+            table_time += time.perf_counter() - start_time
+            for name, value in doppler_metrics(pass_path, retunes, nominal, bandwidth, interval).items():
+                totals[name] = max(totals.get(name, 0), value) if name.startswith('max') else \
+                    totals.get(name, 0) + value
+        print(f'BW {bandwidth / 1e3:6.2f} kHz: {totals.get("packets", 0):5.0f} packets, '
+              f'received {totals.get("received_uncorrected", 0):5.0f} without / '
+              f'{totals.get("received_corrected", 0):5.0f} with correction, '
+              f'max offset {totals.get("max_offset_uncorrected_hz", 0):7.0f} / '
+              f'{totals.get("max_offset_corrected_hz", 0):4.0f} Hz, {totals.get("retunes", 0):.0f} retunes, '
+              f'tables in {table_time * 1000:.2f} ms')
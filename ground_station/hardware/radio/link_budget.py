@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import numpy as np
+from ground_station.hardware.radio.radio_controller import RadioController
+from ground_station.hardware.radio.scheduled_worker import ScheduledWorker
+from ground_station.lora import BANDWIDTH_HZ, lora_airtime
+from ground_station.propagator.propagate import SatellitePath
+
+
+# demodulator SNR limits of SX127x by spreading factor, dB
+LORA_SNR_LIMIT_DB: dict[int, float] = {7: -7.5, 8: -10.0, 9: -12.5, 10: -15.0, 11: -17.5, 12: -20.0}
+THERMAL_NOISE_DBM_HZ: float = -174.0
+# mode of a time segment, sf = 0 when there is no link
+LINK_PLAN_DTYPE: np.dtype = np.dtype([('start', 'f8'), ('finish', 'f8'), ('sf', 'i8'), ('bw_hz', 'f8'),
+                                      ('min_snr_db', 'f8'), ('packets', 'i8')])
+MODE_DTYPE: np.dtype = np.dtype([('sf', 'i8'), ('bw_hz', 'f8'), ('required_dbm', 'f8'), ('packet_sec', 'f8')])
+
+
+@dataclass
+class LinkBudget:
+    """Downlink budget: satellite transmitter, free-space loss and station receiver."""
+    freq_hz: float = 436.7e6
+    tx_power_dbm: float = 20.0
+    tx_gain_dbi: float = 0.0
+    rx_gain_dbi: float = 12.0
+    noise_figure_db: float = 6.0
+    losses_db: float = 3.0  # cables, polarization, pointing and atmosphere
+    margin_db: float = 3.0  # required SNR over demodulator limit
+
+    def free_space_loss_db(self, dist_km: np.ndarray) -> np.ndarray:
+        return 20 * np.log10(np.asarray(dist_km)) + 20 * np.log10(self.freq_hz / 1e6) + 32.44
+
+    def received_power_dbm(self, dist_km: np.ndarray) -> np.ndarray:
+        return self.tx_power_dbm + self.tx_gain_dbi + self.rx_gain_dbi - self.losses_db - \
+            self.free_space_loss_db(dist_km)
+
+    def noise_floor_dbm(self, bandwidth_hz: float | np.ndarray) -> np.ndarray:
+        return THERMAL_NOISE_DBM_HZ + 10 * np.log10(bandwidth_hz) + self.noise_figure_db
+
+    def snr_db(self, dist_km: np.ndarray, bandwidth_hz: float) -> np.ndarray:
+        return self.received_power_dbm(dist_km) - self.noise_floor_dbm(bandwidth_hz)
+
+
+def link_modes(budget: LinkBudget, payload_size: int, spread_factors: tuple[int, ...] = (7, 8, 9, 10, 11, 12),
+               bandwidths_hz: tuple[float, ...] = (125e3, 250e3, 500e3), coding_rate: int = 5,
+               packet_gap: float = 0.0) -> np.ndarray:
+    """Useful SF/BW modes sorted by required received power. A mode is dropped when another one needs no more
+    power and sends packets not slower, so the rest are ordered by throughput as well.
+
+    Returns:
+        np.ndarray: MODE_DTYPE rows, the first one is the most robust and the slowest.
+    """
+    modes: np.ndarray = np.array([(sf, bw, LORA_SNR_LIMIT_DB[sf] + budget.noise_floor_dbm(bw) + budget.margin_db,
+                                   lora_airtime(payload_size, sf, bw, coding_rate,
+                                                low_datarate_optimize=True).Tpkt / 1000 + packet_gap)
+                                  for sf in spread_factors for bw in bandwidths_hz], dtype=MODE_DTYPE)
+    modes = modes[np.lexsort((modes['packet_sec'], modes['required_dbm']))]
+    faster: np.ndarray = modes['packet_sec'] < np.minimum.accumulate(np.concatenate(([np.inf],
+                                                                                     modes['packet_sec'][:-1])))
+    return modes[faster]
+
+
+def plan_link(path: SatellitePath, budget: LinkBudget, payload_size: int = 64, segment_sec: float = 30.0,
+              modes: np.ndarray | None = None) -> np.ndarray:
+    """Per-segment SF/BW plan of the pass which maximizes expected bytes. The pass is cut into `segment_sec`
+    blocks, every block gets the fastest mode which has enough margin in the whole block, equal neighbours are
+    merged, so the radio is switched only a few times per pass. Both ends of the link must follow the same plan.
+
+    Args:
+        path (SatellitePath): path of the pass, only time and distance are used.
+        budget (LinkBudget): link budget.
+        payload_size (int, optional): bytes per packet. Defaults to 64.
+        segment_sec (float, optional): shortest time between mode switches. Defaults to 30.0.
+        modes (np.ndarray | None, optional): link_modes() result. Defaults to link_modes(budget, payload_size).
+
+    Returns:
+        np.ndarray: LINK_PLAN_DTYPE rows in time order.
+    """
+    modes = link_modes(budget, payload_size) if modes is None else modes
+    if len(path) == 0:
+        return np.zeros(0, dtype=LINK_PLAN_DTYPE)
+    power: np.ndarray = budget.received_power_dbm(path.dist)
+    feasible: np.ndarray = np.searchsorted(modes['required_dbm'], power, side='right') - 1  # -1 - no link
+    block: np.ndarray = np.floor((path.t - path.t[0]) / segment_sec).astype(np.int64)
+    block_starts: np.ndarray = np.concatenate(([0], np.flatnonzero(np.diff(block)) + 1))
+    block_mode: np.ndarray = np.minimum.reduceat(feasible, block_starts)
+    segment_blocks: np.ndarray = np.concatenate(([0], np.flatnonzero(np.diff(block_mode)) + 1))
+    starts: np.ndarray = block_starts[segment_blocks]
+    mode_index: np.ndarray = block_mode[segment_blocks]
+
+    plan: np.ndarray = np.zeros(len(starts), dtype=LINK_PLAN_DTYPE)
+    plan['start'] = path.t[starts]
+    plan['finish'] = np.concatenate((path.t[starts[1:]], path.t[-1:]))
+    linked: np.ndarray = mode_index >= 0
+    chosen: np.ndarray = modes[mode_index[linked]]
+    plan['sf'][linked] = chosen['sf']
+    plan['bw_hz'][linked] = chosen['bw_hz']
+    plan['packets'][linked] = np.floor((plan['finish'][linked] - plan['start'][linked]) / chosen['packet_sec'])
+    min_power: np.ndarray = np.minimum.reduceat(power, starts)
+    plan['min_snr_db'] = np.where(linked, min_power - budget.noise_floor_dbm(np.where(linked, plan['bw_hz'], 1.0)),
+                                  np.nan)
+    return plan
+
+
+def fixed_mode_packets(path: SatellitePath, budget: LinkBudget, spread_factor: int, bandwidth_hz: float,
+                       payload_size: int = 64, coding_rate: int = 5, packet_gap: float = 0.0) -> int:
+    """Packets of the pass with one mode for the whole session: only the time with enough margin is counted."""
+    if len(path) < 2:
+        return 0
+    required: float = LORA_SNR_LIMIT_DB[spread_factor] + float(budget.noise_floor_dbm(bandwidth_hz)) + \
+        budget.margin_db
+    step: np.ndarray = np.diff(path.t)
+    linked_time: float = float(step[budget.received_power_dbm(path.dist[:-1]) >= required].sum())
+    packet_sec: float = lora_airtime(payload_size, spread_factor, bandwidth_hz, coding_rate,
+                                     low_datarate_optimize=True).Tpkt / 1000 + packet_gap
+    return int(linked_time // packet_sec)
+
+
+class LinkPlanWorker(ScheduledWorker):
+    """Switches spreading factor and bandwidth by the plan, see RadioController.set_modem_config().
+    Segments without link keep the previous mode, the initial mode is restored at the end."""
+    thread_name: str = 'link plan thread'
+
+    def __init__(self, radio: RadioController, plan: np.ndarray, lead_time: float = 0.0) -> None:
+        super().__init__(radio, plan['start'], lead_time)
+        self.radio: RadioController = radio
+        self.plan: np.ndarray = plan
+        self._initial: tuple[int, int] = (radio.spread_factor, radio.bandwidth)
+
+    def _switch(self, spread_factor: int, bandwidth: int) -> bool:
+        if (spread_factor, bandwidth) == (self.radio.spread_factor, self.radio.bandwidth):
+            return False
+        self.radio.set_modem_config(spread_factor, bandwidth)
+        return True
+
+    def apply(self, index: int) -> bool:
+        if self.plan['sf'][index] == 0:
+            return False
+        return self._switch(int(self.plan['sf'][index]) << 4,
+                            BANDWIDTH_HZ.index(float(self.plan['bw_hz'][index])) << 4)
+
+    def restore(self) -> bool:
+        return self._switch(*self._initial)
+
+
+if __name__ == '__main__':
+    # expected data volume of the adaptive plan vs fixed SF10/BW250 for passes of the day
+    # python -m ground_station.hardware.radio.link_budget [satellite name] [payload size]
+    import contextlib
+    import io
+    import sys
+    import time
+    from datetime import date, datetime, timezone
+    from ground_station.propagator.context import get_context
+    from ground_station.propagator.propagate import angle_points_for_linspace_time, get_sessions_for_sat
+
+    sat_name: str = sys.argv[1] if len(sys.argv) > 1 else 'NORBI'
+    payload: int = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    link_budget: LinkBudget = LinkBudget()
+    with contextlib.redirect_stdout(io.StringIO()):
+        sessions = get_sessions_for_sat(sat_name, get_context().observers, date.today(), use_cache=False)
+        paths: list[SatellitePath] = [angle_points_for_linspace_time(sat_name, session['station'],
+                                                                     datetime.fromisoformat(session['start_time']),
+                                                                     datetime.fromisoformat(session['finish_time']))
+                                      for session in sessions]
+    print(link_modes(link_budget, payload))
+    for pass_path in paths:
+        start_time: float = time.perf_counter()
+        link_plan: np.ndarray = plan_link(pass_path, link_budget, payload)
+        plan_time: float = time.perf_counter() - start_time
+        fixed: int = fixed_mode_packets(pass_path, link_budget, 10, 250e3, payload)
+        print(f'{datetime.fromtimestamp(pass_path.t[0], timezone.utc)} min distance {pass_path.dist.min():.0f} km: '
+              f'adaptive {int(link_plan["packets"].sum()) * payload} bytes in {len(link_plan)} segments, '
+              f'SF10/BW250 {fixed * payload} bytes, plan in {plan_time * 1000:.2f} ms')
+        for row in link_plan:
+            print(f'    {row["finish"] - row["start"]:5.0f} sec SF{row["sf"]:<2d} BW {row["bw_hz"] / 1e3:5.0f} kHz '
+                  f'min SNR {row["min_snr_db"]:6.1f} dB, {row["packets"]} packets')
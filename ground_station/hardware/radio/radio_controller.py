@@ -8,6 +8,7 @@ from ast import literal_eval
 
 from pytz import UTC
 from ground_station.hardware.radio.sx127x_driver import SX127x_Driver
+from ground_station.lora import BANDWIDTH_HZ, LoRaTxPacket, lora_airtime
 
 
 @dataclass
@@ -17,12 +18,6 @@ class LoRaRxPacket:
     rssi_pkt: int
     crc_flag: int
 
-@dataclass
-class LoRaTxPacket:
-    Tsym: float
-    Tpkt: float
-    low_datarate_opt_flag: bool
-
 
 class RadioController(SX127x_Driver):
     def __init__(self, api_name='radio', **kwargs) -> None:
@@ -145,20 +140,32 @@ class RadioController(SX127x_Driver):
                 self.set_standby_mode()
             self.set_rx_continuous_mode()
 
+    def set_modem_config(self, spread_factor: int, bandwidth: int) -> None:
+        """Switch spreading factor and bandwidth during the session with a minimal register burst: standby,
+        RegModemConfig1 and RegModemConfig2 in one write, the previous mode. Other fields of these registers are
+        taken from the controller settings, so nothing else is read. Low data rate optimization stays on.
+
+        Args:
+            spread_factor (int): register value, e.g. self.sf.SF9.
+            bandwidth (int): register value, e.g. self.bw.BW125.
+        """
+        with self.interface.lock:
+            op_mode: int = self.interface.read(self.reg.REG_OP_MODE)
+            self.interface.write(self.reg.REG_OP_MODE, [(op_mode & 0xf8) | self.mode.STDBY_MODE])
+            self.interface.write(self.reg.REG_MODEM_CONFIG_1, [bandwidth | self.coding_rate | self.implicit_mode,
+                                                               spread_factor | (self.crc << 2)])
+            self.interface.write(self.reg.REG_OP_MODE, [op_mode])
+        self.spread_factor = spread_factor
+        self.bandwidth = bandwidth
+
     def calculate_packet(self, packet: list[int] | bytes, force_optimization=True) -> LoRaTxPacket:
-        ecr: int = 4 + self.coding_rate // 2
-        if self.implicit_mode:
-            payload_size = self.payload_size
-        else:
-            payload_size: int = len(packet)
-        t_sym: float = 2 ** self.spread_factor / self.bandwidth * 1000
-        optimization_flag: bool = True if force_optimization else t_sym > 16
-        preamble_time: float = (self.preamble_len + 4.25) * t_sym
-        tmp_poly: int = max((8 * payload_size - 4 * self.spread_factor + 28 + 16 - 20 * self.implicit_mode), 0)
-        payload_symbol_nb: float = 8 + (tmp_poly / (4 * (self.spread_factor - 2 * optimization_flag))) * ecr
-        payload_time: float = payload_symbol_nb * t_sym
-        packet_time: float = payload_time + preamble_time
-        return LoRaTxPacket(payload_time, packet_time, optimization_flag)
+        """Time on air of the packet with current settings. Settings are stored as register values, e.g.
+        SF10 is 0xA0 and BW250 is 8 << 4, so they are decoded before calculation."""
+        return lora_airtime(self.payload_size if self.implicit_mode else len(packet),
+                            spread_factor=self.spread_factor >> 4, bandwidth_hz=BANDWIDTH_HZ[self.bandwidth >> 4],
+                            coding_rate=4 + self.coding_rate // 2, preamble_len=self.preamble_len, crc=self.crc,
+                            implicit_mode=self.implicit_mode,
+                            low_datarate_optimize=True if force_optimization else None)
 
     def get_rssi_packet(self) -> int:
         return self.interface.read(self.reg.REG_PKT_RSSI_VALUE) - (164 if self.freq < 0x779E6 else 157)
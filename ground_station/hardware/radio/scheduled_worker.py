@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import threading
+import time
+import numpy as np
+from ground_station.hardware.radio.sx127x_driver import SX127x_Driver
+
+
+class ScheduledWorker(ABC):
+    """Thread which applies rows of a time table to the radio at the right moments and restores the radio settings
+    when it is stopped. Subclasses implement apply() and restore().
+    """
+    thread_name: str = 'scheduled radio thread'
+
+    def __init__(self, radio: SX127x_Driver, t: np.ndarray, lead_time: float = 0.0) -> None:
+        """
+        Args:
+            radio (SX127x_Driver): connected radio.
+            t (np.ndarray): POSIX times of table rows in ascending order.
+            lead_time (float, optional): apply rows this number of seconds earlier, e.g. serial latency.
+            Defaults to 0.0.
+        """
+        self.radio: SX127x_Driver = radio
+        self.t: np.ndarray = t
+        self.lead_time: float = lead_time
+        self.applied: int = 0  # rows which changed radio registers
+        self.max_lateness: float = 0.0  # seconds, how late the worst row was applied
+        self._stop_flag: threading.Event = threading.Event()
+        self._thread: threading.Thread = threading.Thread(name=self.thread_name, target=self._run, daemon=True)
+
+    @abstractmethod
+    def apply(self, index: int) -> bool:
+        """Write row `index` to the radio. Returns False when registers already have these values."""
+
+    @abstractmethod
+    def restore(self) -> bool:
+        """Write settings which were before the first row. Returns False when nothing was written."""
+
+    def start(self) -> ScheduledWorker:
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        # skip rows which are already in the past, the last of them is the current one
+        start: int = max(int(np.searchsorted(self.t, time.time() + self.lead_time, side='right')) - 1, 0)
+        for index in range(start, len(self.t)):
+            t_point: float = float(self.t[index])
+            if self._stop_flag.wait(max(t_point - self.lead_time - time.time(), 0)):
+                return
+            try:
+                self.applied += self.apply(index)
+            except (RuntimeError, TimeoutError) as err:
+                print(f'{self.thread_name} failed: {err}')
+                return
+            if index > start:  # the first row may be in the past when the worker starts
+                self.max_lateness = max(self.max_lateness, time.time() - t_point + self.lead_time)
+
+    def stop(self) -> None:
+        self._stop_flag.set()
+        if self._thread.is_alive():
+            self._thread.join(1)
+        try:
+            self.applied += self.restore()
+        except (RuntimeError, TimeoutError) as err:
+            print(f'{self.thread_name} can not restore radio settings: {err}')
+
+    def __enter__(self) -> ScheduledWorker:
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import threading
 import serial
 from serial import SerialBase
 
@@ -7,13 +8,15 @@ def check_connection(func):
     def _wrapper(*args, **kwargs):
         if not args[0].connection_status:
             raise RuntimeError('Radio is not connected')
-        return func(*args, **kwargs)
+        with args[0].lock:  # request and response must not interleave with other threads, e.g. Doppler retune
+            return func(*args, **kwargs)
     return _wrapper
 
 
 class SerialInterface:
     __interface: SerialBase
     connection_status: bool = False
+    lock: threading.RLock = threading.RLock()
 
     def connect(self, port: str) -> bool:
         if self.connection_status:
@@ -115,6 +115,17 @@ class SX127x_Driver(metaclass = Singleton):
         frf = int((freq_hz / 32000000) * 524288)
         self.interface.write(self.reg.REG_FR_MSB, [frf >> 16, (frf >> 8) & 0xFF, frf & 0xFF])
 
+    def set_frf(self, frf: int, previous_frf: int | None = None) -> None:
+        """Write frequency register value. Only bytes from the first changed one are written, the new frequency
+        is applied by LSB write, so a small retune is a single byte transaction."""
+        new_bytes: list[int] = [frf >> 16, (frf >> 8) & 0xFF, frf & 0xFF]
+        first: int = 0
+        if previous_frf is not None:
+            old_bytes: list[int] = [previous_frf >> 16, (previous_frf >> 8) & 0xFF, previous_frf & 0xFF]
+            while first < 2 and new_bytes[first] == old_bytes[first]:
+                first += 1
+        self.interface.write(self.reg.REG_FR_MSB + first, new_bytes[first:])
+
     def set_fifo_addr_ptr(self, address: int) -> None:
         self.interface.write(self.reg.REG_FIFO_ADDR_PTR, [address])
 
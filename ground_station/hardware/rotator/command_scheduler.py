@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Literal, NamedTuple
+
+
+Lane = Literal['stop', 'setpoint', 'config', 'poll']
+POLL_COMMAND: bytes = b'Y\r'
+STOP_COMMAND: bytes = b'S\r'
+
+
+class Command(NamedTuple):
+    data: bytes
+    lane: Lane
+    queued_at: float  # time.monotonic() of put()
+
+
+def command_lane(data: bytes) -> Lane:
+    """RADANT commands: 'S' stops both axes, 'Q' sets the target angle, 'Y' requests the position,
+    the rest are configuration commands and requests of parameters which must keep their order."""
+    if data.startswith(b'S'):
+        return 'stop'
+    if data.startswith(b'Q'):
+        return 'setpoint'
+    if data == POLL_COMMAND:
+        return 'poll'
+    return 'config'
+
+
+class LatencyStats:
+    """Time from put() of a command to its write to the port, seconds."""
+    def __init__(self, window: int = 1000) -> None:
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.last: float = 0.0
+        self._recent: deque[float] = deque(maxlen=window)
+
+    def add(self, latency: float) -> None:
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+        self.last = latency
+        self._recent.append(latency)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Percentile of the last `window` latencies, q in [0, 100]."""
+        if not self._recent:
+            return 0.0
+        ordered: list[float] = sorted(self._recent)
+        return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+    def to_dict(self) -> dict[str, float]:
+        return {'count': self.count, 'mean': self.mean, 'p95': self.percentile(95), 'max': self.max,
+                'last': self.last}
+
+
+class CommandScheduler:
+    """Replacement of the FIFO TX queue of the rotator with typed lanes:
+    - stop: 'S' is sent before anything else and drops pending setpoints, the rotator must not move after it;
+    - setpoint: only the latest 'Q' is kept, superseded targets are dropped instead of being chased one by one;
+    - config: other commands are sent in order;
+    - poll: 'Y' is sent every `poll_interval` seconds, a queued 'Y' only makes the next poll due now.
+    Commands are sent not more often than every `send_interval` seconds, except of stop. When the link is slower
+    than setpoints come, the setpoint lane yields every other slot to waiting config commands and due polls,
+    so they are not starved.
+
+    Example:
+        scheduler = CommandScheduler()
+        scheduler.put(b'Q10.00 20.00\\r')
+        command = scheduler.get(timeout=0.1)
+        port.write(command.data)
+        scheduler.sent(command)
+    """
+    def __init__(self, send_interval: float = 0.1, poll_interval: float = 0.5) -> None:
+        self.send_interval: float = send_interval
+        self.poll_interval: float = poll_interval
+        self._condition: threading.Condition = threading.Condition()
+        self._stop: Command | None = None
+        self._setpoint: Command | None = None
+        self._config: deque[Command] = deque()
+        self._next_poll: float = time.monotonic()
+        self._last_sent: float = float('-inf')
+        self._last_lane: Lane | None = None
+        self.dropped_setpoints: int = 0
+        self.latency: dict[Lane, LatencyStats] = {'stop': LatencyStats(), 'setpoint': LatencyStats(),
+                                                  'config': LatencyStats(), 'poll': LatencyStats()}
+
+    def put(self, data: bytes) -> None:
+        command: Command = Command(data, command_lane(data), time.monotonic())
+        with self._condition:
+            if command.lane == 'stop':
+                if self._setpoint is not None:
+                    self.dropped_setpoints += 1
+                    self._setpoint = None
+                self._stop = command
+            elif command.lane == 'setpoint':
+                if self._setpoint is not None:
+                    self.dropped_setpoints += 1
+                self._setpoint = command
+            elif command.lane == 'poll':
+                self._next_poll = min(self._next_poll, command.queued_at)
+            else:
+                self._config.append(command)
+            self._condition.notify()
+
+    def _pop(self, now: float) -> Command | None:
+        if self._stop is not None:
+            command, self._stop = self._stop, None
+            return command
+        if now < self._last_sent + self.send_interval:
+            return None
+        poll_due: bool = now >= self._next_poll
+        if self._setpoint is not None and (self._last_lane != 'setpoint' or not (self._config or poll_due)):
+            command, self._setpoint = self._setpoint, None
+            return command
+        if self._config:
+            return self._config.popleft()
+        if poll_due:
+            self._next_poll = now + self.poll_interval
+            return Command(POLL_COMMAND, 'poll', now)
+        return None
+
+    def _wait_time(self, now: float) -> float:
+        if self._stop is not None:
+            return 0.0
+        ready: float = self._last_sent + self.send_interval
+        if self._setpoint is None and not self._config:
+            ready = max(ready, self._next_poll)
+        return max(ready - now, 0.0)
+
+    def get(self, timeout: float | None = None) -> Command | None:
+        """The next command to send, waits for it up to `timeout` seconds. Returns None on timeout."""
+        deadline: float | None = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now: float = time.monotonic()
+                command: Command | None = self._pop(now)
+                if command is not None:
+                    self._last_sent = now
+                    self._last_lane = command.lane
+                    return command
+                wait: float = self._wait_time(now)
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait = min(wait, deadline - now)
+                self._condition.wait(wait)
+
+    def sent(self, command: Command) -> None:
+        """Record the moment the command was written to the port."""
+        latency: float = time.monotonic() - command.queued_at
+        with self._condition:
+            self.latency[command.lane].add(latency)
+
+    def clear(self) -> None:
+        with self._condition:
+            self._stop = None
+            self._setpoint = None
+            self._config.clear()
+
+    def qsize(self) -> int:
+        with self._condition:
+            return (self._stop is not None) + (self._setpoint is not None) + len(self._config)
+
+    def metrics(self) -> dict[str, float | dict[str, float]]:
+        with self._condition:
+            return {'queued': (self._stop is not None) + (self._setpoint is not None) + len(self._config),
+                    'dropped_setpoints': self.dropped_setpoints,
+                    **{f'{lane}_latency': stats.to_dict() for lane, stats in self.latency.items()}}
+
+
+if __name__ == '__main__':
+    # stalled link: setpoints come every 0.3 s while the port accepts a command every 1 s
+    # python -m ground_station.hardware.rotator.command_scheduler [seconds]
+    import sys
+
+    seconds: float = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    scheduler: CommandScheduler = CommandScheduler(send_interval=1.0, poll_interval=2.0)
+    written: list[tuple[float, bytes]] = []
+    start: float = time.monotonic()
+
+    def writer() -> None:
+        while time.monotonic() - start < seconds + 1:
+            command: Command | None = scheduler.get(timeout=0.1)
+            if command is not None:
+                written.append((time.monotonic() - start, command.data))
+                scheduler.sent(command)
+
+    writer_thread: threading.Thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
+    scheduler.put(b'X5 5\r')
+    scheduler.put(b'G0I\r')
+    step: int = 0
+    while time.monotonic() - start < seconds:
+        scheduler.put(f'Q{step:.2f} {step / 2:.2f}\r'.encode())
+        step += 1
+        time.sleep(0.3)
+    scheduler.put(STOP_COMMAND)
+    writer_thread.join()
+    for moment, data in written:
+        print(f'{moment:6.2f} s {data!r}')
+    print(scheduler.metrics())
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+from typing import Literal, NamedTuple, Union
+
+
+ENCODING: str = 'cp1251'
+RESTART_BANNER: bytes = 'Контроллер "РАДАНТ"'.encode(ENCODING)
+AXIS_PREFIX: bytes = 'Ось:'.encode(ENCODING)
+AZIMUTH_LETTER: bytes = 'А'.encode(ENCODING)
+ELEVATION_LETTER: bytes = 'Э'.encode(ENCODING)
+# lines after the banner which belong to it: firmware version and axes configuration
+BANNER_TAIL_LINES: int = 2
+# longer garbage is cut to this length and the rest is dropped up to the next '\r', where the parser resynchronizes
+MAX_LINE_LENGTH: int = 256
+
+
+class PositionEvent(NamedTuple):
+    azimuth: float
+    elevation: float
+
+
+class SpeedEvent(NamedTuple):
+    azimuth: float
+    elevation: float
+
+
+class AxisEvent(NamedTuple):
+    axis: Literal['azimuth', 'elevation']
+    min_angle: float
+    max_angle: float
+    acceleration: float
+    limits: bool
+    boundary_start: float
+    boundary_end: float
+
+
+class AckEvent(NamedTuple):
+    pass
+
+
+class ErrorEvent(NamedTuple):
+    line: bytes  # 'ERR!' or 'MOTOR ERROR' line
+
+
+class RestartEvent(NamedTuple):
+    banner: bytes  # banner line and BANNER_TAIL_LINES following lines separated by '\r'
+
+
+class UnknownEvent(NamedTuple):
+    line: bytes  # line which is not a part of the protocol, e.g. noise after reconnection
+
+
+RadantEvent = Union[PositionEvent, SpeedEvent, AxisEvent, AckEvent, ErrorEvent, RestartEvent, UnknownEvent]
+ACK: AckEvent = AckEvent()
+
+
+def parse_pair(data: bytes | bytearray) -> tuple[float, float] | None:
+    """Two space separated numbers, e.g. b'090.00 045.00'. float() accepts ASCII bytes and leading zeros."""
+    fields: list[bytes | bytearray] = data.split()
+    if len(fields) != 2:
+        return None
+    try:
+        return float(fields[0]), float(fields[1])
+    except ValueError:
+        return None
+
+
+class RadantParser:
+    """Incremental parser of the RADANT controller output. Bytes of any chunking are fed as they come from the port,
+    complete '\\r' terminated lines are classified by their first bytes, so nothing is decoded and partial frames
+    wait in the buffer for the rest. Multi-line replies (axis parameters and restart banner) are handled by the
+    parser state instead of nested blocking reads.
+
+    Axis parameters reply of 'G0I'/'G1I': 'Ось: А 0 360' line, 'name: value' lines (acceleration, limits flag,
+    boundary start and end, ...), optional 'ACK' lines and an empty line at the end.
+
+    Example:
+        parser = RadantParser()
+        for event in parser.feed(port.read(port.in_waiting or 1)):
+            if isinstance(event, PositionEvent):
+                ...
+    """
+    def __init__(self) -> None:
+        self._buffer: bytearray = bytearray()
+        self._axis_header: tuple[Literal['azimuth', 'elevation'], float, float] | None = None
+        self._axis_values: list[float] = []
+        self._banner: bytearray | None = None
+        self._banner_lines: int = 0
+        self._discarding: bool = False
+        self.lines: int = 0
+        self.dropped_bytes: int = 0
+
+    def reset(self) -> None:
+        self._buffer.clear()
+        self._axis_header = None
+        self._axis_values = []
+        self._banner = None
+        self._discarding = False
+
+    def feed(self, data: bytes | bytearray) -> list[RadantEvent]:
+        """Consume received bytes and return events of complete lines in the order of arrival."""
+        buffer: bytearray = self._buffer
+        if self._discarding:
+            terminator: int = data.find(b'\r')
+            if terminator < 0:
+                self.dropped_bytes += len(data)
+                return []
+            self.dropped_bytes += terminator
+            data = data[terminator:]
+        buffer += data
+        events: list[RadantEvent] = []
+        start: int = 0
+        end: int = buffer.find(b'\r')
+        while end >= 0:
+            self._line(buffer[start:end], events)
+            start = end + 1
+            end = buffer.find(b'\r', start)
+        if start:
+            del buffer[:start]
+        if len(buffer) > MAX_LINE_LENGTH:
+            self.dropped_bytes += len(buffer) - MAX_LINE_LENGTH
+            del buffer[MAX_LINE_LENGTH:]
+            self._discarding = True
+        return events
+
+    def _line(self, line: bytearray, events: list[RadantEvent]) -> None:
+        self.lines += 1
+        if self._discarding or len(line) > MAX_LINE_LENGTH:
+            self._discarding = False
+            events.append(UnknownEvent(bytes(line[:MAX_LINE_LENGTH])))
+            return
+        if self._banner is not None:
+            self._banner += b'\r' + line
+            self._banner_lines -= 1
+            if self._banner_lines == 0:
+                events.append(RestartEvent(bytes(self._banner)))
+                self._banner = None
+            return
+        if self._axis_header is not None and self._axis_line(line, events):
+            return
+        if line.startswith(b'OK'):
+            position: tuple[float, float] | None = parse_pair(line[2:])
+            events.append(PositionEvent(*position) if position is not None else UnknownEvent(bytes(line)))
+        elif not line:
+            pass
+        elif line.startswith(b'ACK'):
+            events.append(ACK)
+        elif line.startswith(b'ERR!') or line.startswith(b'MOTOR ERROR'):
+            events.append(ErrorEvent(bytes(line)))
+        elif line.startswith(AXIS_PREFIX):
+            self._axis_start(line, events)
+        elif RESTART_BANNER in line:
+            self._axis_header = None
+            self._banner = bytearray(line)
+            self._banner_lines = BANNER_TAIL_LINES
+        else:
+            speed: tuple[float, float] | None = parse_pair(line)
+            events.append(SpeedEvent(*speed) if speed is not None else UnknownEvent(bytes(line)))
+
+    def _axis_start(self, line: bytearray, events: list[RadantEvent]) -> None:
+        fields: list[bytearray] = line[len(AXIS_PREFIX):].split()
+        try:
+            if len(fields) != 3 or fields[0] not in (AZIMUTH_LETTER, ELEVATION_LETTER):
+                raise ValueError
+            self._axis_header = ('azimuth' if fields[0] == AZIMUTH_LETTER else 'elevation',
+                                 float(fields[1]), float(fields[2]))
+            self._axis_values = []
+        except ValueError:
+            events.append(UnknownEvent(bytes(line)))
+
+    def _axis_line(self, line: bytearray, events: list[RadantEvent]) -> bool:
+        """Line inside of axis parameters reply. Returns False when the reply was broken by another message, the line
+        is parsed as a usual one then."""
+        if line.startswith(b'ACK'):
+            return True
+        if not line:
+            header = self._axis_header
+            values: list[float] = self._axis_values
+            self._axis_header = None
+            if header is None or len(values) < 4:
+                events.append(UnknownEvent(b'incomplete axis parameters'))
+            else:
+                events.append(AxisEvent(header[0], header[1], header[2], values[0], bool(int(values[1])), values[2],
+                                        values[3]))
+            return True
+        separator: int = line.find(b': ')
+        if separator >= 0:
+            try:
+                self._axis_values.append(float(line[separator + 2:]))
+                return True
+            except ValueError:
+                pass
+        self._axis_header = None
+        events.append(UnknownEvent(b'incomplete axis parameters'))
+        return False
+
+
+if __name__ == '__main__':
+    # throughput of the parser, the corpus is replayed by tests/test_radant_parser.py
+    # python -m ground_station.hardware.rotator.radant_parser
+    import ast
+    import os
+    import time
+
+    corpus_dir: str = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'benchmarks', 'fixtures', 'radant')
+    with open(os.path.join(corpus_dir, 'session.bin'), 'rb') as bin_file:
+        session: bytes = bin_file.read()
+
+    def legacy_parse(lines: list[bytes]) -> int:
+        """Per-line classification of the previous rx_loop: decode and substring search."""
+        parsed: int = 0
+        for raw_data in lines:
+            decoded_data: str = raw_data.decode('cp1251')
+            if 'Контроллер "РАДАНТ"' in decoded_data:
+                pass
+            elif 'OK' in decoded_data:
+                [float(ast.literal_eval(x.lstrip('0') or '0')) for x in decoded_data[2:].split(' ')]
+            elif 'ERR!' in decoded_data or 'Ось' in decoded_data or 'ACK' in decoded_data or decoded_data == '\r':
+                pass
+            else:
+                try:
+                    [float(value) for value in decoded_data.split(' ')]
+                except ValueError:
+                    pass
+            parsed += 1
+        return parsed
+
+    repeats: int = 2000
+    big_stream: bytes = session * repeats
+    chunks: list[bytes] = [big_stream[i:i + 64] for i in range(0, len(big_stream), 64)]
+    bench_parser: RadantParser = RadantParser()
+    start_time: float = time.perf_counter()
+    event_count: int = sum(len(bench_parser.feed(chunk)) for chunk in chunks)
+    parser_time: float = time.perf_counter() - start_time
+    raw_lines: list[bytes] = [line + b'\r' for line in big_stream.split(b'\r')[:-1]]
+    start_time = time.perf_counter()
+    legacy_lines: int = legacy_parse(raw_lines)
+    legacy_time: float = time.perf_counter() - start_time
+    print(f'parser: {bench_parser.lines / parser_time:10.0f} lines/s, {event_count / parser_time:10.0f} events/s, '
+          f'{len(big_stream) / parser_time / 1e6:.1f} MB/s in 64 byte chunks')
+    print(f'legacy: {legacy_lines / legacy_time:10.0f} lines/s (lines already split, no port reads)')
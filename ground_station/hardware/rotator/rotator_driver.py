@@ -1,12 +1,14 @@
 from __future__ import annotations
-import ast
 import threading
 import time
-from queue import Empty, Queue
 from serial import SerialBase
 import serial
 
+from ground_station.hardware.rotator.command_scheduler import Command, CommandScheduler
+from ground_station.hardware.rotator.radant_parser import (ENCODING, AxisEvent, ErrorEvent, PositionEvent, RadantEvent,
+                                                           RadantParser, RestartEvent, SpeedEvent, UnknownEvent)
 from ground_station.hardware.rotator.rotator_models import RotatorModel, RotatorAxisModel
+from ground_station.hardware.rotator.telemetry import TelemetryBuffer
 
 
 def try_to_connect(com_port: str, baudrate: int) -> SerialBase:
@@ -30,7 +32,7 @@ class Singleton(type):
 
 
 class RotatorDriver(metaclass=Singleton):
-    def __init__(self, api_name='rotator') -> None:
+    def __init__(self, api_name='rotator', send_interval: float = 0.1, poll_interval: float = 0.2) -> None:
         self.api_name: str = api_name
         self.reciever: SerialBase
         self.transmitter: SerialBase
@@ -42,13 +44,16 @@ class RotatorDriver(metaclass=Singleton):
         self.__lock: threading.Lock = threading.Lock()
         self.rotator_model: RotatorModel = RotatorModel()
         self.current_position: tuple[float, float] | None = None
+        self.position_time: float | None = None  # time.monotonic() of the current_position report
+        self.commanded_position: tuple[float, float] = (float('nan'), float('nan'))  # the latest set_angle()
+        self.telemetry: TelemetryBuffer = TelemetryBuffer()
         # self.__previous_position = None
         self.print_flag: bool = False
         self.connection_flag: bool = False
 
-        self.tx_queue = Queue()
+        # setpoints are last-value-wins, stop preempts everything, position is polled every `poll_interval`
+        self.tx_queue: CommandScheduler = CommandScheduler(send_interval, poll_interval)
         self.is_need_to_update_model: bool = False
-        self.tx_thread_sleep_time: float = 0.1
         self.tx_thread_stop_flag = False
         self.rx_thread_stop_flag = False
         # self.connect(tx_port='/dev/ttyUSB1', rx_port='/dev/ttyUSB0')  # load from .env
@@ -88,6 +93,7 @@ class RotatorDriver(metaclass=Singleton):
             self.tx_thread_stop_flag = True
             self.tx_thread.join(0.5)
             self.rx_thread.join(0.5)
+            self.tx_queue.clear()
             self.transmitter.write(b'S\r')
             time.sleep(0.2)
             self.reciever.close()
@@ -148,101 +154,66 @@ class RotatorDriver(metaclass=Singleton):
         if self.transmitter is None:
             raise RuntimeError('Rotator TX channel object must not be None')
         while not self.tx_thread_stop_flag:
-            time.sleep(self.tx_thread_sleep_time)
+            command: Command | None = self.tx_queue.get(timeout=0.1)
+            if command is None:
+                continue
             with self.__lock:
-                try:
-                    # print(self.tx_queue.queue)
-                    cmd: bytes = self.tx_queue.get_nowait()
-                    self.transmitter.write(cmd)
-                    if self.tx_queue.qsize() > 10:
-                        print(f'self.tx_queue.qsize(): {self.tx_queue.qsize()}')
-                        self.tx_thread_sleep_time = 0.05
-                    else:
-                        self.tx_thread_sleep_time = 0.1
-                except Empty:
-                    self.tx_queue.put_nowait(b'Y\r')
-
-    # 'Y' command terminated by \r
-    # 'G0I' command terminated by \r\r
+                self.transmitter.write(command.data)
+            self.tx_queue.sent(command)
+
+    def tx_metrics(self) -> dict:
+        """Queued commands, dropped setpoints and latency from set_angle() and other calls to the port write."""
+        return self.tx_queue.metrics()
 
     def rx_loop(self) -> None:
         # TODO: add checking exception of "access error, permission denied"
         if self.reciever is None:
             raise RuntimeError('Rotator RX channel must not be None')
+        parser: RadantParser = RadantParser()
         try:
             while not self.rx_thread_stop_flag:
-                try:
-                    raw_data: bytes = self.reciever.read_until(b'\r')
-
-                    decoded_data: str = raw_data.decode('cp1251')
-                    if 'Контроллер "РАДАНТ"' in decoded_data:
-                        self.restart_counter += 1
-                        self._print(f'Rotator has been restarted. Restart counter: {self.restart_counter}')
-                        self._print(decoded_data)
-                        self._print(self.reciever.read_until(b'\r').decode('cp1251'))
-                        self._print(self.reciever.read_until(b'\r').decode('cp1251'))
-
-                    elif 'OK' in decoded_data:
-                        with self.__lock:
-                            # self.__previous_position = self.current_position
-                            position: list[float] = [float(ast.literal_eval(x.lstrip('0'))) for x in decoded_data[2:].split(' ')]
-                            self.current_position = (position[0], position[1])
-                            self.rotator_model.azimuth.position = self.current_position[0]
-                            self.rotator_model.elevation.position = self.current_position[1]
-                            # if self.__previous_position != self.current_position:
-                            #     self.is_need_to_update_model = True
-                            # else:
-                            #     if self.is_need_to_update_model:
-                            #         self.queue_request_condition()
-                            #         self.is_need_to_update_model = False
-                    elif 'ERR!' in decoded_data:
-                        with self.__lock:
-                            self.error_counter += 1
-                            self._print(f'Get error. Error counter: {self.error_counter}')
-                    elif 'Ось' in decoded_data:
-                        # data = ['Ось:', 'А', '0', '360\r'] or ['Ось:', 'Э', '-90', '270\r']
-                        splitted_data: list[str] = decoded_data.split(' ')
-                        axis: str = splitted_data[1]
-
-                        remaining_raw_data: bytes = self.reciever.read_until(b'\r\r')
-                        remaining_decoded_data: str = remaining_raw_data.decode('cp1251').replace('\r', '\n')
-                        # self._print(f"\ndata: {data}")
-
-                        data: list[str] = remaining_decoded_data.split('\n')
-                        attributes: list[float] = [float(val.split(': ')[1]) for val in data if val not in ('ACK', '')][:-1]
-                        if axis == 'А':
-                            axis_obj: RotatorAxisModel = self.rotator_model.azimuth
-                        elif axis == 'Э':
-                            axis_obj: RotatorAxisModel = self.rotator_model.elevation
-                        else:
-                            raise ValueError('Incorrect rotator axis')
-                        axis_obj.min_angle = float(splitted_data[2])
-                        axis_obj.max_angle = float(splitted_data[3])
-                        axis_obj.acceleration = float(attributes[0])
-                        axis_obj.limits = bool(int(attributes[1]))
-                        axis_obj.boundary_start = float(attributes[2])
-                        axis_obj.boundary_end = float(attributes[3])
-                        if axis == 'Э':
-                            self._print(self.rotator_model)
-                    elif 'ACK' in decoded_data:
-                        # print('CMD OK')
-                        pass
-                    elif decoded_data == '\r':
-                        pass
-                    else:
-                        speed: list[str] = decoded_data.split(' ')
-                        try:
-                            self.rotator_model.azimuth.speed = float(speed[0])
-                            self.rotator_model.elevation.speed = float(speed[1])
-                        except (ValueError,  IndexError):
-                            print(f'Get incorrect data: {decoded_data.encode()}')
-                except ValueError as err:
-                    print(f'rx_loop error: {err}')
+                # whatever is received, at least one byte, so partial frames are completed by the next reads
+                data: bytes = self.reciever.read(self.reciever.in_waiting or 1)
+                for event in parser.feed(data):
+                    self._handle_event(event)
         except KeyboardInterrupt:
             print('Shutdown rotator driver')
 
+    def _handle_event(self, event: RadantEvent) -> None:
+        if isinstance(event, PositionEvent):
+            with self.__lock:
+                self.position_time = time.monotonic()
+                self.current_position = (event.azimuth, event.elevation)
+                self.rotator_model.azimuth.position = event.azimuth
+                self.rotator_model.elevation.position = event.elevation
+            self.telemetry.append(time.time(), event.azimuth, event.elevation, *self.commanded_position)
+        elif isinstance(event, SpeedEvent):
+            self.rotator_model.azimuth.speed = event.azimuth
+            self.rotator_model.elevation.speed = event.elevation
+        elif isinstance(event, AxisEvent):
+            axis_obj: RotatorAxisModel = getattr(self.rotator_model, event.axis)
+            axis_obj.min_angle = event.min_angle
+            axis_obj.max_angle = event.max_angle
+            axis_obj.acceleration = event.acceleration
+            axis_obj.limits = event.limits
+            axis_obj.boundary_start = event.boundary_start
+            axis_obj.boundary_end = event.boundary_end
+            if event.axis == 'elevation':
+                self._print(self.rotator_model)
+        elif isinstance(event, ErrorEvent):
+            with self.__lock:
+                self.error_counter += 1
+                self._print(f'Get error. Error counter: {self.error_counter}')
+        elif isinstance(event, RestartEvent):
+            self.restart_counter += 1
+            self._print(f'Rotator has been restarted. Restart counter: {self.restart_counter}')
+            self._print(event.banner.decode(ENCODING, errors='replace'))
+        elif isinstance(event, UnknownEvent):
+            print(f'Get incorrect data: {event.line}')
+
     def set_angle(self, azimuth: float, elevation: float) -> None:
         """aaa.aa eee.ee"""
+        self.commanded_position = (azimuth, elevation)
         self.tx_queue.put(bytes(f'Q{azimuth:.2f} {elevation:.2f}\r'.encode()))
 
     def set_speed(self, az_speed: float, el_speed: float) -> None:
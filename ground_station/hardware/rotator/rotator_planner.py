@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from typing import Literal, NamedTuple
+import numpy as np
+from ground_station.hardware.rotator.rotator_models import RotatorAxisModel, RotatorModel
+from ground_station.propagator.propagate import SatellitePath, convert_az_degrees
+
+
+PlanMode = Literal['normal', 'flip', 'normal-flip', 'flip-normal']
+# 'normal': (az, el); 'flip': (az + 180, 180 - el) for the whole pass;
+# 'normal-flip' and 'flip-normal' switch the mode after culmination, so an overhead pass is tracked by elevation
+# which goes past 90 degrees while azimuth stays almost still instead of fast 180 degrees turn in the keyhole.
+PLAN_MODES: tuple[PlanMode, ...] = ('normal', 'flip', 'normal-flip', 'flip-normal')
+# deg/s, azimuth speed which is assumed when the controller has not reported it yet
+DEFAULT_AZ_SPEED: float = 5.0
+
+
+class RotatorPlan(NamedTuple):
+    path: SatellitePath  # command trajectory: unwrapped azimuth and elevation inside of rotator limits
+    mode: PlanMode
+    slew_deg: float  # preparation turn from current position plus both axes turns during the pass
+    clipped_points: int  # points which are out of limits and were clipped, 0 when the pass is fully trackable
+
+
+def axis_range(axis: RotatorAxisModel) -> tuple[float, float]:
+    """Allowed angles of the axis: hardware range narrowed by boundaries when limits are enabled."""
+    low, high = axis.min_angle, axis.max_angle
+    if axis.limits:
+        low, high = max(low, axis.boundary_start), min(high, axis.boundary_end)
+    if high <= low:
+        raise ValueError(f'Incorrect rotator axis range [{low}, {high}]. Probably axis parameters were not requested')
+    return low, high
+
+
+def axis_ranges_known(rotator: RotatorModel) -> bool:
+    """Axis parameters were received from the controller ('G0I' and 'G1I' replies), so the path can be planned."""
+    try:
+        axis_range(rotator.azimuth)
+        axis_range(rotator.elevation)
+    except ValueError:
+        return False
+    return True
+
+
+def wrap_degrees(angle: np.ndarray | float) -> np.ndarray:
+    """Angle difference in [-180, 180)."""
+    return (np.asarray(angle) + 180) % 360 - 180
+
+
+def plan_rotator_path(path: SatellitePath, rotator: RotatorModel) -> RotatorPlan:
+    """Convert satellite path to the rotator command trajectory.
+
+    Azimuth of the path is unwrapped once, every mode differs from it only by constant offsets before and after
+    culmination, so limits and slew of all modes are evaluated as arrays of 4 values without building 4 trajectories.
+    For each mode azimuth is shifted by the number of full turns which keeps it inside of the azimuth range and is
+    the closest to current rotator position. The mode with the smallest total slew among trackable ones is chosen.
+    The split modes jump by both axes in the middle of the pass, so they are considered only in the keyhole, where
+    azimuth turns at culmination faster than the rotator can follow; otherwise a continuous mode is always better.
+    When no mode fits the limits, the mode with the smallest violation is clipped to the limits.
+
+    Args:
+        path (SatellitePath): satellite path with azimuth in [0, 360).
+        rotator (RotatorModel): rotator state with current position and axis parameters.
+
+    Returns:
+        RotatorPlan: command trajectory and chosen mode.
+    """
+    az_low, az_high = axis_range(rotator.azimuth)
+    el_low, el_high = axis_range(rotator.elevation)
+    azimuth: np.ndarray = convert_az_degrees(path.azimuth)
+    altitude: np.ndarray = path.altitude
+    az_turns: np.ndarray = np.abs(np.diff(azimuth))
+    flip_before: np.ndarray = np.array([False, True, False, True])
+    flip_after: np.ndarray = np.array([False, True, True, False])
+    keyhole: bool = False
+    if len(path) < 2:
+        flip_after = flip_before
+        culmination, split = 0, 0
+    else:
+        # the split modes switch the representation at the fastest azimuth turn, it is the culmination point,
+        # where the switch costs 180 degrees minus this turn
+        culmination = int(np.argmax(az_turns))
+        split = culmination + 1
+
+    az_step: float = float(azimuth[split] - azimuth[culmination])
+    if split:
+        az_speed: float = rotator.azimuth.speed or DEFAULT_AZ_SPEED
+        keyhole = abs(az_step) > az_speed * float(path.t[split] - path.t[culmination])
+    offset_before: np.ndarray = 180.0 * flip_before
+    offset_after: np.ndarray = offset_before + wrap_degrees(az_step + 180.0 * (flip_after ^ flip_before)) - az_step
+    az_min: np.ndarray = np.minimum(azimuth[:split].min(initial=np.inf) + offset_before,
+                                    azimuth[split:].min() + offset_after)
+    az_max: np.ndarray = np.maximum(azimuth[:split].max(initial=-np.inf) + offset_before,
+                                    azimuth[split:].max() + offset_after)
+    az_slew: np.ndarray = float(az_turns.sum()) - abs(az_step) + \
+        np.abs(az_step + offset_after - offset_before)
+
+    alt_min_before: float = float(altitude[:split].min(initial=np.inf))
+    alt_max_before: float = float(altitude[:split].max(initial=-np.inf))
+    alt_min_after: float = float(altitude[split:].min())
+    alt_max_after: float = float(altitude[split:].max())
+    el_min: np.ndarray = np.minimum(np.where(flip_before, 180 - alt_max_before, alt_min_before),
+                                    np.where(flip_after, 180 - alt_max_after, alt_min_after))
+    el_max: np.ndarray = np.maximum(np.where(flip_before, 180 - alt_min_before, alt_max_before),
+                                    np.where(flip_after, 180 - alt_min_after, alt_max_after))
+    el_last_before: np.ndarray = np.where(flip_before, 180 - altitude[culmination], altitude[culmination])
+    el_first_after: np.ndarray = np.where(flip_after, 180 - altitude[split], altitude[split])
+    el_slew: np.ndarray = float(np.abs(np.diff(altitude)).sum()) - abs(float(altitude[split] - altitude[culmination])) \
+        + np.abs(el_first_after - el_last_before)
+    el_start: np.ndarray = np.where(flip_before, 180 - altitude[0], altitude[0])
+
+    # full turns: the closest to current position among allowed ones, or the most centered one when none is allowed
+    turns_low: np.ndarray = np.ceil((az_low - az_min) / 360)
+    turns_high: np.ndarray = np.floor((az_high - az_max) / 360)
+    turns: np.ndarray = np.where(turns_low <= turns_high,
+                                 np.clip(np.round((rotator.azimuth.position - azimuth[0] - offset_before) / 360),
+                                         turns_low, turns_high),
+                                 np.round((az_low + az_high - az_min - az_max) / 720))
+    offset_before += 360 * turns
+    offset_after += 360 * turns
+    violation: np.ndarray = np.maximum(az_low - az_min - 360 * turns, 0) + \
+        np.maximum(az_max + 360 * turns - az_high, 0) + np.maximum(el_low - el_min, 0) + np.maximum(el_max - el_high, 0)
+    if not keyhole:
+        violation[flip_before != flip_after] = np.inf
+    slew: np.ndarray = az_slew + el_slew + np.abs(azimuth[0] + offset_before - rotator.azimuth.position) + \
+        np.abs(el_start - rotator.elevation.position)
+    best: int = int(np.lexsort((slew, violation))[0])
+
+    data: np.ndarray = path.data.copy()
+    data[2, :split] = azimuth[:split] + offset_before[best]
+    data[2, split:] = azimuth[split:] + offset_after[best]
+    if flip_before[best]:
+        data[1, :split] = 180 - data[1, :split]
+        data[4, :split] = -data[4, :split]
+    if flip_after[best]:
+        data[1, split:] = 180 - data[1, split:]
+        data[4, split:] = -data[4, split:]
+    clipped_points: int = 0
+    if violation[best] > 0:
+        clipped_points = int(np.count_nonzero((data[1] < el_low) | (data[1] > el_high) |
+                                              (data[2] < az_low) | (data[2] > az_high)))
+        np.clip(data[1], el_low, el_high, out=data[1])
+        np.clip(data[2], az_low, az_high, out=data[2])
+    return RotatorPlan(SatellitePath(data), PLAN_MODES[best], float(slew[best]), clipped_points)
+
+
+if __name__ == '__main__':
+    # planning time and chosen modes for every pass of the satellite over the day
+    # python -m ground_station.hardware.rotator.rotator_planner [satellite name]
+    import contextlib
+    import io
+    import sys
+    import time
+    from datetime import date, datetime
+    from ground_station.propagator.context import get_context
+    from ground_station.propagator.propagate import angle_points_for_linspace_time, get_sessions_for_sat
+
+    sat_name: str = sys.argv[1] if len(sys.argv) > 1 else 'NORBI'
+    radant: RotatorModel = RotatorModel(azimuth=RotatorAxisModel(min_angle=0, max_angle=360, limits=False),
+                                        elevation=RotatorAxisModel(min_angle=-90, max_angle=270, boundary_start=0,
+                                                                   boundary_end=180, limits=True))
+    # no keyhole: azimuth 340 -> 20 slowly, elevation up to 89.5, the rotator is parked at azimuth 350.
+    # 'flip' tracks it continuously, a split mode would jump by both axes in the middle of the pass
+    slow_pass: np.ndarray = np.zeros((len(SatellitePath.FIELDS), 200))
+    slow_pass[0] = np.linspace(0, 600, 200)
+    slow_pass[1] = np.linspace(5, 89.5, 200)
+    slow_pass[2] = np.linspace(340, 380, 200) % 360
+    parked: RotatorModel = radant.copy(deep=True)
+    parked.azimuth.position = 350
+    slow_plan: RotatorPlan = plan_rotator_path(SatellitePath(slow_pass), parked)
+    max_step: float = float(np.abs(np.diff(slow_plan.path.data[1:3], axis=1)).max())
+    print(f'slow pass near zenith: mode: {slow_plan.mode}, slew: {slow_plan.slew_deg:.1f} deg, '
+          f'max step: {max_step:.2f} deg')
+    if slow_plan.mode != 'flip' or max_step > 1:
+        print('Slow pass near zenith must be tracked continuously in flip mode')
+        sys.exit(1)
+
+    repeats: int = 1000
+    with contextlib.redirect_stdout(io.StringIO()):
+        sessions = get_sessions_for_sat(sat_name, get_context().observers, date.today(), use_cache=False)
+    for session in sessions:
+        with contextlib.redirect_stdout(io.StringIO()):
+            satellite_path: SatellitePath = angle_points_for_linspace_time(
+                sat_name, session['station'], datetime.fromisoformat(session['start_time']),
+                datetime.fromisoformat(session['finish_time']))
+        start_time: float = time.perf_counter()
+        for _ in range(repeats):
+            plan: RotatorPlan = plan_rotator_path(satellite_path, radant)
+        elapsed: float = (time.perf_counter() - start_time) / repeats
+        print(f"{session['start_time']} points: {len(satellite_path):5d} max altitude: "
+              f"{satellite_path.altitude.max():5.1f} mode: {plan.mode:11s} slew: {plan.slew_deg:6.1f} deg "
+              f"azimuth: [{plan.path.azimuth.min():6.1f}, {plan.path.azimuth.max():6.1f}] "
+              f"clipped: {plan.clipped_points} planning: {elapsed * 1e6:6.1f} us")
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import random
+import select
+import threading
+import time
+import tty
+from ground_station.hardware.rotator.radant_parser import AXIS_PREFIX, AZIMUTH_LETTER, ELEVATION_LETTER, ENCODING
+
+
+ACK_REPLY: bytes = b'ACK\r'
+ERROR_REPLY: bytes = b'ERR!\r'
+BANNER_REPLY: bytes = 'Контроллер "РАДАНТ" \rВерсия ПО: 2.1\rОси: 2\r'.encode(ENCODING)
+# error of the position, deg, and speed, deg/s, which counts as the target is reached
+POSITION_TOLERANCE: float = 1e-3
+MAX_COMMAND_LENGTH: int = 64
+
+
+class AxisPhysics:
+    """Rate- and acceleration-limited motion of one axis to the target angle: the axis accelerates up to `speed`
+    and decelerates in time to stop at the target, a new target is chased from the current velocity."""
+    def __init__(self, letter: bytes, min_angle: float, max_angle: float, boundary_start: float, boundary_end: float,
+                 speed: float = 5.0, acceleration: float = 2.0, position: float = 0.0) -> None:
+        self.letter: bytes = letter
+        self.min_angle: float = min_angle
+        self.max_angle: float = max_angle
+        self.boundary_start: float = boundary_start
+        self.boundary_end: float = boundary_end
+        self.limits: bool = True
+        self.speed: float = speed
+        self.acceleration: float = acceleration
+        self.position: float = position
+        self.velocity: float = 0.0
+        self.target: float = position
+
+    def set_target(self, angle: float) -> None:
+        if self.limits:
+            angle = min(max(angle, self.boundary_start), self.boundary_end)
+        self.target = min(max(angle, self.min_angle), self.max_angle)
+
+    def stop(self) -> None:
+        """Decelerate to the nearest possible stop point."""
+        braking: float = self.velocity * abs(self.velocity) / (2 * self.acceleration) if self.acceleration > 0 else 0.0
+        self.target = self.position + braking
+
+    def step(self, dt: float) -> None:
+        error: float = self.target - self.position
+        if abs(error) < POSITION_TOLERANCE and abs(self.velocity) < self.acceleration * dt + POSITION_TOLERANCE:
+            self.position, self.velocity = self.target, 0.0
+            return
+        desired: float = math.copysign(min(self.speed, math.sqrt(2 * self.acceleration * abs(error))), error)
+        change: float = self.acceleration * dt
+        velocity: float = min(max(desired, self.velocity - change), self.velocity + change)
+        self.position += (self.velocity + velocity) / 2 * dt
+        self.velocity = velocity
+        if (self.target - self.position) * error < 0:  # overshoot within one step
+            self.position, self.velocity = self.target, 0.0
+
+    def info(self) -> bytes:
+        """Reply to 'G{axis}I': the same lines as the controller sends."""
+        return (AXIS_PREFIX + f' {self.letter.decode(ENCODING)} {self.min_angle:.0f} {self.max_angle:.0f}\r'
+                f'Ускорение: {self.acceleration:.1f}\rОграничения: {int(self.limits)}\r'
+                f'Начало: {self.boundary_start:.1f}\rКонец: {self.boundary_end:.1f}\r'
+                f'Скорость: {self.speed:.1f}\r\r'.encode(ENCODING))
+
+
+class RadantSimulator:
+    """RADANT controller on two pseudo-terminals: commands are read from `tx_port`, replies are written to `rx_port`,
+    as the controller is wired to /dev/ttyUSB1 and /dev/ttyUSB0. RotatorDriver connects to it as to the hardware.
+    POSIX only.
+
+    Commands: 'Qaaa.aa eee.ee' target, 'Xa.a e.e' speed, 'Ia.a e.e' acceleration, 'Y' position, 'H' speed,
+    'S' stop, 'G{0|1}I' axis parameters, 'G{0|1}L{0|1}' limits flag, 'G{0|1}A/B{angle}' boundaries,
+    'G{0|1}C{angle}' calibration and 'G0H' banner with the firmware version. Unknown commands are answered 'ERR!'.
+
+    Field problems are reproduced by `latency` and uniform `jitter` of command execution, seconds, gaussian
+    `position_noise` of reported angles, degrees, and probabilities of dropped and corrupted replies.
+
+    Example:
+        with RadantSimulator(latency=0.05) as simulator:
+            RotatorDriver().connect(rx_port=simulator.rx_port, tx_port=simulator.tx_port)
+    """
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, position_noise: float = 0.0, drop_rate: float = 0.0,
+                 corrupt_rate: float = 0.0, tick: float = 0.01, seed: int | None = 0) -> None:
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.position_noise: float = position_noise
+        self.drop_rate: float = drop_rate
+        self.corrupt_rate: float = corrupt_rate
+        self.tick: float = tick
+        self.azimuth: AxisPhysics = AxisPhysics(AZIMUTH_LETTER, 0, 360, 0, 360)
+        self.elevation: AxisPhysics = AxisPhysics(ELEVATION_LETTER, -90, 270, 0, 180, acceleration=1.5)
+        self.commands: int = 0
+        self.replies: int = 0
+        self.overflow_bytes: int = 0
+        self._random: random.Random = random.Random(seed)
+        self._pending: list[tuple[float, int, bytes]] = []  # heap of (execution time, order, command)
+        self._buffer: bytearray = bytearray()
+        self._lock: threading.Lock = threading.Lock()
+        self._stop_flag: threading.Event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._fds: list[int] = []
+        self._tx_master: int = -1
+        self._rx_master: int = -1
+        self.rx_port: str = ''
+        self.tx_port: str = ''
+
+    def __enter__(self) -> RadantSimulator:
+        self.start()
+        return self
+
+    def __exit__(self, *_args) -> None:
+        self.stop()
+
+    @staticmethod
+    def _open_pty() -> tuple[int, int, str]:
+        master, slave = os.openpty()
+        tty.setraw(slave)  # no '\r' -> '\n' translation and echo before the driver configures the port
+        os.set_blocking(master, False)
+        return master, slave, os.ttyname(slave)
+
+    def start(self) -> tuple[str, str]:
+        """Open the terminals and start the controller thread. Returns (rx_port, tx_port) names."""
+        if self._thread is not None:
+            return self.rx_port, self.tx_port
+        self._rx_master, rx_slave, self.rx_port = self._open_pty()
+        self._tx_master, tx_slave, self.tx_port = self._open_pty()
+        # slaves are kept open, so masters do not get EIO when the driver closes and reopens the ports
+        self._fds = [self._rx_master, rx_slave, self._tx_master, tx_slave]
+        self._stop_flag.clear()
+        self._thread = threading.Thread(name='RADANT simulator', target=self._loop, daemon=True)
+        self._thread.start()
+        return self.rx_port, self.tx_port
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_flag.set()
+        self._thread.join(1)
+        self._thread = None
+        for fd in self._fds:
+            os.close(fd)
+        self._fds = []
+
+    def restart(self) -> None:
+        """Power cycle: motion stops, targets are reset to the current angles and the banner is sent."""
+        with self._lock:
+            for axis in (self.azimuth, self.elevation):
+                axis.velocity, axis.target = 0.0, axis.position
+            self._pending.clear()
+        self._reply(BANNER_REPLY)
+
+    def position(self) -> tuple[float, float]:
+        with self._lock:
+            return self.azimuth.position, self.elevation.position
+
+    def _loop(self) -> None:
+        last: float = time.monotonic()
+        order: int = 0
+        while not self._stop_flag.is_set():
+            now: float = time.monotonic()
+            timeout: float = self.tick - (now - last)
+            if self._pending:
+                timeout = min(timeout, self._pending[0][0] - now)
+            readable, _, _ = select.select([self._tx_master], [], [], max(timeout, 0.0))
+            now = time.monotonic()
+            if readable:
+                for command in self._read_commands():
+                    delay: float = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+                    heapq.heappush(self._pending, (now + delay, order, command))
+                    order += 1
+            with self._lock:
+                if now - last >= self.tick:
+                    self.azimuth.step(now - last)
+                    self.elevation.step(now - last)
+                    last = now
+            while self._pending and self._pending[0][0] <= now:
+                self._execute(heapq.heappop(self._pending)[2])
+
+    def _read_commands(self) -> list[bytes]:
+        try:
+            self._buffer += os.read(self._tx_master, 4096)
+        except (BlockingIOError, OSError):
+            return []
+        *commands, rest = self._buffer.split(b'\r')
+        self._buffer = bytearray(rest[-MAX_COMMAND_LENGTH:])
+        return [bytes(command) for command in commands if command]
+
+    def _reply(self, data: bytes) -> None:
+        self.replies += 1
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            return
+        if self.corrupt_rate and self._random.random() < self.corrupt_rate:
+            corrupted: bytearray = bytearray(data)
+            corrupted[self._random.randrange(len(corrupted))] = self._random.randrange(256)
+            data = bytes(corrupted)
+        try:
+            written: int = os.write(self._rx_master, data)
+        except (BlockingIOError, OSError):
+            written = 0
+        # nobody reads the port: the rest is lost as with the hardware
+        self.overflow_bytes += len(data) - written
+
+    def _noisy(self, angle: float) -> float:
+        return angle + self._random.gauss(0, self.position_noise) if self.position_noise else angle
+
+    def _execute(self, command: bytes) -> None:
+        self.commands += 1
+        try:
+            reply: bytes = self._command_reply(command)
+        except (ValueError, IndexError):
+            reply = ERROR_REPLY
+        self._reply(reply)
+
+    def _command_reply(self, command: bytes) -> bytes:
+        code: bytes = command[:1]
+        with self._lock:
+            if code == b'Y':
+                return (f'OK{self._noisy(self.azimuth.position):06.2f} '
+                        f'{self._noisy(self.elevation.position):06.2f}\r'.encode())
+            if code == b'H':
+                return f'{self.azimuth.speed:.1f} {self.elevation.speed:.1f}\r'.encode()
+            if code == b'S':
+                self.azimuth.stop()
+                self.elevation.stop()
+                return ACK_REPLY
+            if code in (b'Q', b'X', b'I'):
+                azimuth, elevation = (float(value) for value in command[1:].split())
+                if code == b'Q':
+                    self.azimuth.set_target(azimuth)
+                    self.elevation.set_target(elevation)
+                elif code == b'X':
+                    self.azimuth.speed, self.elevation.speed = azimuth, elevation
+                elif azimuth <= 0 or elevation <= 0:
+                    raise ValueError('acceleration must be positive')
+                else:
+                    self.azimuth.acceleration, self.elevation.acceleration = azimuth, elevation
+                return ACK_REPLY
+            if code == b'G' and len(command) >= 3:
+                axis: AxisPhysics = (self.azimuth, self.elevation)[int(command[1:2])]
+                operation: bytes = command[2:3]
+                if operation == b'I':
+                    return axis.info()
+                if operation == b'H':
+                    return BANNER_REPLY
+                value: float = float(command[3:])
+                if operation == b'L':
+                    axis.limits = bool(int(value))
+                elif operation == b'A':
+                    axis.boundary_start = value
+                elif operation == b'B':
+                    axis.boundary_end = value
+                elif operation == b'C':
+                    axis.position = axis.target = value
+                    axis.velocity = 0.0
+                else:
+                    return ERROR_REPLY
+                return ACK_REPLY
+        return ERROR_REPLY
+
+
+if __name__ == '__main__':
+    # offline tracking through the driver: simulator -> RotatorDriver -> TrackingLoop
+    # python -m ground_station.hardware.rotator.simulator [seconds] [latency]
+    import sys
+    import numpy as np
+    from ground_station.hardware.rotator.rotator_driver import RotatorDriver
+    from ground_station.hardware.rotator.tracking import TrackingLoop
+    from ground_station.propagator.propagate import SatellitePath
+
+    seconds: float = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    command_latency: float = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    with RadantSimulator(latency=command_latency, jitter=0.02, position_noise=0.01) as simulator:
+        rotator: RotatorDriver = RotatorDriver()
+        rotator.connect(rx_port=simulator.rx_port, tx_port=simulator.tx_port)
+        rotator.set_speed(5, 5)
+        rotator.set_angle(100, 10)
+        while rotator.current_position is None or abs(rotator.current_position[0] - 100) > 0.1:
+            time.sleep(0.1)
+        start_time: float = time.time() + 0.5
+        path_t: np.ndarray = start_time + np.arange(0, seconds, 1.0)
+        # azimuth speeds up from 0.5 to 3 deg/s, elevation rises with 1 deg/s
+        az_rate: np.ndarray = np.linspace(0.5, 3.0, len(path_t))
+        azimuth: np.ndarray = 100 + np.concatenate(([0.0], np.cumsum((az_rate[1:] + az_rate[:-1]) / 2)))
+        path: SatellitePath = SatellitePath(np.vstack((path_t, 10 + (path_t - start_time), azimuth,
+                                                       np.zeros(len(path_t)), np.ones(len(path_t)), az_rate,
+                                                       np.zeros(len(path_t)))))
+        loop: TrackingLoop = TrackingLoop(rotator, path)
+        loop.run()
+        rotator.disconnect()
+        for key, value in loop.summary().items():
+            print(f'{key:12s} {value:.4g}' if isinstance(value, float) else f'{key:12s} {value}')
+        print(f'simulator: {simulator.commands} commands, {simulator.replies} replies, '
+              f'errors {rotator.error_counter}, restarts {rotator.restart_counter}')
+        print(f'driver TX: {rotator.tx_metrics()}')
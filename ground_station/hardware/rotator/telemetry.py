@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+import math
+import threading
+import numpy as np
+
+
+# POSIX time of the position report, reported angles, angular velocity from the previous report, deg/s,
+# and the latest commanded target (NaN before the first command)
+TELEMETRY_DTYPE: np.dtype = np.dtype([('t', 'f8'), ('az', 'f4'), ('el', 'f4'), ('az_speed', 'f4'),
+                                      ('el_speed', 'f4'), ('az_cmd', 'f4'), ('el_cmd', 'f4')])
+# slower motion does not tell the lag from the pointing offset, deg/s
+MIN_LAG_SPEED: float = 0.05
+
+
+class TelemetryBuffer:
+    """Fixed size ring buffer of rotator position reports with online tracking statistics.
+
+    Samples are written into preallocated column views, so appending from the RX thread allocates nothing and
+    the oldest samples are overwritten after `capacity` reports (1 hour at 10 Hz by default).
+
+    Statistics are collected only between start_session() and finish_session() and compare reports with the planned
+    path of the session, not with the commanded targets which lead the path:
+    - pointing error: reported angles minus the path angles at the moment of the report;
+    - lag: time the rotator is behind the path, least squares of error = -velocity * lag.
+    finish_session() freezes the statistics, so idle reports after the pass do not dilute them.
+
+    Example:
+        telemetry = TelemetryBuffer()
+        telemetry.start_session(path.t, path.azimuth, path.altitude)
+        telemetry.append(time.time(), 10.0, 20.0, 10.5, 20.0)
+        samples = telemetry.snapshot()
+        print(telemetry.finish_session())
+    """
+    def __init__(self, capacity: int = 36000) -> None:
+        self.capacity: int = capacity
+        self._data: np.ndarray = np.zeros(capacity, dtype=TELEMETRY_DTYPE)
+        self._columns: tuple[np.ndarray, ...] = tuple(self._data[name]
+                                                      for name in TELEMETRY_DTYPE.names)  # type: ignore
+        self._lock: threading.Lock = threading.Lock()
+        self._count: int = 0  # all appended samples, the next index is _count % capacity
+        self._previous: tuple[float, float, float] | None = None
+        # planned path of the running session: POSIX times, azimuth and elevation
+        self._reference: tuple[list[float], list[float], list[float]] | None = None
+        self._session_summary: dict[str, float | int | None] | None = None
+        self._reset_stats()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def _reset_stats(self) -> None:
+        self._start: float = math.nan
+        self._end: float = math.nan
+        self._samples: int = 0
+        self._tracked: int = 0
+        self._az_square: float = 0.0
+        self._el_square: float = 0.0
+        self._error_max: float = 0.0
+        self._error_speed: float = 0.0
+        self._speed_square: float = 0.0
+
+    def start_session(self, t: np.ndarray, azimuth: np.ndarray, elevation: np.ndarray) -> None:
+        """Start statistics against the planned path, e.g. RotatorPlan.path: POSIX times in ascending order and
+        angles in degrees in the frame of the rotator. Stored samples are kept."""
+        with self._lock:
+            self._reset_stats()
+            self._reference = (np.asarray(t, dtype=float).tolist(), np.asarray(azimuth, dtype=float).tolist(),
+                               np.asarray(elevation, dtype=float).tolist())
+            self._session_summary = None
+
+    def finish_session(self) -> dict[str, float | int | None] | None:
+        """Freeze statistics of the running session. Returns summary of the last finished session, None when no
+        session was started since clear_session()."""
+        with self._lock:
+            if self._reference is not None:
+                self._reference = None
+                self._session_summary = self._summary()
+            return self._session_summary
+
+    def clear_session(self) -> None:
+        """Forget the running and the finished session, e.g. before a pass which may not track at all."""
+        with self._lock:
+            self._reference = None
+            self._session_summary = None
+            self._reset_stats()
+
+    def append(self, t: float, az: float, el: float, az_cmd: float = math.nan, el_cmd: float = math.nan) -> None:
+        """Add position report at POSIX time `t` with the target commanded at that moment."""
+        with self._lock:
+            az_speed: float = math.nan
+            el_speed: float = math.nan
+            previous: tuple[float, float, float] | None = self._previous
+            if previous is not None and t > previous[0]:
+                az_speed = (az - previous[1]) / (t - previous[0])
+                el_speed = (el - previous[2]) / (t - previous[0])
+            self._previous = (t, az, el)
+            index: int = self._count % self.capacity
+            t_column, az_column, el_column, az_speed_column, el_speed_column, az_cmd_column, el_cmd_column = \
+                self._columns
+            t_column[index] = t
+            az_column[index] = az
+            el_column[index] = el
+            az_speed_column[index] = az_speed
+            el_speed_column[index] = el_speed
+            az_cmd_column[index] = az_cmd
+            el_cmd_column[index] = el_cmd
+            self._count += 1
+            if self._reference is not None:
+                self._update_stats(t, az, el, az_speed, el_speed)
+
+    def _update_stats(self, t: float, az: float, el: float, az_speed: float, el_speed: float) -> None:
+        path_t, path_az, path_el = self._reference  # type: ignore
+        index: int = bisect_right(path_t, t)
+        if index == 0 or index == len(path_t):  # before or after the pass
+            return
+        if self._samples == 0:
+            self._start = t
+        self._end = t
+        self._samples += 1
+        weight: float = (t - path_t[index - 1]) / (path_t[index] - path_t[index - 1])
+        az_error: float = az - path_az[index - 1] - (path_az[index] - path_az[index - 1]) * weight
+        el_error: float = el - path_el[index - 1] - (path_el[index] - path_el[index - 1]) * weight
+        self._tracked += 1
+        self._az_square += az_error * az_error
+        self._el_square += el_error * el_error
+        self._error_max = max(self._error_max, math.hypot(az_error, el_error))
+        speed_square: float = az_speed * az_speed + el_speed * el_speed
+        if speed_square >= MIN_LAG_SPEED * MIN_LAG_SPEED:  # NaN speed of the first sample fails the comparison
+            self._error_speed += az_error * az_speed + el_error * el_speed
+            self._speed_square += speed_square
+
+    def snapshot(self, since: float | None = None) -> np.ndarray:
+        """Copy of stored samples in chronological order, only ones after POSIX time `since` if it is given."""
+        with self._lock:
+            index: int = self._count % self.capacity
+            if self._count <= self.capacity:
+                samples: np.ndarray = self._data[:self._count].copy()
+            else:
+                samples = np.concatenate((self._data[index:], self._data[:index]))
+        if since is not None:
+            samples = samples[np.searchsorted(samples['t'], since, side='right'):]
+        return samples
+
+    def export(self, file, since: float | None = None) -> None:
+        """Save snapshot() to .npy file or path, np.load() returns TELEMETRY_DTYPE array."""
+        np.save(file, self.snapshot(since))
+
+    def summary(self) -> dict[str, float | int | None]:
+        """Statistics of the running or the last finished session: errors in degrees, lag in seconds, None when
+        unknown."""
+        with self._lock:
+            if self._reference is None and self._session_summary is not None:
+                return self._session_summary
+            return self._summary()
+
+    def _summary(self) -> dict[str, float | int | None]:
+        tracked: int = self._tracked
+        return {'samples': self._samples, 'tracked_samples': tracked,
+                'duration_sec': self._end - self._start if self._samples else 0.0,
+                'error_rms': math.sqrt((self._az_square + self._el_square) / tracked) if tracked else None,
+                'error_max': self._error_max if tracked else None,
+                'az_error_rms': math.sqrt(self._az_square / tracked) if tracked else None,
+                'el_error_rms': math.sqrt(self._el_square / tracked) if tracked else None,
+                'lag_sec': float(-self._error_speed / self._speed_square) if self._speed_square else None}
+
+
+if __name__ == '__main__':
+    # rotator which follows the path with 0.4 s delay while commands lead it by 0.3 s, sampled at 5 Hz for an hour,
+    # then reports an idle position for a minute after the session
+    # python -m ground_station.hardware.rotator.telemetry [capacity]
+    import sys
+    import tempfile
+    import time
+
+    telemetry: TelemetryBuffer = TelemetryBuffer(int(sys.argv[1]) if len(sys.argv) > 1 else 36000)
+    times: np.ndarray = 1.7e9 + np.arange(0, 3600, 0.2)
+    planned: np.ndarray = 0.05 * (times - times[0])
+    telemetry.start_session(times, planned, planned / 4)
+    start_time: float = time.perf_counter()
+    for moment in times.tolist():
+        position: float = 0.05 * max(moment - 0.4 - times[0], 0.0)
+        commanded: float = 0.05 * (moment + 0.3 - times[0])
+        telemetry.append(moment, position, position / 4, commanded, commanded / 4)
+    append_time: float = time.perf_counter() - start_time
+    session: dict[str, float | int | None] | None = telemetry.finish_session()
+    for moment in (times[-1] + np.arange(0.2, 60, 0.2)).tolist():
+        telemetry.append(moment, float(planned[-1]), float(planned[-1]) / 4)
+    assert session is not None and telemetry.summary() == session, 'idle reports must not change the session'
+    assert abs(session['lag_sec'] - 0.4) < 1e-3 and abs(session['error_rms'] - 0.05 * 0.4 * math.hypot(1, 0.25)) < 1e-3
+    snapshot: np.ndarray = telemetry.snapshot()
+    assert len(snapshot) == min(len(times) + 299, telemetry.capacity) and np.all(np.diff(snapshot['t']) > 0)
+    with tempfile.TemporaryFile() as export_file:
+        telemetry.export(export_file, since=times[-100])
+        export_file.seek(0)
+        assert len(np.load(export_file)) == 99 + 299
+    telemetry.clear_session()
+    assert telemetry.finish_session() is None
+    print(f'append: {append_time / len(times) * 1e6:.2f} us per sample, {len(telemetry)} samples stored')
+    print(f'session: {session}')
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+import time
+import numpy as np
+from ground_station.hardware.rotator.rotator_driver import RotatorDriver
+from ground_station.propagator.propagate import SatellitePath
+
+
+# one row per setpoint: POSIX deadline, lateness of the command, commanded angles with lead, pointing error of the
+# latest reported position against the path at the moment of that report (NaN without report) and the lead used
+TRACK_DTYPE: np.dtype = np.dtype([('t', 'f8'), ('jitter', 'f8'), ('az_cmd', 'f8'), ('el_cmd', 'f8'),
+                                  ('az_error', 'f8'), ('el_error', 'f8'), ('lead', 'f8')])
+# rates below this are too slow to tell the lag from the pointing offset, deg/s
+MIN_LEAD_RATE: float = 0.05
+
+
+class TrackingLoop:
+    """Sends rotator setpoints at absolute deadlines of the monotonic clock with `rate_hz` frequency.
+
+    Wall-clock time of the path is mapped to the monotonic clock once, so setpoints are not shifted by NTP steps and
+    the loop sleeps until every deadline instead of polling the clock. Deadlines which are already missed by more
+    than one period are skipped, the loop never tries to catch up.
+
+    Every setpoint leads the path by the command-to-motion latency: angle(t) + rate(t) * lead. The lead is measured
+    on the fly: the rotator lags the path by (latency - lead) * rate, so the error of reported positions projected on
+    path rates gives the latency, the lead follows it with `lead_gain` every second.
+
+    Example:
+        loop = TrackingLoop(NAKU().rotator, plan.path)
+        records = loop.run()
+        print(loop.summary())
+    """
+    def __init__(self, rotator: RotatorDriver, path: SatellitePath, rate_hz: float = 10.0, lead: float = 0.3,
+                 max_lead: float = 2.0, lead_gain: float = 0.3, adaptive_lead: bool = True) -> None:
+        """
+        Args:
+            rotator (RotatorDriver): connected rotator.
+            path (SatellitePath): rotator command trajectory, e.g. RotatorPlan.path.
+            rate_hz (float, optional): setpoint frequency. Defaults to 10.0.
+            lead (float, optional): initial command-to-motion latency, seconds. Defaults to 0.3.
+            max_lead (float, optional): upper bound of the measured lead, seconds. Defaults to 2.0.
+            lead_gain (float, optional): weight of a new latency measurement. Defaults to 0.3.
+            adaptive_lead (bool, optional): measure the lead during tracking. Defaults to True.
+        """
+        self.rotator: RotatorDriver = rotator
+        self.period: float = 1 / rate_hz
+        self.lead: float = lead
+        self.max_lead: float = max_lead
+        self.lead_gain: float = lead_gain
+        self.adaptive_lead: bool = adaptive_lead
+        self.path: SatellitePath = path
+        self.records: np.ndarray = np.zeros(0, dtype=TRACK_DTYPE)
+        self.skipped: int = 0
+        self.cpu_time: float = 0.0
+        self._stop_flag: threading.Event = threading.Event()
+        # ticks are on the rate_hz grid from the path start, setpoint angles and rates are interpolated once
+        self.t: np.ndarray = np.zeros(0)
+        if len(path):
+            self.t = np.arange(path.t[0], path.t[-1] + self.period / 2, self.period)
+        self._azimuth: np.ndarray = np.interp(self.t, path.t, path.azimuth) if len(path) else self.t
+        self._altitude: np.ndarray = np.interp(self.t, path.t, path.altitude) if len(path) else self.t
+        self._az_rate: np.ndarray = np.interp(self.t, path.t, path.az_rate) if len(path) else self.t
+        self._alt_rate: np.ndarray = np.interp(self.t, path.t, path.alt_rate) if len(path) else self.t
+
+    def stop(self) -> None:
+        self._stop_flag.set()
+
+    def _update_lead(self, rows: np.ndarray) -> None:
+        """Least squares latency from the last rows: error = (lead - latency) * rate."""
+        rows = rows[~np.isnan(rows['az_error'])]
+        index: np.ndarray = np.searchsorted(self.t, rows['t'])
+        az_rate: np.ndarray = self._az_rate[index]
+        alt_rate: np.ndarray = self._alt_rate[index]
+        weight: float = float(np.sum(az_rate ** 2 + alt_rate ** 2))
+        if weight < len(rows) * MIN_LEAD_RATE ** 2 or len(rows) == 0:
+            return
+        lag: float = float(np.sum(rows['az_error'] * az_rate + rows['el_error'] * alt_rate)) / weight
+        latency: float = float(np.mean(rows['lead'])) - lag
+        self.lead = float(np.clip((1 - self.lead_gain) * self.lead + self.lead_gain * latency, 0.0, self.max_lead))
+
+    def run(self) -> np.ndarray:
+        """Track the path until its end or stop(). Returns TRACK_DTYPE rows of sent setpoints."""
+        offset: float = time.time() - time.monotonic()  # wall clock = monotonic + offset
+        deadlines: np.ndarray = self.t - offset
+        records: np.ndarray = np.full(len(self.t), np.nan, dtype=TRACK_DTYPE)
+        count: int = 0
+        last_update: int = 0
+        cpu_start: float = time.thread_time()
+        index: int = int(np.searchsorted(deadlines, time.monotonic() - self.period))
+        self.skipped = index
+        while index < len(deadlines):
+            if self._stop_flag.wait(max(deadlines[index] - time.monotonic(), 0.0)):
+                break
+            now: float = time.monotonic()
+            late: int = int((now - deadlines[index]) / self.period)
+            if late > 0:  # the thread was descheduled for several periods, send the current setpoint only
+                self.skipped += min(late, len(deadlines) - 1 - index)
+                index = min(index + late, len(deadlines) - 1)
+            az_cmd: float = self._azimuth[index] + self._az_rate[index] * self.lead
+            el_cmd: float = self._altitude[index] + self._alt_rate[index] * self.lead
+            self.rotator.set_angle(az_cmd, el_cmd)
+            row: np.ndarray = records[count]
+            row['t'], row['jitter'] = self.t[index], now - deadlines[index]
+            row['az_cmd'], row['el_cmd'], row['lead'] = az_cmd, el_cmd, self.lead
+            position: tuple[float, float] | None = self.rotator.current_position
+            position_time: float | None = self.rotator.position_time
+            if position is not None and position_time is not None and position_time > deadlines[0]:
+                reported_at: float = position_time + offset
+                row['az_error'] = position[0] - np.interp(reported_at, self.t, self._azimuth)
+                row['el_error'] = position[1] - np.interp(reported_at, self.t, self._altitude)
+            count += 1
+            if self.adaptive_lead and count - last_update >= int(round(1 / self.period)):
+                self._update_lead(records[last_update:count])
+                last_update = count
+            index += 1
+        self.cpu_time = time.thread_time() - cpu_start
+        self.records = records[:count]
+        return self.records
+
+    def summary(self) -> dict[str, float | int]:
+        records: np.ndarray = self.records
+        error: np.ndarray = np.hypot(records['az_error'], records['el_error'])
+        error = error[~np.isnan(error)]
+        jitter: np.ndarray = np.abs(records['jitter'])
+        return {'setpoints': len(records), 'skipped': self.skipped,
+                'jitter_p50': float(np.percentile(jitter, 50)) if len(jitter) else 0.0,
+                'jitter_p99': float(np.percentile(jitter, 99)) if len(jitter) else 0.0,
+                'jitter_max': float(jitter.max(initial=0.0)),
+                'error_rms': float(np.sqrt(np.mean(error ** 2))) if len(error) else float('nan'),
+                'error_max': float(error.max(initial=0.0)),
+                'lead': self.lead, 'cpu_time': self.cpu_time,
+                'cpu_load': self.cpu_time / max(len(records) * self.period, self.period)}
+
+
+if __name__ == '__main__':
+    # 10 Hz tracking of a fake rotator which follows setpoints with 0.5 s delay and reports position every 0.2 s
+    # python -m ground_station.hardware.rotator.tracking [seconds]
+    import sys
+    from collections import deque
+
+    seconds: float = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    delay: float = 0.5
+
+    class FakeRotator:
+        def __init__(self) -> None:
+            self.current_position: tuple[float, float] | None = None
+            self.position_time: float | None = None
+            self.setpoints: deque[tuple[float, float, float]] = deque(maxlen=1000)
+            self.stop_flag: threading.Event = threading.Event()
+            threading.Thread(target=self.poll, daemon=True).start()
+
+        def set_angle(self, azimuth: float, elevation: float) -> None:
+            self.setpoints.append((time.monotonic(), azimuth, elevation))
+
+        def poll(self) -> None:
+            while not self.stop_flag.wait(0.2):
+                now: float = time.monotonic()
+                reached: list[tuple[float, float, float]] = [point for point in self.setpoints
+                                                             if point[0] <= now - delay]
+                if reached:
+                    self.current_position = reached[-1][1:]
+                    self.position_time = now
+
+    start_time: float = time.time() + 0.5
+    path_t: np.ndarray = start_time + np.arange(0, seconds, 1.0)
+    # azimuth speeds up from 0.5 to 3 deg/s, elevation rises with 1 deg/s
+    az_rate: np.ndarray = np.linspace(0.5, 3.0, len(path_t))
+    azimuth: np.ndarray = 100 + np.concatenate(([0.0], np.cumsum((az_rate[1:] + az_rate[:-1]) / 2)))
+    path: SatellitePath = SatellitePath(np.vstack((path_t, 10 + (path_t - start_time), azimuth, np.zeros(len(path_t)),
+                                                   np.ones(len(path_t)), az_rate, np.zeros(len(path_t)))))
+    fake: FakeRotator = FakeRotator()
+    loop: TrackingLoop = TrackingLoop(fake, path)  # type: ignore
+    loop.run()
+    fake.stop_flag.set()
+    last: np.ndarray = loop.records[-int(5 / loop.period):]
+    for key, value in loop.summary().items():
+        print(f'{key:12s} {value:.4g}' if isinstance(value, float) else f'{key:12s} {value}')
+    print(f'rms error of the last 5 s: {np.sqrt(np.nanmean(last["az_error"] ** 2 + last["el_error"] ** 2)):.3f} deg, '
+          f'true delay {delay} s')
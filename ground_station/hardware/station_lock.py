@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import fcntl
+import os
+import tempfile
+
+
+class StationLock:
+    """Exclusive use of the station hardware by one session among all processes of the host, e.g. the prefork
+    pool of the celery worker: flock() of '<directory>/ground_station_<station>.lock'. The kernel releases it when
+    the holder dies, so a killed worker never leaves the station locked.
+
+    Example:
+        lock = StationLock('NSU')
+        if lock.acquire():
+            try:
+                ...
+            finally:
+                lock.release()
+    """
+    def __init__(self, station: str, directory: str = tempfile.gettempdir()) -> None:
+        self.path: str = os.path.join(directory, f'ground_station_{station}.lock')
+        self._fd: int | None = None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting. Returns False when another session holds it."""
+        if self._fd is not None:
+            raise RuntimeError(f'{self.path} is already held by this lock')
+        fd: int = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
@@ -0,0 +1,42 @@
+"""LoRa time on air, shared by the radio driver and offline pass planning without the serial stack."""
+from __future__ import annotations
+import math
+from dataclasses import dataclass
+
+
+@dataclass
+class LoRaTxPacket:
+    Tsym: float  # ms
+    Tpkt: float  # ms
+    low_datarate_opt_flag: bool
+
+
+# RegModemConfig1 bandwidth codes (value >> 4) in Hz
+BANDWIDTH_HZ: tuple[float, ...] = (7.8e3, 10.4e3, 15.6e3, 20.8e3, 31.25e3, 41.7e3, 62.5e3, 125e3, 250e3, 500e3)
+
+
+def lora_airtime(payload_size: int, spread_factor: int, bandwidth_hz: float, coding_rate: int = 5,
+                 preamble_len: int = 8, crc: bool = True, implicit_mode: bool = False,
+                 low_datarate_optimize: bool | None = None) -> LoRaTxPacket:
+    """LoRa time on air by SX1276/77/78 datasheet, section 4.1.1.7.
+
+    Args:
+        payload_size (int): payload length in bytes.
+        spread_factor (int): 6..12.
+        bandwidth_hz (float): bandwidth in Hz, e.g. 250e3.
+        coding_rate (int, optional): denominator of coding rate 4/5..4/8. Defaults to 5.
+        preamble_len (int, optional): programmed preamble length. Defaults to 8.
+        crc (bool, optional): payload CRC is on. Defaults to True.
+        implicit_mode (bool, optional): implicit header mode. Defaults to False.
+        low_datarate_optimize (bool | None, optional): None means the datasheet rule: symbol time over 16 ms.
+
+    Returns:
+        LoRaTxPacket: symbol and packet time in milliseconds.
+    """
+    t_sym: float = 2 ** spread_factor / bandwidth_hz * 1000
+    optimization_flag: bool = t_sym > 16 if low_datarate_optimize is None else low_datarate_optimize
+    preamble_time: float = (preamble_len + 4.25) * t_sym
+    tmp_poly: int = 8 * payload_size - 4 * spread_factor + 28 + 16 * crc - 20 * implicit_mode
+    payload_symbol_nb: int = 8 + max(math.ceil(tmp_poly / (4 * (spread_factor - 2 * optimization_flag))), 0) * \
+        coding_rate
+    return LoRaTxPacket(t_sym, preamble_time + payload_symbol_nb * t_sym, optimization_flag)
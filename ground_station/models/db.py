@@ -45,6 +45,17 @@ class SessionModel(BaseModel):
     initial_start: datetime
     initial_duration_sec: int
 
+class RotatorTelemetryModel(BaseModel):
+    """Tracking quality of the session, TelemetryBuffer.summary(): errors in degrees against the commanded target."""
+    samples: int = 0
+    tracked_samples: int = 0
+    duration_sec: float = 0
+    error_rms: float | None = None
+    error_max: float | None = None
+    az_error_rms: float | None = None
+    el_error_rms: float | None = None
+    lag_sec: float | None = None
+
 class ResultSessionModel(BaseModel):
     user_id: UUID
     status: str
@@ -58,6 +69,7 @@ class ResultSessionModel(BaseModel):
     priority: int
     result: list = []
     traceback: str = ''
+    rotator: RotatorTelemetryModel | None = None
 
 class TimeRangeModel(BaseModel):
     _id: UUID = Field(..., alias="_id")
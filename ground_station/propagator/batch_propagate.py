@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+from functools import partial
+from typing import Any, Callable
+import numpy as np
+from sgp4.api import SatrecArray
+from skyfield.constants import DAY_S
+from skyfield.sgp4lib import EarthSatellite
+from skyfield.timelib import Time, Timescale
+from skyfield.toposlib import GeographicPosition
+from ground_station.propagator.context import get_context
+from ground_station.propagator.frames import elevation_degrees, observer_frame, sgp4_time_args, teme_to_itrs
+from ground_station.propagator.horizon_mask import HorizonMask
+from ground_station.propagator.propagate import (convert_time_args, extract_passes, get_satellite, mask_passes,
+                                                 passes_to_dicts, time_to_posix)
+
+
+def find_candidate_intervals(elevation: np.ndarray, altitude_degrees: float, margin_degrees: float) -> np.ndarray:
+    """Find coarse grid intervals [i, i + 1] which may contain horizon crossing.
+    There are intervals with sign change of (elevation - altitude) and intervals around local maxima which are a bit
+    lower than altitude, because short grazing pass may fit between two grid points.
+
+    Args:
+        elevation (np.ndarray): elevation of shape (n_sat, n_times)
+        altitude_degrees (float): horizon altitude
+        margin_degrees (float): how much local maximum may be lower than horizon to be checked.
+
+    Returns:
+        np.ndarray: array of (sat_index, first_grid_index, last_grid_index) rows.
+    """
+    above: np.ndarray = elevation > altitude_degrees
+    sat_idx, time_idx = np.nonzero(above[:, 1:] != above[:, :-1])
+    crossings: np.ndarray = np.column_stack((sat_idx, time_idx, time_idx + 1))
+    middle: np.ndarray = elevation[:, 1:-1]
+    local_max: np.ndarray = (middle >= elevation[:, :-2]) & (middle >= elevation[:, 2:]) & \
+                            (middle <= altitude_degrees) & (middle > altitude_degrees - margin_degrees)
+    sat_idx, time_idx = np.nonzero(local_max)
+    maxima: np.ndarray = np.column_stack((sat_idx, time_idx, time_idx + 2))
+    return np.concatenate((crossings, maxima)).astype(np.int64)
+
+
+def elevation_at(satellites: list[EarthSatellite], sat_index: np.ndarray, tt: np.ndarray, observer_xyz: np.ndarray,
+                 up: np.ndarray, timescale: Timescale, altitude_degrees: float = 0.0) -> np.ndarray:
+    """Elevation in degrees above `altitude_degrees` of satellite `sat_index[i]` at TT julian date `tt[i]`. Time
+    conversion and the frame rotation are done once for all points, sgp4 is called once per satellite. Points with
+    sgp4 error are at -90 degrees."""
+    if len(tt) == 0:
+        return np.zeros(0)
+    jd_whole, fraction, ut1_fraction = sgp4_time_args(timescale.tt_jd(tt))
+    r_teme: np.ndarray = np.empty((len(tt), 3))
+    error: np.ndarray = np.zeros(len(tt), dtype=np.int64)
+    order: np.ndarray = np.argsort(sat_index, kind='stable')
+    for group in np.split(order, np.flatnonzero(np.diff(sat_index[order])) + 1):
+        error[group], r_teme[group], _ = satellites[sat_index[group[0]]].model.sgp4_array(jd_whole[group],
+                                                                                          fraction[group])
+    elevation: np.ndarray = elevation_degrees(teme_to_itrs(r_teme, jd_whole, ut1_fraction), observer_xyz, up)
+    elevation[error != 0] = -90.0
+    return elevation - altitude_degrees
+
+
+def bisect_crossings(elevation: Callable[[np.ndarray, np.ndarray], np.ndarray], sat_index: np.ndarray,
+                     lower: np.ndarray, upper: np.ndarray, el_lower: np.ndarray, el_upper: np.ndarray,
+                     tolerance: float) -> tuple[np.ndarray, np.ndarray]:
+    """Bisect brackets of horizon crossings of all satellites together until they are shorter than `tolerance`
+    days, every iteration is one elevation() call. Crossings are interpolated linearly inside of final brackets.
+
+    Args:
+        elevation (Callable[[np.ndarray, np.ndarray], np.ndarray]): elevation above horizon at (sat_index, tt).
+        sat_index (np.ndarray): satellite of every bracket.
+        lower (np.ndarray): TT julian dates of bracket starts.
+        upper (np.ndarray): TT julian dates of bracket ends.
+        el_lower (np.ndarray): elevation above horizon at bracket starts.
+        el_upper (np.ndarray): elevation above horizon at bracket ends, of the other sign.
+        tolerance (float): max bracket length in days.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: TT julian dates of crossings and event types: 0 - rise, 2 - set.
+    """
+    if len(lower):
+        for _ in range(max(int(np.ceil(np.log2(np.max(upper - lower) / tolerance))), 0)):
+            middle: np.ndarray = (lower + upper) / 2
+            el_middle: np.ndarray = elevation(sat_index, middle)
+            same: np.ndarray = (el_middle > 0) == (el_lower > 0)
+            lower, el_lower = np.where(same, middle, lower), np.where(same, el_middle, el_lower)
+            upper, el_upper = np.where(same, upper, middle), np.where(same, el_upper, el_middle)
+    crossing_tt: np.ndarray = lower + (upper - lower) * el_lower / (el_lower - el_upper)
+    return crossing_tt, np.where(el_upper > 0, 0, 2)
+
+
+def find_peaks(elevation: Callable[[np.ndarray, np.ndarray], np.ndarray], sat_index: np.ndarray,
+               lower: np.ndarray, upper: np.ndarray, tolerance: float) -> tuple[np.ndarray, np.ndarray]:
+    """Golden section search of elevation maxima inside of [lower, upper] of all satellites together, every
+    iteration is one elevation() call. Returns TT julian dates and elevation above horizon of the best points."""
+    ratio: float = (np.sqrt(5) - 1) / 2
+    inner_lower: np.ndarray = upper - ratio * (upper - lower)
+    inner_upper: np.ndarray = lower + ratio * (upper - lower)
+    el_inner_lower: np.ndarray = elevation(sat_index, inner_lower)
+    el_inner_upper: np.ndarray = elevation(sat_index, inner_upper)
+    if len(lower):
+        for _ in range(max(int(np.ceil(np.log(np.max(upper - lower) / tolerance) / -np.log(ratio))), 0)):
+            left: np.ndarray = el_inner_lower > el_inner_upper  # the maximum is in [lower, inner_upper]
+            upper = np.where(left, inner_upper, upper)
+            lower = np.where(left, lower, inner_lower)
+            point: np.ndarray = np.where(left, upper - ratio * (upper - lower), lower + ratio * (upper - lower))
+            el_point: np.ndarray = elevation(sat_index, point)
+            inner_lower, inner_upper, el_inner_lower, el_inner_upper = (
+                np.where(left, point, inner_upper), np.where(left, inner_lower, point),
+                np.where(left, el_point, el_inner_upper), np.where(left, el_inner_lower, el_point))
+    left = el_inner_lower > el_inner_upper
+    return np.where(left, inner_lower, inner_upper), np.where(left, el_inner_lower, el_inner_upper)
+
+
+def passes_from_crossings(crossing_tt: np.ndarray, event_types: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sort crossings and drop duplicates found by overlapped intervals and a leading set event of the session that
+    already started at the beginning of the propagation."""
+    order: np.ndarray = np.argsort(crossing_tt, kind='stable')
+    crossing_tt, event_types = crossing_tt[order], event_types[order]
+    if len(crossing_tt) > 1:
+        # interval around local maximum overlaps with neighbouring crossing intervals
+        unique: np.ndarray = np.concatenate(([True], (np.diff(crossing_tt) > 1e-3 / DAY_S) |
+                                             (event_types[1:] != event_types[:-1])))
+        crossing_tt, event_types = crossing_tt[unique], event_types[unique]
+    first_rise: np.ndarray = np.flatnonzero(event_types == 0)
+    if len(first_rise) == 0:
+        return crossing_tt[:0], event_types[:0]
+    return crossing_tt[first_rise[0]:], event_types[first_rise[0]:]
+
+
+def get_sessions_for_sats(names: list[str], observers: dict[str, GeographicPosition],
+                          t_1: date | str, t_2: date | str | None = None, local_tle: bool = True,
+                          altitude_degrees: float | None = None, coarse_step: float = 120,
+                          refine_step: float = 1, nearest_tle: bool = False) -> dict[str, list[dict[str, Any]]]:
+    """Batch version of get_sessions_for_sat(). All satellites are propagated together with sgp4 SatrecArray on
+    the shared coarse time grid, horizon crossings are searched with numpy and refined by bisection of bracketed
+    intervals of all satellites at once, so the cost of refinement does not grow with the grid step.
+
+    Args:
+        names (list[str]): satellite names.
+        observers (dict[str, GeographicPosition]): stations, e.g. OBSERVERS.
+        t_1 (date | str): start time of propagation.
+        t_2 (date | str | None, optional): finish time of propagation. See convert_time_args(). Defaults to None.
+        local_tle (bool, optional): use local TLE catalog or request Celestrak. Defaults to True.
+        altitude_degrees (float | None, optional): flat horizon altitude. Defaults to None - horizon mask of every
+        observer, see mask_passes().
+        coarse_step (float, optional): coarse grid step in seconds. Defaults to 120.
+        refine_step (float, optional): max bracket length in seconds after refinement. Defaults to 1.
+        nearest_tle (bool, optional): use element sets with epoch closest to the middle of the time range from TLE
+        history, see get_satellite(). Defaults to False.
+
+    Raises:
+        ValueError: when some satellite is not found.
+
+    Returns:
+        dict[str, list[dict[str, Any]]]: sessions of every satellite in the same format as get_sessions_for_sat().
+    """
+    ts_1, ts_2 = convert_time_args(t_1, t_2)
+    middle: float | None = float(time_to_posix(ts_1) + time_to_posix(ts_2)) / 2 if nearest_tle else None
+    satellites: list[EarthSatellite] = []
+    for name in names:
+        satellite: EarthSatellite | None = get_satellite(name, local_tle, middle)
+        if satellite is None:
+            raise ValueError(f'Unknown satellite {name}')
+        satellites.append(satellite)
+    sessions: dict[str, list[dict[str, Any]]] = {name: [] for name in names}
+    if not satellites:
+        return sessions
+    timescale: Timescale = ts_1.ts
+    points: int = max(int(np.ceil((ts_2.tt - ts_1.tt) * DAY_S / coarse_step)), 1) + 1
+    grid_tt: np.ndarray = np.linspace(ts_1.tt, ts_2.tt, points)
+    jd_whole, fraction, ut1_fraction = sgp4_time_args(timescale.tt_jd(grid_tt))
+    error, r_teme, _ = SatrecArray([satellite.model for satellite in satellites]).sgp4(jd_whole, fraction)
+    r_itrs: np.ndarray = teme_to_itrs(r_teme, jd_whole, ut1_fraction)  # (n_sat, n_times, 3)
+
+    # elevation of LEO satellite changes less than ~2 degrees per minute near the horizon
+    margin_degrees: float = 2.0 * coarse_step / 60
+    for location_name, observer in observers.items():
+        mask: HorizonMask = get_context().horizon_mask(location_name) if altitude_degrees is None \
+            else HorizonMask.flat(altitude_degrees)
+        observer_xyz, up = observer_frame(observer)
+        elevation: np.ndarray = elevation_degrees(r_itrs, observer_xyz, up)
+        elevation[error != 0] = -90.0
+        intervals: np.ndarray = find_candidate_intervals(elevation, mask.min_elevation, margin_degrees)
+        elevation_above: Callable[[np.ndarray, np.ndarray], np.ndarray] = partial(
+            elevation_at, satellites, observer_xyz=observer_xyz, up=up, timescale=timescale,
+            altitude_degrees=mask.min_elevation)
+        elevation -= mask.min_elevation
+        sat_index, first, last = intervals[:, 0], intervals[:, 1], intervals[:, 2]
+        # brackets of crossings between neighbouring grid points
+        crossing: np.ndarray = last - first == 1
+        bracket_sat: list[np.ndarray] = [sat_index[crossing]]
+        lower: list[np.ndarray] = [grid_tt[first[crossing]]]
+        upper: list[np.ndarray] = [grid_tt[last[crossing]]]
+        el_lower: list[np.ndarray] = [elevation[sat_index[crossing], first[crossing]]]
+        el_upper: list[np.ndarray] = [elevation[sat_index[crossing], last[crossing]]]
+        # a short pass around a local maximum below horizon is bracketed by its peak
+        peak_sat: np.ndarray = sat_index[~crossing]
+        peak_first: np.ndarray = first[~crossing]
+        peak_last: np.ndarray = last[~crossing]
+        peak_tt, el_peak = find_peaks(elevation_above, peak_sat, grid_tt[peak_first], grid_tt[peak_last],
+                                      refine_step / DAY_S)
+        visible: np.ndarray = el_peak > 0
+        peak_sat, peak_first, peak_last = peak_sat[visible], peak_first[visible], peak_last[visible]
+        peak_tt, el_peak = peak_tt[visible], el_peak[visible]
+        bracket_sat += [peak_sat, peak_sat]
+        lower += [grid_tt[peak_first], peak_tt]
+        upper += [peak_tt, grid_tt[peak_last]]
+        el_lower += [elevation[peak_sat, peak_first], el_peak]
+        el_upper += [el_peak, elevation[peak_sat, peak_last]]
+        crossing_sat: np.ndarray = np.concatenate(bracket_sat)
+        crossing_tt, event_types = bisect_crossings(elevation_above, crossing_sat, np.concatenate(lower),
+                                                    np.concatenate(upper), np.concatenate(el_lower),
+                                                    np.concatenate(el_upper), refine_step / DAY_S)
+        order: np.ndarray = np.lexsort((crossing_tt, crossing_sat))
+        crossing_sat, crossing_tt, event_types = crossing_sat[order], crossing_tt[order], event_types[order]
+        bounds: np.ndarray = np.flatnonzero(np.diff(crossing_sat)) + 1
+        for start, finish in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(crossing_sat)]))):
+            if start == finish:
+                continue
+            sat_crossing_tt, sat_event_types = passes_from_crossings(crossing_tt[start:finish],
+                                                                     event_types[start:finish])
+            if len(sat_event_types) == 0:
+                continue
+            satellite_index: int = int(crossing_sat[start])
+            passes: np.ndarray = mask_passes(satellites[satellite_index], observer,
+                                             extract_passes(sat_event_types,
+                                                            time_to_posix(timescale.tt_jd(sat_crossing_tt))),
+                                             mask, timescale)
+            sessions[names[satellite_index]].extend(passes_to_dicts(passes, location_name))
+    return sessions
+
+
+if __name__ == '__main__':
+    # benchmark: batch engine vs per-satellite get_sessions_for_sat()
+    # python -m ground_station.propagator.batch_propagate [satellites number]
+    import contextlib
+    import io
+    import sys
+    from ground_station.propagator.context import OBSERVERS, get_context
+    from ground_station.propagator.propagate import get_sessions_for_sat
+
+    sat_number: int = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sat_names: list[str] = [record.name for record in get_context().catalog.records()[:sat_number]]
+    day: date = date.today()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_time: float = time.perf_counter()
+        reference: dict[str, list[dict[str, Any]]] = {
+            name: get_sessions_for_sat(name, OBSERVERS, day, use_cache=False) for name in sat_names}
+        reference_time: float = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        batch: dict[str, list[dict[str, Any]]] = get_sessions_for_sats(sat_names, OBSERVERS, day)
+        batch_time: float = time.perf_counter() - start_time
+    reference_count: int = sum(len(value) for value in reference.values())
+    batch_count: int = sum(len(value) for value in batch.values())
+    print(f'{len(sat_names)} satellites, {len(OBSERVERS)} observers')
+    print(f'per-satellite: {reference_time:.3f} sec, {reference_count} sessions')
+    print(f'batch:         {batch_time:.3f} sec, {batch_count} sessions')
+    print(f'speedup: {reference_time / batch_time:.1f}x')
@@ -1,5 +1,42 @@
+from __future__ import annotations
 import json
 from typing import Any
+import requests
+
+
+CELESTRAK_GP_URL: str = 'https://celestrak.org/NORAD/elements/gp.php'
+
+
+class CelestrakSource:
+    """HTTP source of TLE sets. It speaks Celestrak GP API
+    (https://celestrak.org/NORAD/documentation/gp-data-formats.php), so `base_url` may be replaced by any server
+    with the same query interface, e.g. local stand-in server in tests.
+    Every method returns raw TLE text or None when the server has no data for the query.
+    """
+    def __init__(self, base_url: str = CELESTRAK_GP_URL, timeout: float = 10) -> None:
+        self.base_url: str = base_url
+        self.timeout: float = timeout
+        self.session: requests.Session = requests.Session()
+
+    def fetch(self, **query: str | int) -> str | None:
+        """Raises requests.RequestException when server is unreachable."""
+        response: requests.Response = self.session.get(self.base_url, params={**query, 'FORMAT': 'TLE'},
+                                                       timeout=self.timeout)
+        response.raise_for_status()
+        text: str = response.text
+        if not text.strip() or 'No GP data found' in text:
+            return None
+        return text
+
+    def fetch_by_name(self, name: str) -> str | None:
+        return self.fetch(NAME=name)
+
+    def fetch_by_norad_id(self, norad_id: int) -> str | None:
+        return self.fetch(CATNR=norad_id)
+
+    def fetch_group(self, group: str) -> str | None:
+        """Single GP query for a whole group of satellites, e.g. 'cubesat' or 'active'."""
+        return self.fetch(GROUP=group)
 
 
 def get_sat_name_and_num(path: str) -> list[dict[str, Any]]:
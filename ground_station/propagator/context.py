@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import os
+import threading
+from skyfield.api import load
+from skyfield.timelib import Timescale
+from skyfield.toposlib import GeographicPosition, wgs84
+from ground_station.propagator.horizon_mask import HorizonMask
+from ground_station.propagator.pass_cache import DiskPassStore, PassCache
+from ground_station.propagator.tle_cache import TLECache
+from ground_station.propagator.tle_catalog import TLECatalog
+from ground_station.propagator.tle_history import TLEHistory
+
+
+OBSERVERS: dict[str, GeographicPosition] = {'NSU': wgs84.latlon(54.842625, 83.095025, 170),
+                                            # 'Красноярск': wgs84.latlon(56.010041, 92.852069),
+                                            # 'Москва': wgs84.latlon(55.4507, 37.3656)
+                                            }
+PROPAGATOR_DIR: str = os.path.dirname(__file__)
+# <observer name>.txt files, see HorizonMask
+HORIZON_MASKS_DIR: str = os.path.join(PROPAGATOR_DIR, 'horizon_masks')
+TLE_HISTORY_DIR: str = os.path.join(PROPAGATOR_DIR, 'tle_history')
+
+
+class PropagationContext:
+    """Process-wide state of the propagator: timescale, observers, TLE catalog and caches.
+    Every member is created on first access and then reused, so importing propagator modules does no I/O.
+    The timescale uses leap second and delta T tables bundled with skyfield and never downloads anything.
+    """
+    def __init__(self, observers: dict[str, GeographicPosition] | None = None,
+                 tle_path: str = os.path.join(PROPAGATOR_DIR, 'cubesat_tle.txt'),
+                 horizon_masks_dir: str = HORIZON_MASKS_DIR) -> None:
+        self.observers: dict[str, GeographicPosition] = observers if observers is not None else OBSERVERS
+        self.tle_path: str = tle_path
+        self.horizon_masks_dir: str = horizon_masks_dir
+        self._horizon_masks: dict[str, HorizonMask] = {}
+        self._lock: threading.RLock = threading.RLock()
+        self._timescale: Timescale | None = None
+        self._catalog: TLECatalog | None = None
+        self._tle_cache: TLECache | None = None
+        self._pass_cache: PassCache | None = None
+        self._tle_history: TLEHistory | None = None
+
+    @property
+    def timescale(self) -> Timescale:
+        if self._timescale is None:
+            with self._lock:
+                if self._timescale is None:
+                    self._timescale = load.timescale(builtin=True)
+        return self._timescale
+
+    @property
+    def catalog(self) -> TLECatalog:
+        if self._catalog is None:
+            with self._lock:
+                if self._catalog is None:
+                    self._catalog = TLECatalog(self.tle_path, timescale=self.timescale)
+        return self._catalog
+
+    @property
+    def tle_cache(self) -> TLECache:
+        if self._tle_cache is None:
+            with self._lock:
+                if self._tle_cache is None:
+                    self._tle_cache = TLECache(timescale=self.timescale, history=self.tle_history)
+        return self._tle_cache
+
+    @property
+    def tle_history(self) -> TLEHistory:
+        """Every element set fetched by tle_cache is appended here."""
+        if self._tle_history is None:
+            with self._lock:
+                if self._tle_history is None:
+                    self._tle_history = TLEHistory(TLE_HISTORY_DIR, timescale=self.timescale)
+        return self._tle_history
+
+    @property
+    def pass_cache(self) -> PassCache:
+        if self._pass_cache is None:
+            with self._lock:
+                if self._pass_cache is None:
+                    self._pass_cache = PassCache(DiskPassStore(os.path.join(PROPAGATOR_DIR, 'pass_cache')))
+        return self._pass_cache
+
+    def horizon_mask(self, observer: str) -> HorizonMask:
+        """Mask from `horizon_masks_dir`/<observer>.txt or flat DEFAULT_HORIZON_DEGREES mask when there is no file."""
+        mask: HorizonMask | None = self._horizon_masks.get(observer)
+        if mask is None:
+            path: str = os.path.join(self.horizon_masks_dir, f'{observer}.txt')
+            mask = HorizonMask.load(path) if os.path.exists(path) else HorizonMask.flat()
+            self._horizon_masks[observer] = mask
+        return mask
+
+    def warm_up(self) -> PropagationContext:
+        """Load everything in advance, e.g. in worker process initializer."""
+        _ = self.timescale
+        for observer in self.observers:
+            self.horizon_mask(observer)
+        if os.path.exists(self.tle_path):
+            self.catalog.reload()
+        return self
+
+
+_context: PropagationContext | None = None
+_context_lock: threading.Lock = threading.Lock()
+
+
+def get_context() -> PropagationContext:
+    global _context  # pylint: disable=global-statement
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = PropagationContext()
+    return _context
+
+
+def set_context(context: PropagationContext) -> PropagationContext | None:
+    """Replace process-wide context, e.g. with one over a frozen TLE catalog. Returns the previous context."""
+    global _context  # pylint: disable=global-statement
+    with _context_lock:
+        previous, _context = _context, context
+    return previous
+
+
+if __name__ == '__main__':
+    # startup benchmark: cold latency is measured in a fresh interpreter, warm latency in the current one
+    # python -m ground_station.propagator.context [satellite name]
+    import subprocess
+    import sys
+    import time
+    from datetime import date
+
+    sat_name: str = sys.argv[1] if len(sys.argv) > 1 else 'NORBI'
+    call: str = f'convert_time_args(date.today()); get_sat_from_local_tle_file({sat_name!r})'
+    cold_script: str = (
+        'import time, contextlib, io\n'
+        'from datetime import date\n'
+        'start = time.perf_counter()\n'
+        'from ground_station.propagator.propagate import convert_time_args, get_sat_from_local_tle_file\n'
+        'imported = time.perf_counter()\n'
+        f'with contextlib.redirect_stdout(io.StringIO()): {call}\n'
+        'called = time.perf_counter()\n'
+        'print(imported - start, called - imported)\n'
+    )
+    output: str = subprocess.run([sys.executable, '-c', cold_script], capture_output=True, text=True,
+                                 check=True).stdout.split()
+    print(f'cold import: {float(output[-2]) * 1000:8.2f} ms')
+    print(f'cold call:   {float(output[-1]) * 1000:8.2f} ms')
+
+    import contextlib
+    import io
+    from ground_station.propagator.propagate import convert_time_args, get_sat_from_local_tle_file
+    repeats: int = 1000
+    with contextlib.redirect_stdout(io.StringIO()):
+        get_sat_from_local_tle_file(sat_name)
+        start_time: float = time.perf_counter()
+        for _ in range(repeats):
+            convert_time_args(date.today())
+            get_sat_from_local_tle_file(sat_name)
+        warm_time: float = (time.perf_counter() - start_time) / repeats
+    print(f'warm call:   {warm_time * 1000:8.3f} ms')
@@ -0,0 +1,85 @@
+"""Vectorized sgp4 propagation and topocentric frame of the observer without skyfield position objects.
+TEME -> ITRS rotation uses GMST angle and neglects polar motion, the same way as EarthSatellite does by default."""
+from __future__ import annotations
+
+import numpy as np
+from skyfield.constants import DAY_S
+from skyfield.sgp4lib import EarthSatellite, theta_GMST1982
+from skyfield.timelib import Time, Timescale
+from skyfield.toposlib import GeographicPosition
+
+
+WGS84_RADIUS_KM: float = 6378.137
+WGS84_FLATTENING: float = 1 / 298.257223563
+
+
+def posix_to_time(timescale: Timescale, posix: np.ndarray | float) -> Time:
+    """POSIX timestamps to skyfield Time. Whole days go to the day argument, because skyfield takes leap seconds of
+    the calendar date, so utc(1970, 1, 1, 0, 0, posix) would be 27 seconds early nowadays."""
+    days: np.ndarray = np.floor(np.asarray(posix, dtype=float) / DAY_S)
+    return timescale.utc(1970, 1, 1 + days, 0, 0, posix - days * DAY_S)
+
+
+def sgp4_time_args(t: Time) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split skyfield Time into arguments of sgp4 (UTC julian date as whole and fraction parts) and UT1 fraction for
+    TEME -> ITRS rotation. The same way as EarthSatellite does it."""
+    fraction: np.ndarray = t.tai_fraction - t._leap_seconds() / DAY_S  # pylint: disable=protected-access
+    return t.whole, fraction, t.ut1_fraction
+
+
+def teme_to_itrs(r_teme: np.ndarray, jd_whole: np.ndarray, ut1_fraction: np.ndarray) -> np.ndarray:
+    """Rotate TEME positions of shape (..., n_times, 3) around Z axis by GMST angle (polar motion is neglected)."""
+    theta, _ = theta_GMST1982(jd_whole, ut1_fraction)
+    cos_theta: np.ndarray = np.cos(theta)
+    sin_theta: np.ndarray = np.sin(theta)
+    r_itrs: np.ndarray = np.empty_like(r_teme)
+    r_itrs[..., 0] = cos_theta * r_teme[..., 0] + sin_theta * r_teme[..., 1]
+    r_itrs[..., 1] = -sin_theta * r_teme[..., 0] + cos_theta * r_teme[..., 1]
+    r_itrs[..., 2] = r_teme[..., 2]
+    return r_itrs
+
+
+def observer_frame(observer: GeographicPosition) -> tuple[np.ndarray, np.ndarray]:
+    """Returns observer ITRS position in km and unit vector of local zenith (normal to WGS84 ellipsoid)."""
+    lat: float = observer.latitude.radians
+    lon: float = observer.longitude.radians
+    up: np.ndarray = np.array([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    return np.asarray(observer.itrs_xyz.km, dtype=float), up
+
+
+def elevation_degrees(r_itrs: np.ndarray, observer_xyz: np.ndarray, up: np.ndarray) -> np.ndarray:
+    relative: np.ndarray = r_itrs - observer_xyz
+    distance: np.ndarray = np.sqrt(np.einsum('...i,...i->...', relative, relative))
+    return np.degrees(np.arcsin(np.clip(relative @ up / distance, -1.0, 1.0)))
+
+
+def topocentric_altaz(satellite: EarthSatellite, observer: GeographicPosition, t_points: np.ndarray,
+                      timescale: Timescale) -> tuple[np.ndarray, np.ndarray]:
+    """Altitude and azimuth in degrees at POSIX time points by single sgp4 call. It is tens times faster than
+    skyfield .at().altaz() for thousands of points, points with sgp4 error are below the horizon."""
+    jd_whole, fraction, ut1_fraction = sgp4_time_args(posix_to_time(timescale, t_points))
+    error, r_teme, _ = satellite.model.sgp4_array(np.atleast_1d(jd_whole), np.atleast_1d(fraction))
+    observer_xyz, up = observer_frame(observer)
+    relative: np.ndarray = teme_to_itrs(r_teme, np.atleast_1d(jd_whole), np.atleast_1d(ut1_fraction)) - observer_xyz
+    lon: float = observer.longitude.radians
+    east: np.ndarray = np.array([-np.sin(lon), np.cos(lon), 0.0])
+    north: np.ndarray = np.cross(up, east)
+    distance: np.ndarray = np.sqrt(np.einsum('...i,...i->...', relative, relative))
+    altitude: np.ndarray = np.degrees(np.arcsin(np.clip(relative @ up / distance, -1.0, 1.0)))
+    altitude[error != 0] = -90.0
+    azimuth: np.ndarray = np.degrees(np.arctan2(relative @ east, relative @ north)) % 360
+    return altitude, azimuth
+
+
+def itrs_to_geodetic(r_itrs: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """WGS84 latitude and longitude in degrees and height in km of ITRS positions of shape (..., 3) by Bowring's
+    formula, its error is below a millimeter for LEO heights."""
+    a: float = WGS84_RADIUS_KM
+    e2: float = WGS84_FLATTENING * (2 - WGS84_FLATTENING)
+    b: float = a * (1 - WGS84_FLATTENING)
+    x, y, z = r_itrs[..., 0], r_itrs[..., 1], r_itrs[..., 2]
+    p: np.ndarray = np.hypot(x, y)
+    theta: np.ndarray = np.arctan2(z * a, p * b)
+    lat: np.ndarray = np.arctan2(z + e2 / (1 - e2) * b * np.sin(theta) ** 3, p - e2 * a * np.cos(theta) ** 3)
+    height: np.ndarray = p / np.cos(lat) - a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    return np.degrees(lat), np.degrees(np.arctan2(y, x)), height
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import struct
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+import numpy as np
+from sgp4.api import SatrecArray
+from skyfield.sgp4lib import EarthSatellite
+from ground_station.propagator.context import get_context
+from ground_station.propagator.frames import itrs_to_geodetic, posix_to_time, sgp4_time_args, teme_to_itrs
+from ground_station.propagator.horizon_mask import DEFAULT_HORIZON_DEGREES
+from ground_station.propagator.propagate import get_sat_from_local_tle_file, get_satellite, tle_epoch
+
+
+EARTH_RADIUS_KM: float = 6371.0
+
+
+class TrackKey(NamedTuple):
+    norad_id: int
+    tle_epoch: str
+    t_1: float
+    t_2: float
+    points: int
+    footprint_points: int
+    footprint_vertices: int
+    min_elevation: float
+
+
+class SatelliteTrack(NamedTuple):
+    lat: np.ndarray  # (points,) float32 degrees, NaN where sgp4 failed
+    lon: np.ndarray  # (points,) float32 degrees in [-180, 180)
+    alt: np.ndarray  # (points,) float32 km above WGS84 ellipsoid
+    footprints: np.ndarray  # (footprint_points, vertices, 2) float32 lat, lon of visibility circles
+
+
+def footprint_angle(height_km: np.ndarray, min_elevation: float) -> np.ndarray:
+    """Earth central angle in radians between the sub-satellite point and the edge of the area where the satellite is
+    above `min_elevation` degrees, spherical Earth."""
+    elevation: float = np.radians(min_elevation)
+    ratio: np.ndarray = EARTH_RADIUS_KM / (EARTH_RADIUS_KM + np.asarray(height_km, dtype=float)) * np.cos(elevation)
+    return np.arccos(np.clip(ratio, -1.0, 1.0)) - elevation
+
+
+def footprint_polygons(lat: np.ndarray, lon: np.ndarray, height_km: np.ndarray, vertices: int,
+                       min_elevation: float) -> np.ndarray:
+    """Visibility circles around sub-satellite points by spherical destination formula.
+
+    Args:
+        lat (np.ndarray): latitudes in degrees of any shape.
+        lon (np.ndarray): longitudes in degrees of the same shape.
+        height_km (np.ndarray): heights of the same shape.
+        vertices (int): vertices of every polygon, the first one is to the north.
+        min_elevation (float): elevation of the circle edge in degrees.
+
+    Returns:
+        np.ndarray: (*lat.shape, vertices, 2) array of latitudes and longitudes in degrees.
+    """
+    phi: np.ndarray = np.radians(lat)[..., None]
+    angle: np.ndarray = footprint_angle(height_km, min_elevation)[..., None]
+    bearing: np.ndarray = np.linspace(0.0, 2 * np.pi, vertices, endpoint=False)
+    sin_lat: np.ndarray = np.sin(phi) * np.cos(angle) + np.cos(phi) * np.sin(angle) * np.cos(bearing)
+    vertex_lat: np.ndarray = np.arcsin(np.clip(sin_lat, -1.0, 1.0))
+    vertex_lon: np.ndarray = np.radians(lon)[..., None] + np.arctan2(np.sin(bearing) * np.sin(angle) * np.cos(phi),
+                                                                     np.cos(angle) - np.sin(phi) * sin_lat)
+    return np.stack((np.degrees(vertex_lat), wrap_longitude(np.degrees(vertex_lon))), axis=-1)
+
+
+def wrap_longitude(lon: np.ndarray) -> np.ndarray:
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+def footprint_indices(points: int, footprint_points: int) -> np.ndarray:
+    """Track points with footprints, evenly spaced including both ends."""
+    if points == 0 or footprint_points == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.round(np.linspace(0, points - 1, min(footprint_points, points))).astype(np.int64))
+
+
+def compute_tracks(satellites: list[EarthSatellite], t_points: np.ndarray, footprint_points: int = 1,
+                   footprint_vertices: int = 36,
+                   min_elevation: float = DEFAULT_HORIZON_DEGREES) -> list[SatelliteTrack]:
+    """Sub-satellite points and footprints of all satellites by single SatrecArray call."""
+    if not satellites:
+        return []
+    jd_whole, fraction, ut1_fraction = sgp4_time_args(posix_to_time(get_context().timescale, t_points))
+    jd_whole, fraction, ut1_fraction = np.atleast_1d(jd_whole), np.atleast_1d(fraction), np.atleast_1d(ut1_fraction)
+    error, r_teme, _ = SatrecArray([satellite.model for satellite in satellites]).sgp4(jd_whole, fraction)
+    lat, lon, alt = itrs_to_geodetic(teme_to_itrs(r_teme, jd_whole, ut1_fraction))  # (n_sat, n_times)
+    lat[error != 0] = np.nan
+    lon[error != 0] = np.nan
+    alt[error != 0] = np.nan
+    indices: np.ndarray = footprint_indices(len(t_points), footprint_points)
+    footprints: np.ndarray = footprint_polygons(lat[:, indices], lon[:, indices], alt[:, indices],
+                                                footprint_vertices, min_elevation).astype(np.float32)
+    return [SatelliteTrack(lat[i].astype(np.float32), lon[i].astype(np.float32), alt[i].astype(np.float32),
+                           footprints[i]) for i in range(len(satellites))]
+
+
+class GroundTrackCache:
+    """LRU cache of tracks in memory keyed by TrackKey. A new TLE epoch of the satellite removes its older tracks."""
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries: int = max_entries
+        self._memory: OrderedDict[TrackKey, SatelliteTrack] = OrderedDict()
+        self._epochs: dict[int, str] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: TrackKey) -> SatelliteTrack | None:
+        with self._lock:
+            track: SatelliteTrack | None = self._memory.get(key)
+            if track is None:
+                self.misses += 1
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return track
+
+    def put(self, key: TrackKey, track: SatelliteTrack) -> None:
+        with self._lock:
+            if self._epochs.get(key.norad_id, key.tle_epoch) != key.tle_epoch:
+                for stale in [stale for stale in self._memory if stale.norad_id == key.norad_id]:
+                    del self._memory[stale]
+            self._epochs[key.norad_id] = key.tle_epoch
+            self._memory[key] = track
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._epochs.clear()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+
+class GroundTracks:
+    """Tracks of several satellites on the shared time grid in compact binary form for the frontend.
+    Blob layout (little endian): header, t float64 (points), norad ids uint32 (n_sat), footprint point indices
+    uint32 (footprint_points), lat, lon, alt float32 (n_sat, points) each,
+    footprints float32 (n_sat, footprint_points, vertices, 2).
+    """
+    HEADER: struct.Struct = struct.Struct('<4sIIII4x')  # magic, satellites, points, footprint points, vertices
+
+    def __init__(self, norad_ids: np.ndarray, t: np.ndarray, footprint_index: np.ndarray, lat: np.ndarray,
+                 lon: np.ndarray, alt: np.ndarray, footprints: np.ndarray) -> None:
+        self.norad_ids: np.ndarray = norad_ids
+        self.t: np.ndarray = t
+        self.footprint_index: np.ndarray = footprint_index
+        self.lat: np.ndarray = lat
+        self.lon: np.ndarray = lon
+        self.alt: np.ndarray = alt
+        self.footprints: np.ndarray = footprints
+
+    @classmethod
+    def from_tracks(cls, norad_ids: list[int], t: np.ndarray, footprint_index: np.ndarray,
+                    tracks: list[SatelliteTrack], footprint_vertices: int) -> GroundTracks:
+        if not tracks:
+            empty: np.ndarray = np.zeros((0, len(t)), dtype=np.float32)
+            return cls(np.zeros(0, dtype=np.uint32), t, footprint_index, empty, empty, empty,
+                       np.zeros((0, len(footprint_index), footprint_vertices, 2), dtype=np.float32))
+        return cls(np.asarray(norad_ids, dtype=np.uint32), t, footprint_index,
+                   np.stack([track.lat for track in tracks]), np.stack([track.lon for track in tracks]),
+                   np.stack([track.alt for track in tracks]), np.stack([track.footprints for track in tracks]))
+
+    @classmethod
+    def from_bytes(cls, blob: bytes | bytearray | memoryview) -> GroundTracks:
+        """Restore tracks from to_bytes() result. Arrays are not copied, they use memory of `blob`."""
+        magic, satellites, points, footprint_points, vertices = cls.HEADER.unpack_from(blob)
+        if magic != b'GTRK':
+            raise ValueError('Incorrect ground tracks blob')
+        offset: int = cls.HEADER.size
+
+        def take(dtype: str, shape: tuple[int, ...]) -> np.ndarray:
+            nonlocal offset
+            array: np.ndarray = np.frombuffer(blob, dtype=dtype, count=int(np.prod(shape)), offset=offset)
+            offset += array.nbytes
+            return array.reshape(shape)
+
+        t: np.ndarray = take('<f8', (points,))
+        norad_ids: np.ndarray = take('<u4', (satellites,))
+        footprint_index: np.ndarray = take('<u4', (footprint_points,))
+        lat: np.ndarray = take('<f4', (satellites, points))
+        lon: np.ndarray = take('<f4', (satellites, points))
+        alt: np.ndarray = take('<f4', (satellites, points))
+        footprints: np.ndarray = take('<f4', (satellites, footprint_points, vertices, 2))
+        return cls(norad_ids, t, footprint_index, lat, lon, alt, footprints)
+
+    def to_bytes(self) -> bytes:
+        header: bytes = self.HEADER.pack(b'GTRK', len(self.norad_ids), len(self.t), len(self.footprint_index),
+                                         self.footprints.shape[2])
+        return header + b''.join(np.ascontiguousarray(array, dtype=dtype).tobytes()
+                                 for array, dtype in ((self.t, '<f8'), (self.norad_ids, '<u4'),
+                                                      (self.footprint_index, '<u4'), (self.lat, '<f4'),
+                                                      (self.lon, '<f4'), (self.alt, '<f4'), (self.footprints, '<f4')))
+
+    def __len__(self) -> int:
+        return len(self.norad_ids)
+
+    def __repr__(self) -> str:
+        return f'GroundTracks(satellites={len(self.norad_ids)}, points={len(self.t)}, ' \
+               f'footprints={self.footprints.shape[1]}x{self.footprints.shape[2]})'
+
+
+_cache: GroundTrackCache | None = None
+_cache_lock: threading.Lock = threading.Lock()
+
+
+def get_ground_track_cache() -> GroundTrackCache:
+    global _cache  # pylint: disable=global-statement
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GroundTrackCache()
+    return _cache
+
+
+def ground_tracks(names: list[str], t_1: float, t_2: float, points: int = 500, footprint_points: int = 1,
+                  footprint_vertices: int = 36, min_elevation: float = DEFAULT_HORIZON_DEGREES,
+                  local_tle: bool = True, use_cache: bool = True, nearest_tle: bool = False) -> GroundTracks:
+    """Sub-satellite tracks and visibility footprints of satellites over a time window.
+    The window is sampled by exactly `points` evenly spaced times, so the output size does not depend on window
+    length. Tracks are cached per satellite and TLE epoch, only missed satellites are propagated, all of them by
+    single sgp4 call.
+
+    Args:
+        names (list[str]): satellite names.
+        t_1 (float): POSIX start time.
+        t_2 (float): POSIX finish time.
+        points (int, optional): points of every track. Defaults to 500.
+        footprint_points (int, optional): evenly spaced track points with footprints, 1 - at `t_1` only.
+        Defaults to 1.
+        footprint_vertices (int, optional): vertices of every footprint polygon. Defaults to 36.
+        min_elevation (float, optional): elevation of footprint edge in degrees. Defaults to DEFAULT_HORIZON_DEGREES.
+        local_tle (bool, optional): use local TLE catalog or request Celestrak. Defaults to True.
+        use_cache (bool, optional): use and fill the track cache. Defaults to True.
+        nearest_tle (bool, optional): use element sets with epoch closest to the middle of the window from TLE
+        history, see get_satellite(). Defaults to False.
+
+    Raises:
+        ValueError: when some satellite is not found or the window is empty.
+
+    Returns:
+        GroundTracks: tracks in the order of `names`.
+    """
+    if t_2 <= t_1 or points < 1:
+        raise ValueError(f'Empty ground track window {t_1} - {t_2} with {points} points')
+    satellites: list[EarthSatellite] = []
+    for name in names:
+        satellite: EarthSatellite | None = get_satellite(name, local_tle, (t_1 + t_2) / 2 if nearest_tle else None)
+        if satellite is None:
+            raise ValueError(f'Unknown satellite {name}')
+        satellites.append(satellite)
+    t_points: np.ndarray = np.linspace(t_1, t_2, points)
+    cache: GroundTrackCache = get_ground_track_cache()
+    keys: list[TrackKey] = [TrackKey(satellite.model.satnum, tle_epoch(satellite), float(t_1), float(t_2), points,
+                                     footprint_points, footprint_vertices, float(min_elevation))
+                            for satellite in satellites]
+    tracks: list[SatelliteTrack | None] = [cache.get(key) if use_cache else None for key in keys]
+    missed: list[int] = [i for i, track in enumerate(tracks) if track is None]
+    for i, track in zip(missed, compute_tracks([satellites[i] for i in missed], t_points, footprint_points,
+                                               footprint_vertices, min_elevation)):
+        tracks[i] = track
+        if use_cache:
+            cache.put(keys[i], track)
+    return GroundTracks.from_tracks([key.norad_id for key in keys], t_points,
+                                    footprint_indices(points, footprint_points), tracks, footprint_vertices)
+
+
+if __name__ == '__main__':
+    # benchmark: batch tracks vs skyfield subpoint() per satellite, cache hits and blob size
+    # python -m ground_station.propagator.ground_track [satellites number] [points]
+    import contextlib
+    import io
+    import sys
+    import time
+    from skyfield.toposlib import wgs84
+
+    sat_number: int = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    track_points: int = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    sat_names: list[str] = [record.name for record in get_context().catalog.records()[:sat_number]]
+    window_start: float = time.time()
+    window_finish: float = window_start + 3 * 3600
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_time: float = time.perf_counter()
+        result: GroundTracks = ground_tracks(sat_names, window_start, window_finish, track_points, footprint_points=10)
+        batch_time: float = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        cached: GroundTracks = ground_tracks(sat_names, window_start, window_finish, track_points, footprint_points=10)
+        cached_time: float = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        skyfield_t = posix_to_time(get_context().timescale, result.t)
+        max_error: float = 0.0
+        for sat_index, sat_name in enumerate(sat_names):
+            subpoint = wgs84.subpoint_of(get_sat_from_local_tle_file(sat_name.upper()).at(skyfield_t))
+            lon_error: np.ndarray = np.abs(wrap_longitude(subpoint.longitude.degrees - result.lon[sat_index]))
+            max_error = max(max_error, float(np.nanmax(np.abs(subpoint.latitude.degrees - result.lat[sat_index]))),
+                            float(np.nanmax(lon_error)))
+        skyfield_time: float = time.perf_counter() - start_time
+    blob: bytes = result.to_bytes()
+    restored: GroundTracks = GroundTracks.from_bytes(blob)
+    assert np.array_equal(restored.lat, result.lat, equal_nan=True)
+    assert np.array_equal(restored.footprints, result.footprints, equal_nan=True)
+    print(result)
+    print(f'batch:    {batch_time * 1000:8.2f} ms')
+    print(f'cached:   {cached_time * 1000:8.2f} ms, hits {get_ground_track_cache().hits}')
+    print(f'skyfield: {skyfield_time * 1000:8.2f} ms, max difference {max_error:.2e} degrees')
+    print(f'blob: {len(blob) / 1024:.1f} KiB, JSON of floats would be ~{result.lat.size * 3 * 20 / 1024:.0f} KiB '
+          'without footprints')
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import hashlib
+import numpy as np
+
+
+# horizon of stations without mask file, the same value was used for all stations before masks
+DEFAULT_HORIZON_DEGREES: float = 3
+
+
+class HorizonMask:
+    """Minimal visible elevation as a function of azimuth. Values between knots are interpolated linearly,
+    the mask is periodic, so the last knot is connected with the first one over 360 degrees.
+
+    Mask file is a text file with "azimuth elevation" pair in degrees on each line, '#' starts a comment:
+        # NSU roof, measured 2022-11-10
+        0    3
+        45   12.5
+        60   3
+    """
+    def __init__(self, azimuth: np.ndarray | list[float], elevation: np.ndarray | list[float]) -> None:
+        azimuth = np.asarray(azimuth, dtype=float) % 360
+        elevation = np.asarray(elevation, dtype=float)
+        if azimuth.ndim != 1 or azimuth.shape != elevation.shape or len(azimuth) == 0:
+            raise ValueError('Horizon mask must have the same number of azimuth and elevation values')
+        order: np.ndarray = np.argsort(azimuth, kind='stable')
+        self.azimuth: np.ndarray = azimuth[order]
+        self.elevation: np.ndarray = elevation[order]
+        self.min_elevation: float = float(self.elevation.min())
+        self.max_elevation: float = float(self.elevation.max())
+        self.digest: str = hashlib.sha1(self.azimuth.tobytes() + self.elevation.tobytes()).hexdigest()[:10]
+
+    @classmethod
+    def flat(cls, elevation: float = DEFAULT_HORIZON_DEGREES) -> HorizonMask:
+        return cls([0.0], [elevation])
+
+    @classmethod
+    def load(cls, path: str) -> HorizonMask:
+        with open(path, 'r', encoding='utf-8') as mask_file:
+            rows: list[list[float]] = [[float(value) for value in line.split('#')[0].split()]
+                                       for line in mask_file if line.split('#')[0].strip()]
+        if any(len(row) != 2 for row in rows):
+            raise ValueError(f'Incorrect horizon mask file {path}: every line must contain azimuth and elevation')
+        azimuth, elevation = zip(*rows) if rows else ((), ())
+        return cls(list(azimuth), list(elevation))
+
+    @property
+    def is_flat(self) -> bool:
+        return self.min_elevation == self.max_elevation
+
+    def __call__(self, azimuth: np.ndarray | float) -> np.ndarray:
+        """Mask elevation at given azimuth(s) in degrees."""
+        if self.is_flat:
+            return np.full(np.shape(azimuth), self.min_elevation)
+        return np.interp(np.asarray(azimuth) % 360, self.azimuth, self.elevation, period=360)
+
+    def margin(self, altitude: np.ndarray, azimuth: np.ndarray) -> np.ndarray:
+        """Height over the mask in degrees, positive when satellite is visible."""
+        return np.asarray(altitude) - self(azimuth)
+
+    def is_visible(self, altitude: np.ndarray, azimuth: np.ndarray) -> np.ndarray:
+        return self.margin(altitude, azimuth) > 0
+
+    def __repr__(self) -> str:
+        return f'HorizonMask({len(self.azimuth)} knots, elevation from {self.min_elevation} to {self.max_elevation})'
+
+
+if __name__ == '__main__':
+    # time lost behind obstructions and cost of mask-aware prediction
+    # python -m ground_station.propagator.horizon_mask [mask file] [satellites number] [days]
+    import sys
+    import time
+    from ground_station.propagator.context import get_context
+    from ground_station.propagator.propagate import find_passes
+
+    test_mask: HorizonMask = HorizonMask.load(sys.argv[1]) if len(sys.argv) > 1 \
+        else HorizonMask([0, 40, 60, 80, 180, 200, 300], [3, 3, 25, 3, 3, 15, 3])
+    sat_number: int = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    days: int = int(sys.argv[3]) if len(sys.argv) > 3 else 7
+    context = get_context()
+    ts_1 = context.timescale.now()
+    ts_2 = context.timescale.tt_jd(ts_1.tt + days)
+    observer = context.observers['NSU']
+    flat_time: float = 0.0
+    masked_time: float = 0.0
+    flat_duration: float = 0.0
+    masked_duration: float = 0.0
+    for record in context.catalog.records()[:sat_number]:
+        satellite = context.catalog.get_by_name(record.name)
+        start_time: float = time.perf_counter()
+        flat_passes: np.ndarray = find_passes(satellite, observer, ts_1, ts_2, altitude_degrees=test_mask.min_elevation)
+        flat_time += time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        masked_passes: np.ndarray = find_passes(satellite, observer, ts_1, ts_2, mask=test_mask)
+        masked_time += time.perf_counter() - start_time
+        flat_duration += flat_passes['duration'].sum()
+        masked_duration += masked_passes['duration'].sum()
+    print(test_mask)
+    print(f'{sat_number} satellites, {days} days: {flat_duration / 60:.0f} min above {test_mask.min_elevation} deg, '
+          f'{masked_duration / 60:.0f} min above the mask')
+    print(f'flat horizon: {flat_time:.3f} sec, horizon mask: {masked_time:.3f} sec')
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, NamedTuple
+import numpy as np
+from skyfield.sgp4lib import EarthSatellite
+from skyfield.timelib import Time, Timescale
+from skyfield.toposlib import GeographicPosition
+from ground_station.propagator.context import OBSERVERS, PropagationContext, get_context
+from ground_station.propagator.horizon_mask import HorizonMask
+from ground_station.propagator.propagate import (DAY_OVERLAP, convert_time_args, find_passes, get_satellite,
+                                                 mask_passes, passes_to_dicts)
+
+
+class PredictionUnit(NamedTuple):
+    sat_name: str
+    observer: str
+    start: datetime  # chunk start, UTC
+    finish: datetime  # chunk finish, UTC
+    window_start: datetime  # requested time range, passes outside of it are dropped
+    window_finish: datetime
+    local_tle: bool = True
+    nearest_tle: bool = False  # element set with epoch closest to the middle of the requested time range
+
+
+# observers of the worker process, they are set once by init_worker()
+_worker_observers: dict[str, GeographicPosition] = {}
+
+
+def init_worker(observers: dict[str, GeographicPosition]) -> None:
+    """ProcessPoolExecutor initializer: load timescale and TLE catalog once per worker process."""
+    global _worker_observers  # pylint: disable=global-statement
+    _worker_observers = observers
+    get_context().warm_up()
+
+
+def predict_unit(unit: PredictionUnit) -> list[dict[str, Any]]:
+    """Find passes of one satellite over one observer which rise above the lowest point of the horizon mask inside
+    of the unit chunk. All visible segments of such passes belong to the chunk, even those after its finish, so
+    a pass split by the mask at the chunk boundary is not lost between chunks."""
+    context: PropagationContext = get_context()
+    timescale: Timescale = context.timescale
+    observer: GeographicPosition = (_worker_observers or context.observers)[unit.observer]
+    # all chunks of the range take the same element set, see get_satellite()
+    middle: float | None = (unit.window_start.timestamp() + unit.window_finish.timestamp()) / 2 \
+        if unit.nearest_tle else None
+    satellite: EarthSatellite | None = get_satellite(unit.sat_name, unit.local_tle, middle)
+    if satellite is None:
+        raise ValueError(f'Unknown satellite {unit.sat_name}')
+    # search a bit longer than the chunk to find the end of the last pass started inside of the chunk
+    ts_1: Time = timescale.from_datetime(unit.start)
+    ts_2: Time = timescale.from_datetime(min(unit.finish + DAY_OVERLAP, unit.window_finish))
+    mask: HorizonMask = context.horizon_mask(unit.observer)
+    passes: np.ndarray = find_passes(satellite, observer, ts_1, ts_2, altitude_degrees=mask.min_elevation)
+    passes = passes[(passes['start'] >= max(unit.start, unit.window_start).timestamp()) &
+                    (passes['start'] < unit.finish.timestamp())]
+    event_dict_list: list[dict[str, Any]] = passes_to_dicts(mask_passes(satellite, observer, passes, mask, timescale),
+                                                            unit.observer)
+    for event_dict in event_dict_list:
+        event_dict['sat_name'] = unit.sat_name
+    return event_dict_list
+
+
+def split_into_units(names: list[str], observers: list[str], t_1: datetime, t_2: datetime,
+                     chunk: timedelta = timedelta(days=1), local_tle: bool = True,
+                     nearest_tle: bool = False) -> list[PredictionUnit]:
+    """Split prediction into (satellite, observer, time chunk) work units."""
+    units: list[PredictionUnit] = []
+    chunk_start: datetime = t_1
+    while chunk_start < t_2:
+        chunk_finish: datetime = min(chunk_start + chunk, t_2)
+        units.extend(PredictionUnit(name.upper(), observer, chunk_start, chunk_finish, t_1, t_2, local_tle,
+                                    nearest_tle)
+                     for name in names for observer in observers)
+        chunk_start = chunk_finish
+    return units
+
+
+class PredictionPool:
+    """Pool of worker processes for pass prediction. Every worker keeps its own loaded timescale and TLE catalog,
+    so the pool should be created once and reused.
+
+    Example:
+        with PredictionPool(max_workers=4) as pool:
+            sessions = pool.get_sessions(['NORBI'], '2022-12-20', '2022-12-27')
+    """
+    def __init__(self, max_workers: int | None = None, observers: dict[str, GeographicPosition] | None = None,
+                 chunk: timedelta = timedelta(days=1)) -> None:
+        self.max_workers: int = max_workers or os.cpu_count() or 1
+        self.observers: dict[str, GeographicPosition] = observers if observers is not None else OBSERVERS
+        self.chunk: timedelta = chunk
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker,
+                                                 initargs=(self.observers,))
+        return self._executor
+
+    def get_sessions(self, names: list[str], t_1: date | str, t_2: date | str | None = None,
+                     local_tle: bool = True, nearest_tle: bool = False) -> list[dict[str, Any]]:
+        """Parallel version of get_sessions_for_sat() for several satellites and all pool observers. With
+        `nearest_tle` element sets with epoch closest to the middle of the time range are taken from TLE history.
+
+        Returns:
+            list[dict[str, Any]]: passes of all satellites over all observers ordered by start time.
+            Each pass has additional 'sat_name' key.
+        """
+        ts_1, ts_2 = convert_time_args(t_1, t_2)
+        units: list[PredictionUnit] = split_into_units(names, list(self.observers), ts_1.utc_datetime(),
+                                                       ts_2.utc_datetime(), self.chunk, local_tle, nearest_tle)
+        chunksize: int = max(len(units) // (self.max_workers * 4), 1)
+        passes: list[dict[str, Any]] = [event_dict for unit_passes in self.executor.map(predict_unit, units,
+                                                                                         chunksize=chunksize)
+                                        for event_dict in unit_passes]
+        passes.sort(key=lambda event_dict: (event_dict['start_time'], event_dict['station']))
+        return passes
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> PredictionPool:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+
+if __name__ == '__main__':
+    # benchmark of throughput scaling with number of worker processes
+    # python -m ground_station.propagator.parallel_propagate [satellites number] [days]
+    import sys
+    import time
+    from skyfield.toposlib import wgs84
+
+    sat_number: int = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    days: int = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    sat_names: list[str] = [record.name for record in get_context().catalog.records()[:sat_number]]
+    stations: dict[str, GeographicPosition] = {'NSU': OBSERVERS['NSU'],
+                                               'Krasnoyarsk': wgs84.latlon(56.010041, 92.852069),
+                                               'Moscow': wgs84.latlon(55.4507, 37.3656)}
+    first_day: date = datetime.now(timezone.utc).date()
+    last_day: date = first_day + timedelta(days=days)
+    cpu_count: int = os.cpu_count() or 1
+    workers_list: list[int] = sorted({2 ** power for power in range(cpu_count.bit_length()) if 2 ** power <= cpu_count}
+                                     | {cpu_count})
+    print(f'{len(sat_names)} satellites, {len(stations)} observers, {days} days')
+    single_time: float | None = None
+    for workers in workers_list:
+        with PredictionPool(max_workers=workers, observers=stations) as pool:
+            list(pool.executor.map(time.sleep, [0.2] * workers))  # start workers before measurement
+            start_time: float = time.perf_counter()
+            sessions: list[dict[str, Any]] = pool.get_sessions(sat_names, first_day, last_day)
+            elapsed: float = time.perf_counter() - start_time
+        single_time = single_time or elapsed
+        print(f'workers: {workers:2d}  time: {elapsed:7.3f} sec  sessions: {len(sessions)}  '
+              f'throughput: {len(sat_names) * len(stations) * days / elapsed:8.1f} sat*station*day/sec  '
+              f'speedup: {single_time / elapsed:.2f}x')
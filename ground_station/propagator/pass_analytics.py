@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any
+import numpy as np
+from skyfield.sgp4lib import EarthSatellite
+from skyfield.timelib import Time, Timescale
+from skyfield.toposlib import GeographicPosition
+from ground_station.lora import lora_airtime
+from ground_station.propagator.context import get_context
+from ground_station.propagator.frames import observer_frame, posix_to_time, sgp4_time_args, teme_to_itrs
+from ground_station.propagator.propagate import get_sat_from_local_tle_file, request_celestrak_sat_tle
+
+
+def metrics_dtype(mask_count: int) -> np.dtype:
+    """Row of the pass table: POSIX times, max altitude in degrees, min slant range in km, seconds above every
+    elevation mask and number of LoRa packets which fit into the time above the link mask."""
+    return np.dtype([('sat_name', 'U32'), ('station', 'U32'), ('start', 'f8'), ('finish', 'f8'),
+                     ('duration', 'f8'), ('max_altitude', 'f8'), ('min_range_km', 'f8'),
+                     ('time_above', 'f8', (mask_count,)), ('packets', 'i8')])
+
+
+def packet_interval(packet_size: int, packet_gap: float = 0.0, spread_factor: int = 10, bandwidth_hz: float = 250e3,
+                    coding_rate: int = 5) -> float:
+    """Seconds per packet: time on air plus a gap between packets. Defaults are the settings of RadioController,
+    low data rate optimization is forced as in RadioController.calculate_packet()."""
+    return lora_airtime(packet_size, spread_factor, bandwidth_hz, coding_rate,
+                        low_datarate_optimize=True).Tpkt / 1000 + packet_gap
+
+
+def analyze_passes(sessions: list[dict[str, Any]], masks: tuple[float, ...] = (10, 20, 30), link_mask: float = 10,
+                   step: float = 1.0, packet_size: int = 64, packet_gap: float = 0.0,
+                   spread_factor: int = 10, bandwidth_hz: float = 250e3, coding_rate: int = 5,
+                   local_tle: bool = True) -> np.ndarray:
+    """Quality metrics of many passes at once. Every pass window is sampled with `step` and all windows of the same
+    satellite are propagated by single vectorized sgp4 call, metrics are reduced per pass with numpy.
+
+    Args:
+        sessions (list[dict[str, Any]]): passes with 'sat_name', 'station', 'start_time' and 'finish_time', e.g.
+        result of PredictionPool.get_sessions().
+        masks (tuple[float, ...], optional): elevation masks in degrees for time_above. Defaults to (10, 20, 30).
+        link_mask (float, optional): elevation from which radio link is expected. Defaults to 10.
+        step (float, optional): sampling step in seconds. Defaults to 1.0.
+        packet_size (int, optional): LoRa payload size in bytes. Defaults to 64.
+        packet_gap (float, optional): pause between packets in seconds. Defaults to 0.0.
+        spread_factor (int, optional): LoRa spreading factor. Defaults to 10.
+        bandwidth_hz (float, optional): LoRa bandwidth in Hz. Defaults to 250e3.
+        coding_rate (int, optional): denominator of LoRa coding rate 4/5..4/8. Defaults to 5.
+        local_tle (bool, optional): use local TLE catalog or request Celestrak. Defaults to True.
+
+    Returns:
+        np.ndarray: table of metrics_dtype() rows in the order of `sessions`.
+    """
+    context = get_context()
+    timescale: Timescale = context.timescale
+    table: np.ndarray = np.zeros(len(sessions), dtype=metrics_dtype(len(masks)))
+    if not sessions:
+        return table
+    table['sat_name'] = [session['sat_name'] for session in sessions]
+    table['station'] = [session['station'] for session in sessions]
+    table['start'] = [datetime.fromisoformat(session['start_time']).timestamp() for session in sessions]
+    table['finish'] = [datetime.fromisoformat(session['finish_time']).timestamp() for session in sessions]
+    table['duration'] = table['finish'] - table['start']
+    thresholds: np.ndarray = np.array([*masks, link_mask], dtype=float)
+    time_above_link: np.ndarray = np.zeros(len(sessions))
+
+    for sat_name in np.unique(table['sat_name']):
+        satellite: EarthSatellite | None = get_sat_from_local_tle_file(sat_name) if local_tle \
+            else request_celestrak_sat_tle(sat_name)
+        if satellite is None:
+            raise ValueError(f'Unknown satellite {sat_name}')
+        rows: np.ndarray = np.flatnonzero(table['sat_name'] == sat_name)
+        # sample counts of every window and one time grid for all of them
+        counts: np.ndarray = np.floor(table['duration'][rows] / step).astype(np.int64) + 1
+        offsets: np.ndarray = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sample_index: np.ndarray = np.arange(counts.sum()) - np.repeat(offsets, counts)
+        t_points: np.ndarray = np.repeat(table['start'][rows], counts) + sample_index * step
+        time_points: Time = posix_to_time(timescale, t_points)
+        jd_whole, fraction, ut1_fraction = sgp4_time_args(time_points)
+        _, r_teme, _ = satellite.model.sgp4_array(jd_whole, fraction)
+        r_itrs: np.ndarray = teme_to_itrs(r_teme, jd_whole, ut1_fraction)
+        for station in np.unique(table['station'][rows]):
+            station_rows: np.ndarray = table['station'][rows] == station
+            observer: GeographicPosition = context.observers[str(station)]
+            observer_xyz, up = observer_frame(observer)
+            samples: np.ndarray = np.repeat(station_rows, counts)
+            relative: np.ndarray = r_itrs[samples] - observer_xyz
+            distance: np.ndarray = np.sqrt(np.einsum('ij,ij->i', relative, relative))
+            elevation: np.ndarray = np.degrees(np.arcsin(np.clip(relative @ up / distance, -1.0, 1.0)))
+            station_offsets: np.ndarray = np.concatenate(([0], np.cumsum(counts[station_rows])[:-1]))
+            target: np.ndarray = rows[station_rows]
+            table['max_altitude'][target] = np.maximum.reduceat(elevation, station_offsets)
+            table['min_range_km'][target] = np.minimum.reduceat(distance, station_offsets)
+            above: np.ndarray = np.add.reduceat((elevation[:, None] >= thresholds).astype(np.int64), station_offsets,
+                                                axis=0) * step
+            table['time_above'][target] = above[:, :-1]
+            time_above_link[target] = above[:, -1]
+    interval: float = packet_interval(packet_size, packet_gap, spread_factor, bandwidth_hz, coding_rate)
+    table['packets'] = np.floor(time_above_link / interval)
+    return table
+
+
+def rank_passes(table: np.ndarray) -> np.ndarray:
+    """Order pass table by expected data volume, then by max altitude, the best pass is the first."""
+    return table[np.lexsort((-table['max_altitude'], -table['packets']))]
+
+
+def table_to_dicts(table: np.ndarray, masks: tuple[float, ...] = (10, 20, 30)) -> list[dict[str, Any]]:
+    """Convert pass table to the API dicts, `masks` must be the same as in analyze_passes()."""
+    rows: list[dict[str, Any]] = []
+    for row in table.tolist():
+        sat_name, station, start, finish, duration, max_altitude, min_range, time_above, packets = row
+        rows.append({'sat_name': sat_name, 'station': station,
+                     'start_time': str(datetime.fromtimestamp(start, timezone.utc)),
+                     'finish_time': str(datetime.fromtimestamp(finish, timezone.utc)),
+                     'duration_sec': int(duration), 'max_altitude': round(max_altitude, 2),
+                     'min_range_km': round(min_range, 1),
+                     'time_above_sec': {str(mask): float(value) for mask, value in zip(masks, time_above)},
+                     'packets': packets})
+    return rows
+
+
+if __name__ == '__main__':
+    # ranked passes of several satellites and time of analytics
+    # python -m ground_station.propagator.pass_analytics [satellites number] [days]
+    import contextlib
+    import io
+    import sys
+    import time
+    from datetime import date, timedelta
+    from ground_station.propagator.batch_propagate import get_sessions_for_sats
+
+    sat_number: int = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    days: int = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    sat_names: list[str] = [record.name for record in get_context().catalog.records()[:sat_number]]
+    with contextlib.redirect_stdout(io.StringIO()):
+        sessions_by_sat = get_sessions_for_sats(sat_names, get_context().observers, date.today(),
+                                                date.today() + timedelta(days=days))
+        all_sessions: list[dict[str, Any]] = [{**session, 'sat_name': name}
+                                              for name, sat_sessions in sessions_by_sat.items()
+                                              for session in sat_sessions]
+        analyze_passes(all_sessions[:1])  # load TLE catalog before measurement
+        start_time: float = time.perf_counter()
+        pass_table: np.ndarray = rank_passes(analyze_passes(all_sessions))
+        elapsed: float = time.perf_counter() - start_time
+    print(f'{len(pass_table)} passes analyzed in {elapsed * 1000:.1f} ms')
+    for pass_row in table_to_dicts(pass_table[:10]):
+        print(pass_row)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple, Protocol
+from ground_station.propagator.tle_history import tle_epoch_posix
+
+
+class PassKey(NamedTuple):
+    norad_id: int
+    tle_epoch: str  # epoch field of TLE line 1, e.g. '22354.51097222'
+    observer: str
+    day: str  # UTC day in ISO format
+
+
+class PassStore(Protocol):
+    def get(self, key: PassKey) -> list[dict[str, Any]] | None: ...
+
+    def put(self, key: PassKey, passes: list[dict[str, Any]]) -> None: ...
+
+    def invalidate(self, norad_id: int, keep_epoch: str | None = None) -> None: ...
+
+
+class DiskPassStore:
+    """JSON files in `directory`/<NORAD ID>/<TLE epoch>/<observer>_<day>.json"""
+    def __init__(self, directory: str) -> None:
+        self.directory: str = directory
+
+    def _path(self, key: PassKey) -> str:
+        return os.path.join(self.directory, str(key.norad_id), key.tle_epoch, f'{key.observer}_{key.day}.json')
+
+    def get(self, key: PassKey) -> list[dict[str, Any]] | None:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as pass_file:
+                return json.load(pass_file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: PassKey, passes: list[dict[str, Any]]) -> None:
+        path: str = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path: str = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as pass_file:
+                json.dump(passes, pass_file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as err:
+            print(f'Can not save passes {key}: {err}')
+
+    def invalidate(self, norad_id: int, keep_epoch: str | None = None) -> None:
+        sat_dir: str = os.path.join(self.directory, str(norad_id))
+        if not os.path.isdir(sat_dir):
+            return
+        for epoch in os.listdir(sat_dir):
+            if epoch != keep_epoch:
+                shutil.rmtree(os.path.join(sat_dir, epoch), ignore_errors=True)
+
+
+class RedisPassStore:
+    """Passes are stored as JSON strings under '<prefix>:<NORAD ID>:<TLE epoch>:<observer>:<day>' keys."""
+    def __init__(self, url: str = 'redis://localhost:6379/1', prefix: str = 'passes', expire_sec: int = 14 * 86400,
+                 client: Any = None) -> None:
+        if client is None:
+            import redis  # pylint: disable=import-outside-toplevel
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix: str = prefix
+        self.expire_sec: int = expire_sec
+
+    def _key(self, key: PassKey) -> str:
+        return f'{self.prefix}:{key.norad_id}:{key.tle_epoch}:{key.observer}:{key.day}'
+
+    def get(self, key: PassKey) -> list[dict[str, Any]] | None:
+        value: bytes | None = self.client.get(self._key(key))
+        return json.loads(value) if value is not None else None
+
+    def put(self, key: PassKey, passes: list[dict[str, Any]]) -> None:
+        self.client.set(self._key(key), json.dumps(passes, ensure_ascii=False), ex=self.expire_sec)
+
+    def invalidate(self, norad_id: int, keep_epoch: str | None = None) -> None:
+        keep_prefix: str = f'{self.prefix}:{norad_id}:{keep_epoch}:'
+        stale_keys: list[bytes] = [redis_key for redis_key in self.client.scan_iter(f'{self.prefix}:{norad_id}:*')
+                                   if not redis_key.decode().startswith(keep_prefix)]
+        if stale_keys:
+            self.client.delete(*stale_keys)
+
+
+class PassCache:
+    """Two-level cache of predicted passes: LRU dict in memory and optional persistent `store` (disk or Redis).
+    Entries are keyed by satellite NORAD ID, TLE epoch, observer and UTC day. get() returns copies of pass dicts, so
+    callers may change them without touching the cache. The first request with a TLE epoch newer
+    than the known one removes entries with other epochs of this satellite only. Requests with older epochs, e.g.
+    historical element sets, neither drop the entries of the current epoch nor replace it.
+    """
+    def __init__(self, store: PassStore | None = None, max_entries: int = 4096) -> None:
+        self.store: PassStore | None = store
+        self.max_entries: int = max_entries
+        self._memory: OrderedDict[PassKey, list[dict[str, Any]]] = OrderedDict()
+        self._epochs: dict[int, str] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: PassKey) -> list[dict[str, Any]] | None:
+        self._check_epoch(key)
+        with self._lock:
+            passes: list[dict[str, Any]] | None = self._memory.get(key)
+            if passes is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return [dict(event_dict) for event_dict in passes]
+        if self.store is not None:
+            passes = self.store.get(key)
+            if passes is not None:
+                self._remember(key, passes)
+                self.hits += 1
+                return [dict(event_dict) for event_dict in passes]
+        self.misses += 1
+        return None
+
+    def put(self, key: PassKey, passes: list[dict[str, Any]]) -> None:
+        self._check_epoch(key)
+        self._remember(key, [dict(event_dict) for event_dict in passes])
+        if self.store is not None:
+            self.store.put(key, passes)
+
+    def invalidate(self, norad_id: int, keep_epoch: str | None = None) -> None:
+        with self._lock:
+            for key in [key for key in self._memory if key.norad_id == norad_id and key.tle_epoch != keep_epoch]:
+                del self._memory[key]
+        if self.store is not None:
+            self.store.invalidate(norad_id, keep_epoch)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._epochs.clear()
+
+    def _remember(self, key: PassKey, passes: list[dict[str, Any]]) -> None:
+        with self._lock:
+            self._memory[key] = passes
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _check_epoch(self, key: PassKey) -> None:
+        with self._lock:
+            previous_epoch: str | None = self._epochs.get(key.norad_id)
+            if previous_epoch is not None and tle_epoch_posix(key.tle_epoch) <= tle_epoch_posix(previous_epoch):
+                return
+            self._epochs[key.norad_id] = key.tle_epoch
+        if previous_epoch is not None:
+            print(f'New TLE epoch {key.tle_epoch} of {key.norad_id}. Drop passes for epoch {previous_epoch}')
+        self.invalidate(key.norad_id, keep_epoch=key.tle_epoch)
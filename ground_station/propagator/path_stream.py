@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from queue import Empty, Full, Queue
+from typing import Iterator
+import numpy as np
+from skyfield.sgp4lib import EarthSatellite
+from skyfield.timelib import Timescale
+from skyfield.toposlib import GeographicPosition
+from ground_station.propagator.context import get_context
+from ground_station.propagator.propagate import (SatellitePath, get_sat_from_local_tle_file,
+                                                 request_celestrak_sat_tle)
+from ground_station.propagator.trajectory import propagate_path
+
+
+class PathStream:
+    """Path source which propagates the satellite in fixed-size chunks on a background thread.
+
+    The thread starts in the constructor and keeps at most `prefetch` chunks ahead of the consumer, so memory does not
+    depend on the window length and the first points are ready long before the session starts. Without `t_2` the
+    stream is endless, e.g. for continuous tracking of GEO object.
+
+    Example:
+        with PathStream.for_session('NORBI', 'NSU', start, finish) as stream:
+            for altitude, azimuth, time_point in stream:
+                ...
+    """
+    def __init__(self, satellite: EarthSatellite, observer: GeographicPosition, t_1: float, t_2: float | None = None,
+                 sampling_rate: float = 3.3333, chunk_size: int = 256, prefetch: int = 2,
+                 timescale: Timescale | None = None) -> None:
+        """
+        Args:
+            satellite (EarthSatellite): satellite.
+            observer (GeographicPosition): station.
+            t_1 (float): POSIX time of the first point.
+            t_2 (float | None, optional): POSIX time of the end of the window, None for endless stream.
+            sampling_rate (float, optional): points per second. Defaults to 3.3333.
+            chunk_size (int, optional): points per chunk. Defaults to 256.
+            prefetch (int, optional): number of chunks computed ahead of the consumer. Defaults to 2.
+            timescale (Timescale | None, optional): Defaults to timescale of the propagation context.
+        """
+        if chunk_size < 1 or prefetch < 1 or sampling_rate <= 0:
+            raise ValueError('chunk_size, prefetch and sampling_rate must be positive')
+        self.satellite: EarthSatellite = satellite
+        self.observer: GeographicPosition = observer
+        self.t_1: float = t_1
+        self.t_2: float | None = t_2
+        self.sampling_rate: float = sampling_rate
+        self.chunk_size: int = chunk_size
+        self.point_count: int | None = None if t_2 is None else int(np.floor((t_2 - t_1) * sampling_rate)) + 1
+        self.timescale: Timescale = timescale or get_context().timescale
+        self._queue: Queue = Queue(maxsize=prefetch)
+        self._stop_flag: threading.Event = threading.Event()
+        self._thread: threading.Thread = threading.Thread(name='path stream thread', target=self._produce,
+                                                          daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def for_session(cls, sat: str, observer: str, t_1: datetime, t_2: datetime | None = None,
+                    local_tle: bool = True, **kwargs) -> PathStream:
+        satellite: EarthSatellite | None = get_sat_from_local_tle_file(sat.upper()) if local_tle \
+            else request_celestrak_sat_tle(sat.upper())
+        if satellite is None:
+            raise RuntimeError('Get incorrect sattelite')
+        return cls(satellite, get_context().observers[observer], t_1.timestamp(),
+                   None if t_2 is None else t_2.timestamp(), **kwargs)
+
+    def _produce(self) -> None:
+        start: int = 0
+        try:
+            while not self._stop_flag.is_set() and (self.point_count is None or start < self.point_count):
+                stop: int = start + self.chunk_size if self.point_count is None \
+                    else min(start + self.chunk_size, self.point_count)
+                # time points are calculated from indices, so there is no drift in endless stream
+                t_points: np.ndarray = self.t_1 + np.arange(start, stop) / self.sampling_rate
+                self._put(propagate_path(self.satellite, self.observer, t_points, self.timescale))
+                start = stop
+            self._put(None)
+        except Exception as err:  # pylint: disable=broad-except
+            self._put(err)
+
+    def _put(self, item: SatellitePath | Exception | None) -> None:
+        while not self._stop_flag.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except Full:
+                continue
+
+    def chunks(self) -> Iterator[SatellitePath]:
+        """Chunks of the path in time order. Exception of the background thread is raised here."""
+        while not self._stop_flag.is_set():
+            try:
+                item: SatellitePath | Exception | None = self._queue.get(timeout=0.1)
+            except Empty:
+                continue
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def __iter__(self) -> Iterator[tuple[float, float, float]]:
+        """Iterate over (altitude, azimuth, POSIX time) as SatellitePath does."""
+        for chunk in self.chunks():
+            yield from chunk
+
+    def close(self) -> None:
+        self._stop_flag.set()
+        self._thread.join(1)
+
+    def __enter__(self) -> PathStream:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+if __name__ == '__main__':
+    # time to the first point and peak memory of the stream vs angle_points_for_linspace_time()
+    # python -m ground_station.propagator.path_stream [satellite name] [window minutes]
+    import contextlib
+    import io
+    import sys
+    import time
+    import tracemalloc
+    from datetime import timedelta, timezone
+    from ground_station.propagator.propagate import angle_points_for_linspace_time
+
+    sat_name: str = sys.argv[1] if len(sys.argv) > 1 else 'NORBI'
+    minutes: float = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    session_start: datetime = datetime.now(timezone.utc)
+    session_finish: datetime = session_start + timedelta(minutes=minutes)
+    with contextlib.redirect_stdout(io.StringIO()):
+        get_sat_from_local_tle_file(sat_name)  # load catalog and timescale before measurement
+
+        tracemalloc.start()
+        start_time: float = time.perf_counter()
+        path: SatellitePath = angle_points_for_linspace_time(sat_name, 'NSU', session_start, session_finish)
+        whole_first: float = time.perf_counter() - start_time
+        whole_peak: int = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        first_point: float | None = None
+        point_number: int = 0
+        with PathStream.for_session(sat_name, 'NSU', session_start, session_finish) as stream:
+            for _ in stream:
+                if first_point is None:
+                    first_point = time.perf_counter() - start_time
+                point_number += 1
+        stream_total: float = time.perf_counter() - start_time
+        stream_peak: int = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    print(f'{minutes:.0f} min window, {len(path)} points')
+    print(f'whole path: first point in {whole_first * 1000:8.1f} ms, peak memory {whole_peak / 2 ** 20:6.1f} MiB')
+    print(f'stream:     first point in {(first_point or 0) * 1000:8.1f} ms, '
+          f'peak memory {stream_peak / 2 ** 20:6.1f} MiB, {point_number} points in {stream_total:.2f} sec')
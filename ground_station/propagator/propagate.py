@@ -1,35 +1,40 @@
 from __future__ import annotations
 
-import copy
-import os
+import struct
 import time
 from datetime import date, datetime, timedelta, timezone
-from typing import Any, Literal
-from pytz import utc
-from skyfield.api import load
+from typing import Any, Iterator, Literal
+from skyfield.constants import DAY_S
 from skyfield.sgp4lib import EarthSatellite
 from skyfield.timelib import Time, Timescale
-from skyfield.toposlib import wgs84
 from skyfield.units import Angle, Distance, AngleRate, Velocity
 from skyfield.vectorlib import VectorSum
 from skyfield.positionlib import Geocentric
 from skyfield.toposlib import GeographicPosition
 import numpy as np
+from ground_station.propagator.context import OBSERVERS, get_context
+from ground_station.propagator.frames import topocentric_altaz
+from ground_station.propagator.horizon_mask import HorizonMask
+from ground_station.propagator.pass_cache import PassKey
+from ground_station.propagator.tle_history import tle_epoch_posix
 
 
-OBSERVERS: dict[str, GeographicPosition] = {'NSU': wgs84.latlon(54.842625, 83.095025, 170),
-                                            # 'Красноярск': wgs84.latlon(56.010041, 92.852069),
-                                            # 'Москва': wgs84.latlon(55.4507, 37.3656)
-                                            }
-
-satellites: list[EarthSatellite] = load.tle_file(os.path.join(os.path.dirname(__file__), 'cubesat_tle.txt'))
+# passes that started in the day but finished after midnight are searched in this extra time
+DAY_OVERLAP: timedelta = timedelta(hours=1)
+POSIX_EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# compact pass record: POSIX times, duration in seconds and max altitude in degrees
+PASS_DTYPE: np.dtype = np.dtype([('start', 'f8'), ('culmination', 'f8'), ('finish', 'f8'), ('duration', 'f8'),
+                                 ('max_altitude', 'f8')])
+# passes are sampled with this step to find horizon mask crossings, obstacles narrower in time can be missed
+MASK_SAMPLE_STEP: float = 10.0
+# AOS/LOS over horizon mask are refined by bisection up to this error in seconds
+MASK_TOLERANCE: float = 0.01
 
 
 def get_sat_from_local_tle_file(name: str) -> EarthSatellite | None:
     start_time: float = time.time()
-    try:
-        cubesat: EarthSatellite = list(filter(lambda sat: sat.name == name, satellites))[0]
-    except IndexError:
+    cubesat: EarthSatellite | None = get_context().catalog.get_by_name(name)
+    if cubesat is None:
         return None
     print(f"Tle loading took {time.time() - start_time} seconds")
     return cubesat
@@ -37,16 +42,28 @@ def get_sat_from_local_tle_file(name: str) -> EarthSatellite | None:
 
 def request_celestrak_sat_tle(sat_name: str) -> EarthSatellite | None:
     start_time: float = time.time()
-    try:
-        url = f"https://celestrak.org/NORAD/elements/gp.php?NAME={sat_name}".replace(' ', '%20')
-        cubesat: EarthSatellite = load.tle_file(url, reload=True)[0]
-    except IndexError:
+    cubesat: EarthSatellite | None = get_context().tle_cache.get(sat_name)
+    if cubesat is None:
         return None
     print(f"Tle loading took {time.time() - start_time} seconds")
     print(f'cubesat: {cubesat}')
     return cubesat
 
 
+def get_satellite(name: str, local_tle: bool = True, at: float | None = None) -> EarthSatellite | None:
+    """Current element set of the satellite or, with POSIX time `at`, the one with epoch closest to it among
+    the current element set and TLE history, e.g. to re-propagate past sessions."""
+    satellite: EarthSatellite | None = get_sat_from_local_tle_file(name.upper()) if local_tle \
+        else request_celestrak_sat_tle(name.upper())
+    if satellite is None or at is None:
+        return satellite
+    historical: EarthSatellite | None = get_context().tle_history.satellite(satellite.model.satnum, at, satellite.name)
+    if historical is None:
+        return satellite
+    current_distance: float = abs(tle_epoch_posix(tle_epoch(satellite)) - at)
+    return historical if abs(tle_epoch_posix(tle_epoch(historical)) - at) < current_distance else satellite
+
+
 def convert_time_args(t_1: date | str, t_2: date | str | None = None) -> tuple[Time, Time]:
     """As the frontend pass time arguments in different format, they need to be convertet datetime and
     then to Timescale. This function is auxiliary function for get_sessions_for_sat().
@@ -59,7 +76,7 @@ def convert_time_args(t_1: date | str, t_2: date | str | None = None) -> tuple[T
     Returns:
         tuple[Timescale, Timescale]: converted time values for skyfield propagation.
     """
-    timescale: Timescale = load.timescale()
+    timescale: Timescale = get_context().timescale
     if isinstance(t_1, str):
         t_1 = date.fromisoformat(t_1)
     if isinstance(t_2, str):
@@ -74,64 +91,227 @@ def convert_time_args(t_1: date | str, t_2: date | str | None = None) -> tuple[T
     return t_1_ts, t_2_ts
 
 
-def skip_events_until_start(event_type_list: list[int], event_time_list: list[Time]) -> tuple[list[int], list[Time]]:
-    """Some times propagation may start at moment, when the satellite already at observation point.
-    We will skip this session and wait next.
+def extract_passes(event_types: np.ndarray, event_posix: np.ndarray,
+                   culmination_altitude: np.ndarray | None = None) -> np.ndarray:
+    """Pair raw find_events() results into passes without Python loops.
+    Some times propagation may start at moment, when the satellite already at observation point, or finish before
+    the satellite sets. Such partial sessions are skipped.
 
     Args:
-        event_type_list (list[int]): List of event numbers,
-                                     where 0 - rise above horizone, 1 - culminate, 2 - set below horizone
-        event_time_list (list[Time]): Corresponding time points for events.
+        event_types (np.ndarray): event numbers, where 0 - rise above horizone, 1 - culminate, 2 - set below horizone
+        event_posix (np.ndarray): corresponding POSIX time points.
+        culmination_altitude (np.ndarray | None, optional): altitude of every event in degrees, only culmination
+        values are used. Without it max_altitude of passes is NaN.
 
     Returns:
-        tuple[list[int], list[Time]]: Event list without already running session.
+        np.ndarray: structured array of PASS_DTYPE ordered by start time.
     """
-    while event_type_list[0] != 0:
-        event_type_list = event_type_list[1:]
-        event_time_list = event_time_list[1:]
-        if len(event_type_list) == 0:
-            break
-    return event_type_list, event_time_list
-
-
-def map_events(event_type_list: list[int], event_time_list: list[Time], location_name: str):
-    event_dict: dict[str, datetime | int | str] = {}
-    event_dict_list: list[dict[str, datetime | int | str]] = []
-    for event_type, event_time in zip(event_type_list, event_time_list):
-        if event_type == 0:
-            event_dict['start_time'] = event_time.astimezone(timezone.utc)  # type: ignore
-        elif event_type == 2:
-            event_dict['finish_time'] = event_time.astimezone(timezone.utc)  # type: ignore
-            event_dict['duration_sec'] = (event_dict['finish_time'] - event_dict['start_time']).seconds  # type: ignore
-            event_dict['finish_time'] = str(event_dict['finish_time'])
-            event_dict['start_time'] = str(event_dict['start_time'])
-            event_dict['station'] = location_name
-            event_dict['status'] = 'Available'  # Неопределен
-            event_dict_list.append(copy.copy(event_dict))
+    event_types = np.asarray(event_types)
+    rise_index: np.ndarray = np.flatnonzero(event_types == 0)
+    set_index: np.ndarray = np.flatnonzero(event_types == 2)
+    # the first set after every rise, rises without set are at the end of the window
+    next_set: np.ndarray = np.searchsorted(set_index, rise_index)
+    rise_index = rise_index[next_set < len(set_index)]
+    set_index = set_index[next_set[next_set < len(set_index)]]
+    passes: np.ndarray = np.zeros(len(rise_index), dtype=PASS_DTYPE)
+    passes['start'] = event_posix[rise_index]
+    passes['finish'] = event_posix[set_index]
+    passes['duration'] = passes['finish'] - passes['start']
+    passes['culmination'] = np.nan
+    passes['max_altitude'] = np.nan
+    culmination_index: np.ndarray = np.flatnonzero(event_types == 1)
+    pass_index: np.ndarray = np.searchsorted(rise_index, culmination_index, side='right') - 1
+    inside: np.ndarray = pass_index >= 0
+    inside[inside] = culmination_index[inside] < set_index[pass_index[inside]]
+    culmination_index, pass_index = culmination_index[inside], pass_index[inside]
+    if culmination_altitude is not None and len(culmination_index):
+        altitude: np.ndarray = np.asarray(culmination_altitude)[culmination_index]
+        max_altitude: np.ndarray = np.full(len(passes), -np.inf)
+        np.maximum.at(max_altitude, pass_index, altitude)
+        passes['max_altitude'] = np.where(np.isfinite(max_altitude), max_altitude, np.nan)
+        highest: np.ndarray = altitude == max_altitude[pass_index]
+        culmination_index, pass_index = culmination_index[highest], pass_index[highest]
+    # the first (or the highest) culmination of every pass
+    pass_index, first = np.unique(pass_index, return_index=True)
+    passes['culmination'][pass_index] = event_posix[culmination_index[first]]
+    return passes
+
+
+def passes_to_dicts(passes: np.ndarray, location_name: str) -> list[dict[str, Any]]:
+    """Convert pass records to the session dicts of the API."""
+    event_dict_list: list[dict[str, Any]] = []
+    # rounded to microseconds as skyfield does in Time.astimezone()
+    start_us: list[int] = np.round(passes['start'] * 1e6).astype(np.int64).tolist()
+    finish_us: list[int] = np.round(passes['finish'] * 1e6).astype(np.int64).tolist()
+    for start, finish in zip(start_us, finish_us):
+        start_time: datetime = POSIX_EPOCH + timedelta(microseconds=start)
+        finish_time: datetime = POSIX_EPOCH + timedelta(microseconds=finish)
+        event_dict_list.append({'start_time': str(start_time), 'finish_time': str(finish_time),
+                                'duration_sec': (finish_time - start_time).seconds, 'station': location_name,
+                                'status': 'Available'})  # Неопределен
     return event_dict_list
 
 
+def mask_passes(satellite: EarthSatellite, observer: GeographicPosition, passes: np.ndarray, mask: HorizonMask,
+                timescale: Timescale | None = None, step: float = MASK_SAMPLE_STEP,
+                tolerance: float = MASK_TOLERANCE) -> np.ndarray:
+    """Cut passes found over `mask.min_elevation` down to the time above the horizon mask.
+    All pass windows are sampled with `step` by one sgp4 call and compared with interpolated mask. AOS/LOS times are
+    refined by bisection only in sample intervals where the satellite crosses the mask, all crossings at once, so every
+    bisection iteration is one more vectorized sgp4 call. A pass may split into several segments or disappear.
+
+    Args:
+        satellite (EarthSatellite): satellite.
+        observer (GeographicPosition): station.
+        passes (np.ndarray): passes of PASS_DTYPE found with `altitude_degrees=mask.min_elevation`.
+        mask (HorizonMask): horizon mask of the station.
+        timescale (Timescale | None, optional): Defaults to timescale of the propagation context.
+        step (float, optional): sampling step in seconds. Defaults to MASK_SAMPLE_STEP.
+        tolerance (float, optional): max error of AOS/LOS in seconds. Defaults to MASK_TOLERANCE.
+
+    Returns:
+        np.ndarray: visible segments of PASS_DTYPE. Culmination and max altitude are kept for segments which contain
+        culmination of the pass, they are NaN for other segments.
+    """
+    if mask.is_flat or len(passes) == 0:
+        return passes
+    timescale = timescale or get_context().timescale
+    counts: np.ndarray = np.ceil(passes['duration'] / step).astype(np.int64) + 1
+    offsets: np.ndarray = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    sample_index: np.ndarray = np.arange(counts.sum()) - np.repeat(offsets, counts)
+    t_points: np.ndarray = np.minimum(np.repeat(passes['start'], counts) + sample_index * step,
+                                      np.repeat(passes['finish'], counts))
+    visible: np.ndarray = mask.is_visible(*topocentric_altaz(satellite, observer, t_points, timescale))
+    first: np.ndarray = sample_index == 0
+    last: np.ndarray = np.zeros(len(t_points), dtype=bool)
+    last[offsets + counts - 1] = True
+    previous_visible: np.ndarray = np.concatenate(([False], visible[:-1])) & ~first
+    next_visible: np.ndarray = np.concatenate((visible[1:], [False])) & ~last
+    rise: np.ndarray = np.flatnonzero(visible & ~previous_visible)
+    fall: np.ndarray = np.flatnonzero(visible & ~next_visible)
+
+    # brackets of crossings: (invisible, visible) sample before AOS and (visible, invisible) sample after LOS
+    inner_rise: np.ndarray = rise[~first[rise]]
+    inner_fall: np.ndarray = fall[~last[fall]]
+    lower: np.ndarray = np.concatenate((t_points[inner_rise - 1], t_points[inner_fall]))
+    upper: np.ndarray = np.concatenate((t_points[inner_rise], t_points[inner_fall + 1]))
+    lower_visible: np.ndarray = np.arange(len(lower)) >= len(inner_rise)
+    if len(lower):
+        for _ in range(max(int(np.ceil(np.log2(step / tolerance))), 0)):
+            middle: np.ndarray = (lower + upper) / 2
+            same: np.ndarray = mask.is_visible(*topocentric_altaz(satellite, observer, middle, timescale)) \
+                == lower_visible
+            lower = np.where(same, middle, lower)
+            upper = np.where(same, upper, middle)
+    crossing: np.ndarray = (lower + upper) / 2
+
+    pass_index: np.ndarray = np.searchsorted(offsets, rise, side='right') - 1
+    segments: np.ndarray = np.zeros(len(rise), dtype=PASS_DTYPE)
+    segments['start'] = t_points[rise]
+    segments['start'][~first[rise]] = crossing[:len(inner_rise)]
+    segments['finish'] = t_points[fall]
+    segments['finish'][~last[fall]] = crossing[len(inner_rise):]
+    segments['duration'] = segments['finish'] - segments['start']
+    culmination: np.ndarray = passes['culmination'][pass_index]
+    inside: np.ndarray = (culmination >= segments['start']) & (culmination <= segments['finish'])
+    segments['culmination'] = np.where(inside, culmination, np.nan)
+    segments['max_altitude'] = np.where(inside, passes['max_altitude'][pass_index], np.nan)
+    return segments
+
+
+def find_passes(satellite: EarthSatellite, observer: GeographicPosition, ts_1: Time, ts_2: Time,
+                altitude_degrees: float = 3, with_max_altitude: bool = False,
+                mask: HorizonMask | None = None) -> np.ndarray:
+    """Passes of the satellite over the observer as structured array of PASS_DTYPE.
+    `with_max_altitude` costs one more propagation for culmination points. With horizon `mask` passes are searched
+    over its lowest point and then cut by mask_passes(), `altitude_degrees` is ignored."""
+    if mask is not None:
+        altitude_degrees = mask.min_elevation
+    event_time, event_types = satellite.find_events(observer, ts_1, ts_2, altitude_degrees=altitude_degrees)
+    if len(event_types) == 0:
+        return np.zeros(0, dtype=PASS_DTYPE)
+    altitude: np.ndarray | None = None
+    if with_max_altitude:
+        altitude = (satellite - observer).at(event_time).altaz()[0].degrees  # type: ignore
+    passes: np.ndarray = extract_passes(event_types, time_to_posix(event_time), altitude)
+    if mask is not None:
+        passes = mask_passes(satellite, observer, passes, mask, ts_1.ts)
+    return passes
+
+
+def passes_for_observers(satellite: EarthSatellite, observers: dict, ts_1: Time, ts_2: Time,
+                         with_max_altitude: bool = False) -> dict[str, np.ndarray]:
+    """Passes over every observer above its horizon mask, see PropagationContext.horizon_mask()."""
+    return {location_name: find_passes(satellite, observer, ts_1, ts_2, with_max_altitude=with_max_altitude,
+                                       mask=get_context().horizon_mask(location_name))
+            for location_name, observer in observers.items()}
+
+
 def events_for_observers(satellite: EarthSatellite, observers: dict, ts_1: Time, ts_2: Time):
+    events_list_for_all_observers: dict[str, list[dict[str, Any]]] = {}
+    for location_name, passes in passes_for_observers(satellite, observers, ts_1, ts_2).items():
+        if len(passes):
+            events_list_for_all_observers[location_name] = passes_to_dicts(passes, location_name)
+    return events_list_for_all_observers
+
+
+def tle_epoch(satellite: EarthSatellite) -> str:
+    """Epoch of satellite TLE in the same format as it is written in the TLE line 1, e.g. '22354.51097222'"""
+    return f'{satellite.model.epochyr:02d}{satellite.model.epochdays:012.8f}'
+
+
+def cached_events_for_observers(satellite: EarthSatellite, observers: dict, ts_1: Time, ts_2: Time):
+    """The same as events_for_observers() but passes are computed for whole UTC days and stored in pass_cache.
+    Only missing days are computed, then passes are filtered by requested time range. A day owns passes which rise
+    above the lowest point of the horizon mask within it, with all their visible segments, so a pass which is split
+    by the mask around midnight is not lost between days.
+    """
+    timescale: Timescale = ts_1.ts
+    dt_1: datetime = ts_1.utc_datetime()
+    dt_2: datetime = ts_2.utc_datetime()
+    days: list[date] = [dt_1.date() + timedelta(days=i) for i in range((dt_2.date() - dt_1.date()).days + 1)]
+    epoch: str = tle_epoch(satellite)
     events_list_for_all_observers: dict[str, list[dict[str, datetime | int | str]]] = {}
     for location_name, observer in observers.items():
-        event_time_list, event_type_list = satellite.find_events(observer, ts_1, ts_2, altitude_degrees=3)
-        if len(event_type_list) > 1:  # there is at least one available session
-            event_type_list, event_time_list = skip_events_until_start(event_type_list, event_time_list)
-            if len(event_type_list) == 0:
-                continue
-            event_dict_list = map_events(event_type_list, event_time_list, location_name)
+        event_dict_list: list[dict[str, datetime | int | str]] = []
+        for day in days:
+            # passes depend on the horizon mask, so changed mask file does not reuse old passes
+            key: PassKey = PassKey(satellite.model.satnum, epoch,
+                                   f'{location_name}-{get_context().horizon_mask(location_name).digest}',
+                                   day.isoformat())
+            day_passes: list[dict[str, Any]] | None = get_context().pass_cache.get(key)
+            if day_passes is None:
+                mask: HorizonMask = get_context().horizon_mask(location_name)
+                day_start: datetime = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+                passes: np.ndarray = find_passes(satellite, observer, timescale.from_datetime(day_start),
+                                                 timescale.from_datetime(day_start + timedelta(days=1) + DAY_OVERLAP),
+                                                 altitude_degrees=mask.min_elevation)
+                passes = passes[passes['start'] < (day_start + timedelta(days=1)).timestamp()]
+                day_passes = passes_to_dicts(mask_passes(satellite, observer, passes, mask, timescale),
+                                             location_name)
+                get_context().pass_cache.put(key, day_passes)
+            event_dict_list.extend(event_dict for event_dict in day_passes
+                                   if datetime.fromisoformat(event_dict['start_time']) >= dt_1 and
+                                   datetime.fromisoformat(event_dict['finish_time']) <= dt_2)
+        if event_dict_list:
             events_list_for_all_observers[location_name] = event_dict_list
     return events_list_for_all_observers
 
 
-def get_sessions_for_sat(sat_name: str, observers: dict,
-                         t_1: date | str, t_2: date | str | None = None, local_tle: bool = True) -> list[dict[str, Any]]:
-    satellite: EarthSatellite | None = get_sat_from_local_tle_file(sat_name.upper()) if local_tle else request_celestrak_sat_tle(sat_name.upper())
+def get_sessions_for_sat(sat_name: str, observers: dict, t_1: date | str, t_2: date | str | None = None,
+                         local_tle: bool = True, use_cache: bool = True,
+                         nearest_tle: bool = False) -> list[dict[str, Any]]:
+    ts_1, ts_2 = convert_time_args(t_1, t_2)
+    # with `nearest_tle` the element set closest to the middle of the window is taken from TLE history
+    satellite: EarthSatellite | None = get_satellite(
+        sat_name, local_tle, float(time_to_posix(ts_1) + time_to_posix(ts_2)) / 2 if nearest_tle else None)
     if satellite is None:
         raise ValueError
     start_time: float = time.time()
-    ts_1, ts_2 = convert_time_args(t_1, t_2)
-    events_list_for_all_observers = events_for_observers(satellite, observers, ts_1, ts_2)
+    if use_cache and not nearest_tle:  # the pass cache keeps passes of the current element sets only
+        events_list_for_all_observers = cached_events_for_observers(satellite, observers, ts_1, ts_2)
+    else:
+        events_list_for_all_observers = events_for_observers(satellite, observers, ts_1, ts_2)
     # final_dict_list = [dict_array for dict_array in events_list_for_all_observers.values()]
     united_dicts = [value for internal_list in events_list_for_all_observers.values() for value in internal_list]
     print(f"Took {time.time() - start_time} seconds")
@@ -139,22 +319,81 @@ def get_sessions_for_sat(sat_name: str, observers: dict,
     return united_dicts
 
 
+def time_to_posix(t: Time) -> np.ndarray:
+    """Convert skyfield Time to POSIX timestamps (UTC seconds since 1970-01-01) without creating datetime objects."""
+    utc_fraction: np.ndarray = t.tai_fraction - t._leap_seconds() / DAY_S  # pylint: disable=protected-access
+    return (t.whole - 2440587.5) * DAY_S + utc_fraction * DAY_S
+
+
 class SatellitePath:
-    def __init__(self, altitude: Angle, azimute: Angle, distance: Distance,
-                 alt_rate: AngleRate, az_rate: AngleRate, dist_rate: Velocity, time_points: list[datetime]) -> None:
-        self.altitude: np.ndarray = altitude.degrees  # type: ignore
-        self.azimuth: np.ndarray = azimute.degrees  # type: ignore
-        self.dist: np.ndarray = distance.km  # type: ignore
-        self.alt_rate: np.ndarray = alt_rate.degrees.per_second  # type: ignore
-        self.az_rate: np.ndarray = az_rate.degrees.per_second  # type: ignore
-        self.dist_rate: np.ndarray = dist_rate.km_per_s  # type: ignore
-        self.t_points: list[datetime] = time_points
-        self.__index: int = 0
+    """Topocentric path of the satellite. All values are stored in the single (7, N) float64 array: POSIX time, altitude
+    and azimuth in degrees, distance in km, altitude and azimuth rates in deg/s and distance rate in km/s.
+    Every attribute is a row view of this array, slicing returns a new path which shares the same memory.
+    """
+    __slots__ = ('data', 't', 'altitude', 'azimuth', 'dist', 'alt_rate', 'az_rate', 'dist_rate',
+                 'az_rotation_direction')
+    FIELDS: tuple[str, ...] = ('t', 'altitude', 'azimuth', 'dist', 'alt_rate', 'az_rate', 'dist_rate')
+    HEADER: struct.Struct = struct.Struct('<4sIQ')  # magic, number of fields, number of points
+
+    def __init__(self, data: np.ndarray) -> None:
+        if data.ndim != 2 or data.shape[0] != len(self.FIELDS):
+            raise ValueError(f'Path data must have shape ({len(self.FIELDS)}, N), got {data.shape}')
+        self.data: np.ndarray = data
+        self.t: np.ndarray = data[0]
+        self.altitude: np.ndarray = data[1]
+        self.azimuth: np.ndarray = data[2]
+        self.dist: np.ndarray = data[3]
+        self.alt_rate: np.ndarray = data[4]
+        self.az_rate: np.ndarray = data[5]
+        self.dist_rate: np.ndarray = data[6]
         # 1 - 'up', -1 - 'down'
-        self.az_rotation_direction: Literal[1, -1] = -1 + 2 * (self.azimuth[1] > self.azimuth[0])  # type: ignore
+        self.az_rotation_direction: Literal[1, -1] = -1 + 2 * bool(len(self.azimuth) < 2 or  # type: ignore
+                                                                   self.azimuth[1] > self.azimuth[0])
+
+    @classmethod
+    def from_skyfield(cls, altitude: Angle, azimute: Angle, distance: Distance, alt_rate: AngleRate,
+                      az_rate: AngleRate, dist_rate: Velocity, time_points: Time) -> SatellitePath:
+        return cls(np.vstack((time_to_posix(time_points), altitude.degrees, azimute.degrees,  # type: ignore
+                              distance.km, alt_rate.degrees.per_second, az_rate.degrees.per_second,  # type: ignore
+                              dist_rate.km_per_s)))  # type: ignore
+
+    @classmethod
+    def from_bytes(cls, blob: bytes | bytearray | memoryview) -> SatellitePath:
+        """Restore path from to_bytes() result. Arrays are not copied, they use memory of `blob`."""
+        magic, fields, points = cls.HEADER.unpack_from(blob)
+        if magic != b'SATP' or fields != len(cls.FIELDS):
+            raise ValueError('Incorrect satellite path blob')
+        return cls(np.frombuffer(blob, dtype='<f8', count=fields * points,
+                                 offset=cls.HEADER.size).reshape(fields, points))
+
+    def to_bytes(self) -> bytes:
+        """Serialize path to single binary blob: small header and contiguous little-endian float64 array."""
+        return self.HEADER.pack(b'SATP', *self.data.shape) + np.ascontiguousarray(self.data, dtype='<f8').tobytes()
+
+    @property
+    def t_points(self) -> list[datetime]:
+        """Time points as datetime objects. It is slow for long paths, use `t` array where it is possible."""
+        return [datetime.fromtimestamp(t_point, timezone.utc) for t_point in self.t.tolist()]
+
+    def visible(self, mask: HorizonMask) -> np.ndarray:
+        """Boolean array, True where the satellite is above the horizon mask."""
+        return mask.is_visible(self.altitude, self.azimuth)
+
+    def trim_to_mask(self, mask: HorizonMask) -> SatellitePath:
+        """View of the path from the first to the last point above the horizon mask, empty when there are none."""
+        visible_index: np.ndarray = np.flatnonzero(self.visible(mask))
+        if len(visible_index) == 0:
+            return self[:0]
+        return self[visible_index[0]:visible_index[-1] + 1]
+
+    @property
+    def duration_sec(self) -> float:
+        return float(self.t[-1] - self.t[0]) if len(self.t) else 0.0
 
     def to_dict(self):
         length = len(self.altitude)
+        t_points: list[datetime] = [datetime.fromtimestamp(self.t[0], timezone.utc),
+                                    datetime.fromtimestamp(self.t[-1], timezone.utc)]
         return {
             'alt':          f'[{float(self.altitude[0]):.2f}, ..., {float(self.altitude[length//2]):.2f}, ..., {float(self.altitude[-1]):.2f}]',
             'az':           f'[{float(self.azimuth[0]):.2f}, ..., {float(self.azimuth[length//2]):.2f}, ..., {float(self.azimuth[-1]):.2f}]',
@@ -162,7 +401,7 @@ class SatellitePath:
             'alt_rate':     f'[{float(self.alt_rate[0]):.2f}, ..., {float(self.alt_rate[length//2]):.2f}, ..., {float(self.alt_rate[-1]):.2f}]',
             'az_rate':      f'[{float(self.az_rate[0]):.2f}, ..., {float(self.az_rate[length//2]):.2f}, ..., {float(self.az_rate[-1]):.2f}]',
             'dist_rate':    f'[{float(self.dist_rate[0]):.2f}, ..., {float(self.dist_rate[length//2]):.2f}, ..., {float(self.dist_rate[-1]):.2f}]',
-            't_points':     f'[{self.t_points[0]}, ..., {self.t_points[-1]}]',
+            't_points':     f'[{t_points[0]}, ..., {t_points[-1]}]',
             'az_rotation_direction': int(self.az_rotation_direction)
         }
 
@@ -173,104 +412,84 @@ class SatellitePath:
                f'Altitude rate deg/s from {self.alt_rate.min():.2f} to {self.alt_rate.max():.2f}\n' \
                f'Azimuth rate deg/s from {self.az_rate.min():.2f} to {self.az_rate.max():.2f}\n' \
                f'Distance rate km/s from {self.dist_rate.min():.2f} to {self.dist_rate.max():.2f}\n' \
-               f'Time points: from {self.t_points[0]} to {self.t_points[-1]}.\n' \
-               f'Duration: {(self.t_points[-1] - self.t_points[0]).seconds} sec\n'
+               f'Time points: from {datetime.fromtimestamp(self.t[0], timezone.utc)} ' \
+               f'to {datetime.fromtimestamp(self.t[-1], timezone.utc)}.\n' \
+               f'Duration: {self.duration_sec:.0f} sec\n'
 
-    def __getitem__(self, key) -> tuple[float, float, datetime]:
-        return (self.altitude.__getitem__(key), self.azimuth.__getitem__(key),
-               self.t_points.__getitem__(key))
+    def __len__(self) -> int:
+        return self.data.shape[1]
 
-    def __iter__(self):
-        return self
+    def __getitem__(self, key):
+        """path[i] -> (altitude, azimuth, POSIX time); path[i:j] -> SatellitePath view of the same memory."""
+        if isinstance(key, slice):
+            return self.__class__(self.data[:, key])
+        return float(self.altitude[key]), float(self.azimuth[key]), float(self.t[key])
 
-    def __next__(self) -> tuple[float, float, datetime]:
-        if self.__index < len(self.altitude):
-            var: tuple[float, float, datetime] = (self.altitude[self.__index],
-                                                  self.azimuth[self.__index],
-                                                  self.t_points[self.__index])
-            self.__index += 1
-            return var
-        raise StopIteration
+    def __iter__(self) -> Iterator[tuple[float, float, float]]:
+        """Iterate over (altitude, azimuth, POSIX time).
+        Path itself is not changed, so it may be iterated many times.
+        """
+        return zip(self.altitude.tolist(), self.azimuth.tolist(), self.t.tolist())
 
 
-class TestSatellitePath:
+class TestSatellitePath(SatellitePath):
+    __slots__ = ()
 
     def __init__(self, test_size: int = 45) -> None:
-        self.altitude = np.linspace(0.0, test_size, num=test_size)
-        self.azimuth = np.linspace(90.0, 90 + test_size, num=test_size)
-        self.dist = np.zeros(test_size)
-        self.alt_rate = np.ones(test_size)
-        self.az_rate = np.ones(test_size)
-        self.dist_rate = np.zeros(test_size)
-        self.az_rotation_direction = 1
-        self.t_points = [datetime.now().astimezone(utc) + timedelta(seconds=6 + x) for x in range(test_size)]
-        self.__index: int = 0
-    def __getitem__(self, key) -> tuple[float, float, datetime]:
-        return (self.altitude.__getitem__(key), self.azimuth.__getitem__(key),
-               self.t_points.__getitem__(key))
+        start: float = time.time() + 6
+        super().__init__(np.vstack((start + np.arange(test_size, dtype=float),
+                                    np.linspace(0.0, test_size, num=test_size),
+                                    np.linspace(90.0, 90 + test_size, num=test_size),
+                                    np.zeros(test_size), np.ones(test_size), np.ones(test_size),
+                                    np.zeros(test_size))))
 
-    def __repr__(self) -> str:
-        return f'Altitude deg from {self.altitude[0]:.2f} to {self.altitude[-1]:.2f}\n' \
-               f'Azimuth deg from {self.azimuth[0]:.2f} to {self.azimuth[-1]:.2f}\n' \
-               f'Distance km from {self.dist.min():.2f} to {self.dist.max():.2f}\n' \
-               f'Altitude rate deg/s from {self.alt_rate.min():.2f} to {self.alt_rate.max():.2f}\n' \
-               f'Azimuth rate deg/s from {self.az_rate.min():.2f} to {self.az_rate.max():.2f}\n' \
-               f'Distance rate km/s from {self.dist_rate.min():.2f} to {self.dist_rate.max():.2f}\n' \
-               f'Time points: from {self.t_points[0]} to {self.t_points[-1]}.\n' \
-               f'Duration: {(self.t_points[-1] - self.t_points[0]).seconds} sec\n'
-
-    def __iter__(self):
-        return self
-
-    def __next__(self) -> tuple[float, float, datetime]:
-        if self.__index < len(self.altitude):
-            var: tuple[float, float, datetime] = (self.altitude[self.__index], self.azimuth[self.__index],
-                    self.t_points[self.__index])
-            self.__index += 1
-            return var
-        raise StopIteration
-
-# def convert_az_degrees(seq):
-#     """Recalculate angle sequence when it transits over 360 degrees.
-#     e.g.: [358.5, 359.6, 0.2, 1.1] -> [358.5, 359.6, 360.2, 361.1]
-#           [1.1, 0.2, 359.6, 358.5] -> [1.1, 0.2, -0.4, -1.5]
-
-#     Args:
-#         seq (ndarray | list[float]): the sequence of angles
-
-#     Raises:
-#         RuntimeError: check origin sequence carefully when get this exception.
-#         It raises when there are several transition over 360 degrees.
-
-#     Returns:
-#         [ndarray]: Origin sequence if there no transition over 360 degrees
-#         else recalculated sequence as in example.
-#     """
-#     if isinstance(seq, list):
-#         seq = np.array(seq)
-#     diff = np.absolute(seq[1:] - seq[:-1])  # differences of neighboring elements
-#     indices = np.where(diff > 300)[0]
-#     if len(indices) > 1:
-#         raise RuntimeError('Unbelievable shit happened!')
-#     if len(indices) == 0:
-#         return seq
-#     return np.append(seq[:indices[0] + 1], seq[indices[0] + 1:] + 360 * (-1 + 2 * (seq[1] > seq[0])))
 
+def convert_az_degrees(seq: np.ndarray | list[float]) -> np.ndarray:
+    """Recalculate angle sequence when it transits over 360 degrees.
+    e.g.: [358.5, 359.6, 0.2, 1.1] -> [358.5, 359.6, 360.2, 361.1]
+          [1.1, 0.2, 359.6, 358.5] -> [1.1, 0.2, -0.4, -1.5]
+    Neighboring angles are supposed to differ less than 180 degrees, any number of transitions is allowed.
+    2D array is converted along the last axis.
+
+    Args:
+        seq (ndarray | list[float]): the sequence of angles
+
+    Returns:
+        [ndarray]: continuous sequence which starts with the same angle as origin one.
+    """
+    seq = np.asarray(seq, dtype=float)
+    if seq.shape[-1] < 2:
+        return seq.copy()
+    steps: np.ndarray = (np.diff(seq, axis=-1) + 180) % 360 - 180
+    result: np.ndarray = np.empty_like(seq)
+    result[..., :1] = seq[..., :1]
+    np.cumsum(steps, axis=-1, out=result[..., 1:])
+    result[..., 1:] += seq[..., :1]
+    return result
 
 
 def angle_points_for_linspace_time(sat: str, observer: str, t_1: datetime, t_2: datetime,
-                                   sampling_rate=3.3333, local_tle: bool = True) -> SatellitePath:
-    timescale: Timescale = load.timescale()
+                                   sampling_rate=3.3333, local_tle: bool = True,
+                                   use_horizon_mask: bool = False, nearest_tle: bool = False) -> SatellitePath:
+    """Path of the satellite over the observer. With `use_horizon_mask` the path is trimmed to the part above
+    the horizon mask of the observer. With `nearest_tle` the element set with epoch closest to the middle of
+    the path is used instead of the current one, see get_satellite()."""
+    timescale: Timescale = get_context().timescale
     time_points: Time = timescale.linspace(timescale.from_datetime(t_1), timescale.from_datetime(t_2),
                                      int((t_2 - t_1).seconds * sampling_rate))
-    satellite: EarthSatellite | None = get_sat_from_local_tle_file(sat.upper()) if local_tle else request_celestrak_sat_tle(sat.upper())
+    satellite: EarthSatellite | None = get_satellite(sat, local_tle, (t_1.timestamp() + t_2.timestamp()) / 2
+                                                     if nearest_tle else None)
     print(satellite)
     if satellite is not None:
         sat_position: VectorSum = (satellite - OBSERVERS[observer])
     else:
         raise RuntimeError('Get incorrect sattelite')
     topocentric: Geocentric = sat_position.at(time_points)  # type: ignore
-    return SatellitePath(*topocentric.frame_latlon_and_rates(OBSERVERS[observer]), time_points.utc_datetime())  # type: ignore
+    path: SatellitePath = SatellitePath.from_skyfield(
+        *topocentric.frame_latlon_and_rates(OBSERVERS[observer]), time_points)  # type: ignore
+    if use_horizon_mask:
+        path = path.trim_to_mask(get_context().horizon_mask(observer))
+    return path
 
 
 if __name__ == '__main__':
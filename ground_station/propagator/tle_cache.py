@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from queue import Queue
+from typing import Protocol
+from skyfield.api import load
+from skyfield.sgp4lib import EarthSatellite
+from skyfield.timelib import Timescale
+from ground_station.propagator.celestrak_api import CelestrakSource
+from ground_station.propagator.tle_catalog import TLERecord, parse_tle_text
+from ground_station.propagator.tle_history import TLEHistory
+
+
+class TLESource(Protocol):
+    def fetch_by_name(self, name: str) -> str | None: ...
+
+    def fetch_group(self, group: str) -> str | None: ...
+
+
+@dataclass
+class TLECacheEntry:
+    record: TLERecord
+    satellite: EarthSatellite
+    fetched_at: float  # time.time() of the last successful fetch
+    epoch_unix: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.epoch_unix = self.satellite.epoch.utc_datetime().timestamp()
+
+
+class TLECache:
+    """Cache of TLE sets downloaded from Celestrak (or any other `source`).
+
+    Freshness policy: entry is fresh while it was fetched less than `ttl` seconds ago and its TLE epoch is not older
+    than `max_epoch_age` seconds. An old epoch is re-requested not more often than `min_refresh_interval` seconds,
+    because Celestrak can have nothing newer. Stale entries are returned immediately and refreshed by the background
+    thread (stale-while-revalidate). Missing entries are requested synchronously. Every fetched TLE set is also saved
+    in `cache_dir`, that is used as fallback when source is unreachable, and appended to `history` when it is set,
+    so older element sets stay available after the entry is overwritten.
+    """
+    def __init__(self, source: TLESource | None = None, cache_dir: str | None = None, ttl: float = 2 * 3600,
+                 max_epoch_age: float = 3 * 86400, min_refresh_interval: float = 600,
+                 timescale: Timescale | None = None, history: TLEHistory | None = None) -> None:
+        if source is None:
+            source = CelestrakSource()
+        self.source: TLESource = source
+        self.cache_dir: str = cache_dir or os.path.join(os.path.dirname(__file__), 'tle_cache')
+        self.ttl: float = ttl
+        self.max_epoch_age: float = max_epoch_age
+        self.min_refresh_interval: float = min_refresh_interval
+        self._timescale: Timescale | None = timescale
+        self.history: TLEHistory | None = history
+        self._entries: dict[str, TLECacheEntry] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._refresh_queue: Queue[str] = Queue()
+        self._pending: set[str] = set()
+        self._refresher: threading.Thread | None = None
+        self._group_refresher: threading.Thread | None = None
+        self._stop_event: threading.Event = threading.Event()
+
+    @property
+    def timescale(self) -> Timescale:
+        if self._timescale is None:
+            self._timescale = load.timescale()
+        return self._timescale
+
+    def is_fresh(self, entry: TLECacheEntry, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        fetch_age: float = now - entry.fetched_at
+        if fetch_age > self.ttl:
+            return False
+        return now - entry.epoch_unix <= self.max_epoch_age or fetch_age < self.min_refresh_interval
+
+    def get(self, name: str) -> EarthSatellite | None:
+        key: str = name.upper()
+        with self._lock:
+            entry: TLECacheEntry | None = self._entries.get(key)
+        if entry is not None:
+            if not self.is_fresh(entry):
+                self.schedule_refresh(key)
+            return entry.satellite
+        entry = self.refresh(key)
+        if entry is None:
+            entry = self._load_from_disk(key)
+        return entry.satellite if entry is not None else None
+
+    def refresh(self, name: str) -> TLECacheEntry | None:
+        """Synchronously request TLE of single satellite. Returns None if source is unreachable or has no data."""
+        key: str = name.upper()
+        try:
+            text: str | None = self.source.fetch_by_name(key)
+        except Exception as err:  # pylint: disable=broad-except
+            print(f'TLE request of {key} failed: {err}')
+            return None
+        if text is None:
+            return None
+        records: list[TLERecord] = parse_tle_text(text)
+        if not records:
+            return None
+        self._save_to_disk(key, records[0])
+        return self._put(key, records[0], time.time())
+
+    def refresh_group(self, group: str, names: list[str] | None = None) -> int:
+        """Update cache with one GP query for the whole group.
+
+        Args:
+            group (str): Celestrak group name, e.g. 'cubesat'.
+            names (list[str] | None): update only these satellites. None means all satellites of the group.
+
+        Returns:
+            int: number of updated entries.
+        """
+        try:
+            text: str | None = self.source.fetch_group(group)
+        except Exception as err:  # pylint: disable=broad-except
+            print(f'TLE group {group} request failed: {err}')
+            return 0
+        if text is None:
+            return 0
+        wanted: set[str] | None = {name.upper() for name in names} if names is not None else None
+        fetched_at: float = time.time()
+        updated: int = 0
+        for record in parse_tle_text(text):
+            key: str = record.name.upper()
+            if wanted is not None and key not in wanted:
+                continue
+            self._save_to_disk(key, record)
+            self._put(key, record, fetched_at)
+            updated += 1
+        return updated
+
+    def schedule_refresh(self, name: str) -> None:
+        key: str = name.upper()
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._ensure_refresher()
+        self._refresh_queue.put(key)
+
+    def start_group_refresh(self, group: str, interval: float | None = None) -> None:
+        """Periodically refresh the whole group in background thread. Default interval is `ttl`."""
+        if self._group_refresher is not None and self._group_refresher.is_alive():
+            return
+        self._stop_event.clear()
+        self._group_refresher = threading.Thread(name='TLE group refresher', target=self._group_refresh_loop,
+                                                 args=(group, interval or self.ttl), daemon=True)
+        self._group_refresher.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _ensure_refresher(self) -> None:
+        if self._refresher is None or not self._refresher.is_alive():
+            self._refresher = threading.Thread(name='TLE refresher', target=self._refresh_loop, daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            key: str = self._refresh_queue.get()
+            try:
+                self.refresh(key)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    def _group_refresh_loop(self, group: str, interval: float) -> None:
+        while not self._stop_event.is_set():
+            self.refresh_group(group)
+            self._stop_event.wait(interval)
+
+    def _put(self, key: str, record: TLERecord, fetched_at: float) -> TLECacheEntry:
+        with self._lock:
+            entry: TLECacheEntry | None = self._entries.get(key)
+            if entry is not None and entry.record.line1 == record.line1 and entry.record.line2 == record.line2:
+                entry.fetched_at = fetched_at
+                return entry
+        satellite: EarthSatellite = EarthSatellite(record.line1, record.line2, record.name, self.timescale)
+        entry = TLECacheEntry(record, satellite, fetched_at)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key.replace(' ', '_').replace('/', '_')}.tle")
+
+    def _save_to_disk(self, key: str, record: TLERecord) -> None:
+        if self.history is not None:
+            self.history.append(record)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._disk_path(key), 'w', encoding='utf-8') as tle_file:
+                tle_file.write(f'{record.name}\n{record.line1}\n{record.line2}\n')
+        except OSError as err:
+            print(f'Can not save TLE of {key}: {err}')
+
+    def _load_from_disk(self, key: str) -> TLECacheEntry | None:
+        path: str = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as tle_file:
+                records: list[TLERecord] = parse_tle_text(tle_file.read())
+        except OSError:
+            return None
+        if not records:
+            return None
+        print(f'Use TLE of {key} from disk cache')
+        # file modification time is the moment of the last successful fetch
+        return self._put(key, records[0], os.path.getmtime(path))
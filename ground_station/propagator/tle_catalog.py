@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from skyfield.api import load
+from skyfield.sgp4lib import EarthSatellite
+from skyfield.timelib import Timescale
+
+
+SNAPSHOT_VERSION: int = 1
+ALPHA5_LETTERS: str = 'ABCDEFGHJKLMNPQRSTUVWXYZ'  # Alpha-5 skips I and O
+
+
+@dataclass(frozen=True)
+class TLERecord:
+    name: str
+    norad_id: int
+    intl_designator: str
+    epoch: str
+    line1: str
+    line2: str
+
+
+def parse_norad_id(field: str) -> int:
+    """Convert catalog number field of TLE line to integer. Supports Alpha-5 format (e.g. 'A0001' -> 100001)."""
+    field = field.strip()
+    if field and field[0].isalpha():
+        return (ALPHA5_LETTERS.index(field[0].upper()) + 10) * 10000 + int(field[1:])
+    return int(field)
+
+
+def parse_tle_text(text: str) -> list[TLERecord]:
+    """Split TLE text into records without creating sgp4 objects.
+    Both 3-line (with name) and 2-line (without name) formats are supported.
+
+    Args:
+        text (str): content of TLE file.
+
+    Returns:
+        list[TLERecord]: records in file order.
+    """
+    records: list[TLERecord] = []
+    lines: list[str] = [line.rstrip() for line in text.splitlines() if line.strip()]
+    name: str = ''
+    i = 0
+    while i < len(lines):
+        line: str = lines[i]
+        if line.startswith('1 ') and i + 1 < len(lines) and lines[i + 1].startswith('2 '):
+            line2: str = lines[i + 1]
+            norad_id: int = parse_norad_id(line[2:7])
+            records.append(TLERecord(name=name or str(norad_id), norad_id=norad_id,
+                                     intl_designator=line[9:17].strip(), epoch=line[18:32].strip(),
+                                     line1=line, line2=line2))
+            name = ''
+            i += 2
+            continue
+        name = line[2:].strip() if line.startswith('0 ') else line.strip()
+        i += 1
+    return records
+
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class TLECatalog:
+    """Satellite catalog indexed by name, NORAD ID and international designator.
+
+    Parsed records are kept in an on-disk snapshot next to the source file (or in `snapshot_path`). The snapshot is
+    reused while the source file size/mtime or sha256 stay the same, so worker startup does not re-parse TLE text.
+    EarthSatellite objects are created on first lookup and memoized. The source file is checked for changes at most
+    once per `check_interval` seconds and the catalog reloads itself when it was changed.
+    Construction of the catalog does no I/O.
+    """
+    def __init__(self, path: str, snapshot_path: str | None = None, check_interval: float = 1.0,
+                 timescale: Timescale | None = None) -> None:
+        self.path: str = path
+        self.snapshot_path: str = snapshot_path or f'{path}.snapshot'
+        self.check_interval: float = check_interval
+        self._timescale: Timescale | None = timescale
+        self._lock: threading.RLock = threading.RLock()
+        self._records: list[TLERecord] = []
+        self._by_name: dict[str, int] = {}
+        self._by_norad: dict[int, int] = {}
+        self._by_intl: dict[str, int] = {}
+        self._satellites: dict[int, EarthSatellite] = {}
+        self._source_stat: tuple[int, int] | None = None  # (size, mtime_ns)
+        self._source_hash: str | None = None
+        self._last_check: float = 0.0
+        self.reload_counter: int = 0
+
+    @property
+    def timescale(self) -> Timescale:
+        if self._timescale is None:
+            self._timescale = load.timescale()
+        return self._timescale
+
+    def __len__(self) -> int:
+        self._ensure_fresh()
+        return len(self._records)
+
+    def __contains__(self, name: str) -> bool:
+        self._ensure_fresh()
+        return name.upper() in self._by_name
+
+    def records(self) -> list[TLERecord]:
+        self._ensure_fresh()
+        return list(self._records)
+
+    def get_by_name(self, name: str) -> EarthSatellite | None:
+        self._ensure_fresh()
+        return self._satellite(self._by_name.get(name.upper()))
+
+    def get_by_norad_id(self, norad_id: int) -> EarthSatellite | None:
+        self._ensure_fresh()
+        return self._satellite(self._by_norad.get(int(norad_id)))
+
+    def get_by_intl_designator(self, intl_designator: str) -> EarthSatellite | None:
+        """Designator may be passed in TLE ('22002B') or COSPAR ('2022-002B') format."""
+        self._ensure_fresh()
+        return self._satellite(self._by_intl.get(self._normalize_intl(intl_designator)))
+
+    def get(self, key: str | int) -> EarthSatellite | None:
+        """Search satellite by any of indexed keys: NORAD ID, name or international designator."""
+        if isinstance(key, int) or key.isdigit():
+            return self.get_by_norad_id(int(key))
+        return self.get_by_name(key) or self.get_by_intl_designator(key)
+
+    def get_record(self, key: str | int) -> TLERecord | None:
+        self._ensure_fresh()
+        if isinstance(key, int) or key.isdigit():
+            index: int | None = self._by_norad.get(int(key))
+        else:
+            index = self._by_name.get(key.upper())
+            if index is None:
+                index = self._by_intl.get(self._normalize_intl(key))
+        return self._records[index] if index is not None else None
+
+    def reload(self, force: bool = False) -> None:
+        """Load catalog from snapshot if it is still valid otherwise parse source file and save new snapshot."""
+        with self._lock:
+            stat: os.stat_result = os.stat(self.path)
+            source_stat: tuple[int, int] = (stat.st_size, stat.st_mtime_ns)
+            if not force and source_stat == self._source_stat:
+                return
+            snapshot: dict | None = None if force else self._read_snapshot()
+            if snapshot is not None and tuple(snapshot['source_stat']) == source_stat:
+                self._apply(snapshot['records'], source_stat, snapshot['source_hash'])
+                return
+            digest: str = file_digest(self.path)
+            if digest == self._source_hash:  # file was touched but content is the same
+                self._write_snapshot(self._records, source_stat, digest)
+                self._source_stat = source_stat
+                return
+            if snapshot is not None and snapshot['source_hash'] == digest:
+                records: list[TLERecord] = snapshot['records']
+            else:
+                start_time: float = time.time()
+                with open(self.path, 'r', encoding='utf-8') as tle_file:
+                    records = parse_tle_text(tle_file.read())
+                print(f'TLE catalog {self.path} parsed in {time.time() - start_time:.3f} seconds. '
+                      f'Satellites: {len(records)}')
+            self._write_snapshot(records, source_stat, digest)
+            self._apply(records, source_stat, digest)
+
+    def _ensure_fresh(self) -> None:
+        now: float = time.monotonic()
+        if self._source_stat is not None and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        self.reload()
+
+    def _apply(self, records: list[TLERecord], source_stat: tuple[int, int], digest: str) -> None:
+        by_name: dict[str, int] = {}
+        by_norad: dict[int, int] = {}
+        by_intl: dict[str, int] = {}
+        for index, record in enumerate(records):
+            # like filter(...)[0] in the past the first occurrence of duplicated key wins
+            by_name.setdefault(record.name.upper(), index)
+            by_norad.setdefault(record.norad_id, index)
+            if record.intl_designator:
+                by_intl.setdefault(record.intl_designator, index)
+        self._records, self._by_name, self._by_norad, self._by_intl = records, by_name, by_norad, by_intl
+        self._satellites = {}
+        self._source_stat = source_stat
+        self._source_hash = digest
+        self.reload_counter += 1
+
+    def _satellite(self, index: int | None) -> EarthSatellite | None:
+        if index is None:
+            return None
+        satellite: EarthSatellite | None = self._satellites.get(index)
+        if satellite is None:
+            record: TLERecord = self._records[index]
+            satellite = EarthSatellite(record.line1, record.line2, record.name, self.timescale)
+            self._satellites[index] = satellite
+        return satellite
+
+    def _read_snapshot(self) -> dict | None:
+        try:
+            with open(self.snapshot_path, 'rb') as snapshot_file:
+                snapshot: dict = pickle.load(snapshot_file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('source') != os.path.abspath(self.path):
+            return None
+        return snapshot
+
+    def _write_snapshot(self, records: list[TLERecord], source_stat: tuple[int, int], digest: str) -> None:
+        snapshot: dict = {'version': SNAPSHOT_VERSION, 'source': os.path.abspath(self.path),
+                          'source_stat': source_stat, 'source_hash': digest, 'records': records}
+        tmp_path: str = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as snapshot_file:
+                pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)  # atomic for concurrent workers
+        except OSError as err:
+            print(f'Can not save TLE catalog snapshot {self.snapshot_path}: {err}')
+
+    @staticmethod
+    def _normalize_intl(intl_designator: str) -> str:
+        """'2022-002B' -> '22002B'"""
+        designator: str = intl_designator.strip().upper()
+        if len(designator) > 5 and designator[4] == '-':
+            designator = designator[2:4] + designator[5:]
+        return designator
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+import numpy as np
+from skyfield.api import load
+from skyfield.sgp4lib import EarthSatellite
+from skyfield.timelib import Timescale
+from ground_station.propagator.tle_catalog import TLERecord
+
+
+# fixed size record of history file: POSIX epoch and both TLE lines
+HISTORY_DTYPE: np.dtype = np.dtype([('epoch', '<f8'), ('line1', 'S69'), ('line2', 'S69')])
+HISTORY_SUFFIX: str = '.tleh'
+# epoch field of TLE has 1e-8 day resolution, closer epochs are the same element set
+EPOCH_TOLERANCE: float = 1e-3
+
+
+def tle_epoch_posix(epoch: str) -> float:
+    """POSIX time of TLE epoch field, e.g. '22354.51097222'. Two-digit years 57..99 are 19xx as in sgp4."""
+    year: int = int(epoch[:2])
+    year += 1900 if year >= 57 else 2000
+    start: datetime = datetime(year, 1, 1, tzinfo=timezone.utc)
+    return (start + timedelta(days=float(epoch[2:]) - 1)).timestamp()
+
+
+def posix_to_tle_epoch(t: float) -> str:
+    """Inverse of tle_epoch_posix() with TLE precision of 1e-8 day."""
+    moment: datetime = datetime.fromtimestamp(t, timezone.utc)
+    year_start: datetime = datetime(moment.year, 1, 1, tzinfo=timezone.utc)
+    return f'{moment.year % 100:02d}{(moment - year_start).total_seconds() / 86400 + 1:012.8f}'
+
+
+class TLEHistory:
+    """Append-only history of element sets per satellite: `directory`/<NORAD ID>.tleh files of HISTORY_DTYPE records.
+    An element set is appended once, files are never rewritten, so concurrent workers only append whole records.
+    Epochs are sorted in memory on load, the file is re-read when its size changes, lookups are binary searches.
+    """
+    def __init__(self, directory: str, timescale: Timescale | None = None) -> None:
+        self.directory: str = directory
+        self._timescale: Timescale | None = timescale
+        self._lock: threading.Lock = threading.Lock()
+        self._index: dict[int, tuple[int, np.ndarray]] = {}  # NORAD ID -> (file size, records sorted by epoch)
+        self._satellites: dict[tuple[int, float], EarthSatellite] = {}
+
+    @property
+    def timescale(self) -> Timescale:
+        if self._timescale is None:
+            self._timescale = load.timescale(builtin=True)
+        return self._timescale
+
+    def _path(self, norad_id: int) -> str:
+        return os.path.join(self.directory, f'{norad_id}{HISTORY_SUFFIX}')
+
+    def _records(self, norad_id: int) -> np.ndarray:
+        path: str = self._path(norad_id)
+        try:
+            size: int = os.path.getsize(path)
+        except OSError:
+            return np.zeros(0, dtype=HISTORY_DTYPE)
+        cached: tuple[int, np.ndarray] | None = self._index.get(norad_id)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        # a record being appended by another process is ignored until it is complete
+        records: np.ndarray = np.fromfile(path, dtype=HISTORY_DTYPE, count=size // HISTORY_DTYPE.itemsize)
+        records = records[np.argsort(records['epoch'], kind='stable')]
+        self._index[norad_id] = (size, records)
+        return records
+
+    def append(self, record: TLERecord) -> bool:
+        """Add the element set unless its epoch is already stored. Returns True when it was added."""
+        epoch: float = tle_epoch_posix(record.epoch)
+        with self._lock:
+            records: np.ndarray = self._records(record.norad_id)
+            index: int = int(np.searchsorted(records['epoch'], epoch))
+            if np.any(np.abs(records['epoch'][max(index - 1, 0):index + 1] - epoch) < EPOCH_TOLERANCE):
+                return False
+            row: np.ndarray = np.array([(epoch, record.line1.encode('ascii'), record.line2.encode('ascii'))],
+                                       dtype=HISTORY_DTYPE)
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._path(record.norad_id), 'ab') as history_file:
+                    history_file.write(row.tobytes())
+            except OSError as err:
+                print(f'Can not save TLE history of {record.norad_id}: {err}')
+                return False
+            return True
+
+    def extend(self, records: Iterable[TLERecord]) -> int:
+        """Append many element sets, e.g. the whole catalog. Returns the number of added ones."""
+        return sum(self.append(record) for record in records)
+
+    def epochs(self, norad_id: int) -> np.ndarray:
+        """POSIX epochs of stored element sets in ascending order."""
+        with self._lock:
+            return self._records(norad_id)['epoch'].copy()
+
+    def nearest(self, norad_id: int, t: float, before: bool = False) -> tuple[float, str, str] | None:
+        """Element set with epoch closest to POSIX time `t` or the latest one not after `t` with `before`.
+
+        Returns:
+            tuple[float, str, str] | None: epoch and TLE lines, None when there is no suitable element set.
+        """
+        with self._lock:
+            records: np.ndarray = self._records(norad_id)
+        if len(records) == 0:
+            return None
+        index: int = int(np.searchsorted(records['epoch'], t, side='right'))
+        if before:
+            if index == 0:
+                return None
+            index -= 1
+        elif index == len(records) or (index > 0 and t - records['epoch'][index - 1] <= records['epoch'][index] - t):
+            index -= 1
+        row: np.void = records[index]
+        return float(row['epoch']), row['line1'].decode('ascii'), row['line2'].decode('ascii')
+
+    def satellite(self, norad_id: int, t: float, name: str = '', before: bool = False) -> EarthSatellite | None:
+        """EarthSatellite of nearest() element set, satellites are memoized by epoch."""
+        element_set: tuple[float, str, str] | None = self.nearest(norad_id, t, before)
+        if element_set is None:
+            return None
+        epoch, line1, line2 = element_set
+        satellite: EarthSatellite | None = self._satellites.get((norad_id, epoch))
+        if satellite is None:
+            satellite = EarthSatellite(line1, line2, name or str(norad_id), self.timescale)
+            self._satellites[(norad_id, epoch)] = satellite
+        return satellite
+
+    def __len__(self) -> int:
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(os.path.getsize(os.path.join(self.directory, name)) // HISTORY_DTYPE.itemsize
+                   for name in os.listdir(self.directory) if name.endswith(HISTORY_SUFFIX))
+
+
+if __name__ == '__main__':
+    # import TLE files into history and benchmark nearest epoch lookup
+    # python -m ground_station.propagator.tle_history [TLE files ...]
+    import sys
+    import tempfile
+    import time
+    from dataclasses import replace
+    from ground_station.propagator.context import get_context
+    from ground_station.propagator.tle_catalog import parse_tle_text
+
+    if len(sys.argv) > 1:
+        history: TLEHistory = get_context().tle_history
+        for tle_path in sys.argv[1:]:
+            with open(tle_path, 'r', encoding='utf-8') as tle_file:
+                print(f'{tle_path}: {history.extend(parse_tle_text(tle_file.read()))} element sets added')
+        sys.exit()
+
+    base: TLERecord = get_context().catalog.records()[0]
+    base_epoch: float = tle_epoch_posix(base.epoch)
+    with tempfile.TemporaryDirectory() as history_dir:
+        history = TLEHistory(history_dir, get_context().timescale)
+        # two years of daily element sets, appended in random order
+        days: np.ndarray = np.random.default_rng(0).permutation(730)
+        start_time: float = time.perf_counter()
+        for day in days:
+            epoch_field: str = posix_to_tle_epoch(base_epoch - day * 86400.0)
+            history.append(replace(base, epoch=epoch_field, line1=base.line1[:18] + epoch_field + base.line1[32:]))
+        append_time: float = time.perf_counter() - start_time
+        assert not history.append(base), 'duplicated epoch must not be appended'
+        file_size: int = os.path.getsize(os.path.join(history_dir, f'{base.norad_id}{HISTORY_SUFFIX}'))
+        queries: np.ndarray = base_epoch - np.random.default_rng(1).uniform(0, 730 * 86400.0, 10000)
+        start_time = time.perf_counter()
+        found: list[tuple[float, str, str] | None] = [history.nearest(base.norad_id, t) for t in queries]
+        lookup_time: float = time.perf_counter() - start_time
+        epochs: np.ndarray = history.epochs(base.norad_id)
+        brute: np.ndarray = epochs[np.abs(epochs[None, :] - queries[:, None]).argmin(axis=1)]
+        assert all(element_set is not None and element_set[0] == expected
+                   for element_set, expected in zip(found, brute))
+    print(f'{len(epochs)} element sets of {base.name}, file {file_size / 1024:.1f} KiB')
+    print(f'append:  {append_time / len(days) * 1e6:8.1f} us per element set')
+    print(f'nearest: {lookup_time / len(queries) * 1e6:8.1f} us per lookup, matches brute force')
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from datetime import datetime
+import numpy as np
+from skyfield.positionlib import Geocentric
+from skyfield.sgp4lib import EarthSatellite
+from skyfield.timelib import Time, Timescale
+from skyfield.toposlib import GeographicPosition
+from ground_station.propagator.context import get_context
+from ground_station.propagator.frames import posix_to_time
+from ground_station.propagator.propagate import (SatellitePath, get_sat_from_local_tle_file,
+                                                 request_celestrak_sat_tle)
+
+
+# shares of a knot interval where interpolation is verified, the middle one becomes a knot when the interval is split
+CHECK_POINTS: tuple[float, ...] = (0.5, 0.25, 0.75)
+# intervals are refined to this share of tolerance, so the error between check points stays within the tolerance
+REFINE_MARGIN: float = 0.5
+
+
+def propagate_path(satellite: EarthSatellite, observer: GeographicPosition, t_points: np.ndarray,
+                   timescale: Timescale | None = None) -> SatellitePath:
+    """Direct SGP4 propagation of topocentric position at given POSIX time points."""
+    timescale = timescale or get_context().timescale
+    time_points: Time = posix_to_time(timescale, t_points)
+    topocentric: Geocentric = (satellite - observer).at(time_points)  # type: ignore
+    path: SatellitePath = SatellitePath.from_skyfield(*topocentric.frame_latlon_and_rates(observer),  # type: ignore
+                                                      time_points)
+    path.t[:] = t_points  # keep exact requested values instead of POSIX -> UTC -> POSIX round trip
+    return path
+
+
+def hermite(t: np.ndarray, knot_t: np.ndarray, values: np.ndarray,
+            rates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Cubic Hermite interpolation of value and its derivative with known derivatives in knots."""
+    index: np.ndarray = np.clip(np.searchsorted(knot_t, t, side='right') - 1, 0, len(knot_t) - 2)
+    t_0: np.ndarray = knot_t[index]
+    step: np.ndarray = knot_t[index + 1] - t_0
+    s: np.ndarray = (t - t_0) / step
+    s_2: np.ndarray = s * s
+    s_3: np.ndarray = s_2 * s
+    p_0, p_1 = values[index], values[index + 1]
+    m_0, m_1 = rates[index] * step, rates[index + 1] * step
+    value: np.ndarray = (2 * s_3 - 3 * s_2 + 1) * p_0 + (s_3 - 2 * s_2 + s) * m_0 + \
+                        (-2 * s_3 + 3 * s_2) * p_1 + (s_3 - s_2) * m_1
+    derivative: np.ndarray = ((6 * s_2 - 6 * s) * p_0 + (3 * s_2 - 4 * s + 1) * m_0 +
+                              (-6 * s_2 + 6 * s) * p_1 + (3 * s_2 - 2 * s) * m_1) / step
+    return value, derivative
+
+
+class Trajectory:
+    """Topocentric trajectory that is computed with SGP4 only in sparse knots and is interpolated at any other moment
+    with cubic Hermite splines using altitude, azimuth and distance rates of the knots.
+
+    Knots are placed adaptively: every interval is checked in its middle and quarters against direct SGP4 and is
+    split in the middle while interpolation error there is bigger than half of tolerance, which leaves room for the
+    error between check points. So the knot density follows angular acceleration of the satellite: low passes get
+    few knots, an overhead pass gets many of them around culmination.
+    """
+    def __init__(self, satellite: EarthSatellite, observer: GeographicPosition, t_1: float, t_2: float,
+                 tolerance_deg: float = 0.01, tolerance_km: float = 0.05, initial_step: float = 30,
+                 min_step: float = 0.1) -> None:
+        """
+        Args:
+            satellite (EarthSatellite): satellite.
+            observer (GeographicPosition): station.
+            t_1 (float): POSIX start time.
+            t_2 (float): POSIX finish time.
+            tolerance_deg (float, optional): max altitude error and azimuth error projected on the horizon circle
+            of the satellite, i.e. multiplied by cos(altitude): azimuth is singular at zenith, where a small
+            pointing error is a large azimuth error. Defaults to 0.01.
+            tolerance_km (float, optional): max distance error. Defaults to 0.05.
+            initial_step (float, optional): initial knot step in seconds. Defaults to 30.
+            min_step (float, optional): intervals shorter than this are not split anymore. Defaults to 0.1.
+        """
+        self.satellite: EarthSatellite = satellite
+        self.observer: GeographicPosition = observer
+        self.t_1: float = t_1
+        self.t_2: float = t_2
+        self.tolerance_deg: float = tolerance_deg
+        self.tolerance_km: float = tolerance_km
+        self.min_step: float = min_step
+        self.propagation_counter: int = 0
+        knots: SatellitePath = self._propagate(np.linspace(t_1, t_2, max(int(np.ceil((t_2 - t_1) / initial_step)), 1)
+                                                           + 1))
+        self.knots: SatellitePath = self._refine(knots)
+
+    @classmethod
+    def for_session(cls, sat: str, observer: str, t_1: datetime, t_2: datetime, local_tle: bool = True,
+                    **kwargs) -> Trajectory:
+        satellite: EarthSatellite | None = get_sat_from_local_tle_file(sat.upper()) if local_tle \
+            else request_celestrak_sat_tle(sat.upper())
+        if satellite is None:
+            raise RuntimeError('Get incorrect sattelite')
+        return cls(satellite, get_context().observers[observer], t_1.timestamp(), t_2.timestamp(), **kwargs)
+
+    def _propagate(self, t_points: np.ndarray) -> SatellitePath:
+        self.propagation_counter += len(t_points)
+        return propagate_path(self.satellite, self.observer, t_points)
+
+    def _interpolate(self, knots: SatellitePath, t_points: np.ndarray) -> np.ndarray:
+        """Returns (7, N) array in the SatellitePath layout with unwrapped azimuth."""
+        data: np.ndarray = np.empty((len(SatellitePath.FIELDS), len(t_points)))
+        data[0] = t_points
+        data[1], data[4] = hermite(t_points, knots.t, knots.altitude, knots.alt_rate)
+        data[2], data[5] = hermite(t_points, knots.t, knots.azimuth, knots.az_rate)
+        data[3], data[6] = hermite(t_points, knots.t, knots.dist, knots.dist_rate)
+        return data
+
+    def _refine(self, knots: SatellitePath) -> SatellitePath:
+        knots.azimuth[:] = np.degrees(np.unwrap(np.radians(knots.azimuth)))
+        verified: np.ndarray = np.zeros(len(knots) - 1, dtype=bool)
+        while True:
+            check: np.ndarray = ~verified & (np.diff(knots.t) > 2 * self.min_step)
+            if not check.any():
+                return knots
+            start_index: np.ndarray = np.flatnonzero(check)
+            interval_start: np.ndarray = knots.t[start_index]
+            interval: np.ndarray = knots.t[start_index + 1] - interval_start
+            # the error of the cubic is not the largest in the middle of the interval, so quarters are checked too,
+            # all three points of every interval are propagated by one call: middles first, then quarters
+            check_t: np.ndarray = np.concatenate([interval_start + interval * share for share in CHECK_POINTS])
+            actual_all: SatellitePath = self._propagate(check_t)
+            # azimuth is unwrapped relative to the interval start
+            start_azimuth: np.ndarray = np.tile(knots.azimuth[start_index], len(CHECK_POINTS))
+            actual_all.azimuth[:] = start_azimuth + (actual_all.azimuth - start_azimuth + 180) % 360 - 180
+            estimated: np.ndarray = self._interpolate(knots, check_t)
+            error: np.ndarray = np.maximum(np.abs(actual_all.altitude - estimated[1]),
+                                           np.abs(actual_all.azimuth - estimated[2]) *
+                                           np.cos(np.radians(actual_all.altitude)))
+            bad_point: np.ndarray = (error > self.tolerance_deg * REFINE_MARGIN) | \
+                (np.abs(actual_all.dist - estimated[3]) > self.tolerance_km * REFINE_MARGIN)
+            bad: np.ndarray = bad_point.reshape(len(CHECK_POINTS), -1).any(axis=0)
+            actual: SatellitePath = actual_all[:len(start_index)]
+            verified[start_index[~bad]] = True
+            if not bad.any():
+                return knots
+            split: np.ndarray = np.zeros(len(verified), dtype=bool)
+            split[start_index[bad]] = True
+            # middle points of bad intervals become knots, both halves of the split interval are checked again
+            knots = SatellitePath(np.insert(knots.data, start_index[bad] + 1, actual.data[:, bad], axis=1))
+            verified = np.repeat(verified & ~split, np.where(split, 2, 1))
+
+    @property
+    def knot_count(self) -> int:
+        return len(self.knots)
+
+    def at(self, t_points: float | np.ndarray) -> SatellitePath:
+        """Interpolated position at POSIX time(s). Azimuth is wrapped to [0, 360) as skyfield returns it.
+        Example: where the satellite will be in 0.5 sec: trajectory.at(time.time() + 0.5)
+        """
+        t_points = np.atleast_1d(np.asarray(t_points, dtype=float))
+        data: np.ndarray = self._interpolate(self.knots, t_points)
+        data[2] %= 360
+        return SatellitePath(data)
+
+    def sample(self, sampling_rate: float = 3.3333) -> SatellitePath:
+        """Equidistant path as angle_points_for_linspace_time() returns, but without new SGP4 calls."""
+        return self.at(np.linspace(self.t_1, self.t_2, max(int((self.t_2 - self.t_1) * sampling_rate), 2)))
+
+    def max_error(self, step: float = 0.1) -> dict[str, float]:
+        """Compare interpolation with direct SGP4 on the dense grid. Azimuth error is a difference of angles,
+        horizontal azimuth error is it multiplied by cos(altitude) as tolerance_deg bounds it, pointing error is
+        angular distance between interpolated and actual directions."""
+        t_points: np.ndarray = np.arange(self.t_1, self.t_2, step)
+        actual: SatellitePath = propagate_path(self.satellite, self.observer, t_points)
+        estimated: SatellitePath = self.at(t_points)
+        az_error: np.ndarray = np.abs((estimated.azimuth - actual.azimuth + 180) % 360 - 180)
+        alt_1, alt_2 = np.radians(actual.altitude), np.radians(estimated.altitude)
+        cos_distance: np.ndarray = np.sin(alt_1) * np.sin(alt_2) + \
+            np.cos(alt_1) * np.cos(alt_2) * np.cos(np.radians(az_error))
+        return {'altitude_deg': float(np.abs(estimated.altitude - actual.altitude).max()),
+                'azimuth_deg': float(az_error.max()),
+                'horizontal_azimuth_deg': float((az_error * np.cos(alt_1)).max()),
+                'pointing_deg': float(np.degrees(np.arccos(np.clip(cos_distance, -1, 1))).max()),
+                'distance_km': float(np.abs(estimated.dist - actual.dist).max()),
+                'dist_rate_km_s': float(np.abs(estimated.dist_rate - actual.dist_rate).max())}
+
+
+if __name__ == '__main__':
+    # knots and interpolation error of every pass of the satellite, tolerances are verified by tests/test_trajectory.py
+    # python -m ground_station.propagator.trajectory [satellite name] [days]
+    import sys
+    from datetime import date, timedelta
+    from ground_station.propagator.propagate import get_sessions_for_sat
+
+    sat_name: str = sys.argv[1] if len(sys.argv) > 1 else get_context().catalog.records()[0].name
+    days: int = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    sessions: list[dict] = get_sessions_for_sat(sat_name, get_context().observers, date.today(),
+                                                date.today() + timedelta(days=days), use_cache=False)
+    for session in sessions:
+        trajectory: Trajectory = Trajectory.for_session(sat_name, session['station'],
+                                                        datetime.fromisoformat(session['start_time']),
+                                                        datetime.fromisoformat(session['finish_time']))
+        print(f"{session['start_time']} duration: {session['duration_sec']} sec, knots: {trajectory.knot_count}, "
+              f"max altitude: {trajectory.knots.altitude.max():.1f}, error: {trajectory.max_error()}")
+    if not sessions:
+        print(f'{sat_name} has no passes in {days} day(s)')
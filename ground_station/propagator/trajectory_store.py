@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from typing import Iterable
+import numpy as np
+from skyfield.sgp4lib import EarthSatellite
+from ground_station.models.db import SessionModel
+from ground_station.propagator.context import PROPAGATOR_DIR, get_context
+from ground_station.propagator.propagate import (SatellitePath, get_sat_from_local_tle_file,
+                                                 request_celestrak_sat_tle, tle_epoch)
+from ground_station.propagator.tle_history import tle_epoch_posix
+from ground_station.propagator.trajectory import propagate_path
+
+
+TRAJECTORY_DIR: str = os.path.join(PROPAGATOR_DIR, 'trajectories')
+PATH_SUFFIX: str = '.satp'
+
+
+def session_key(session: SessionModel) -> str:
+    """Parts of the same request share time_range_id, so the start time is a part of the key."""
+    return f'{session.time_range_id}_{int(session.start.timestamp())}'
+
+
+def save_path(path: SatellitePath, file_path: str) -> None:
+    """Write SatellitePath.to_bytes() blob atomically, readers never see a partial file."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path: str = f'{file_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as path_file:
+        path_file.write(path.to_bytes())
+    os.replace(tmp_path, file_path)
+
+
+def current_satellite(sat_name: str, local_tle: bool = True) -> EarthSatellite | None:
+    """Satellite with the TLE which a session propagated now would use."""
+    return get_sat_from_local_tle_file(sat_name.upper()) if local_tle else request_celestrak_sat_tle(sat_name.upper())
+
+
+def map_path(file_path: str) -> SatellitePath:
+    """Memory-mapped read-only path from the file written by save_path(), pages are loaded on access."""
+    with open(file_path, 'rb') as path_file:
+        magic, fields, points = SatellitePath.HEADER.unpack(path_file.read(SatellitePath.HEADER.size))
+    if magic != b'SATP' or fields != len(SatellitePath.FIELDS):
+        raise ValueError(f'Incorrect satellite path file {file_path}')
+    if points == 0:
+        return SatellitePath(np.zeros((fields, 0)))
+    return SatellitePath(np.memmap(file_path, dtype='<f8', mode='r', offset=SatellitePath.HEADER.size,
+                                   shape=(fields, points)))
+
+
+class TrajectoryStore:
+    """Paths of accepted sessions computed ahead of time, so tracking starts without TLE download and propagation.
+    Files are `directory`/<session key>/<TLE epoch>.satp, only the path of the latest TLE is kept for a session.
+    A stored path of an older TLE epoch than the current one is recomputed when it is loaded.
+    """
+    def __init__(self, directory: str = TRAJECTORY_DIR, sampling_rate: float = 3.3333) -> None:
+        self.directory: str = directory
+        self.sampling_rate: float = sampling_rate
+        self._lock: threading.Lock = threading.Lock()
+
+    def _path(self, key: str, epoch: str) -> str:
+        return os.path.join(self.directory, key, f'{epoch}{PATH_SUFFIX}')
+
+    def epoch(self, key: str) -> str | None:
+        """TLE epoch of the stored path or None."""
+        try:
+            epochs: list[str] = [name[:-len(PATH_SUFFIX)] for name in os.listdir(os.path.join(self.directory, key))
+                                 if name.endswith(PATH_SUFFIX)]
+        except OSError:
+            return None
+        return max(epochs, key=tle_epoch_posix) if epochs else None
+
+    def get(self, key: str) -> SatellitePath | None:
+        epoch: str | None = self.epoch(key)
+        if epoch is None:
+            return None
+        try:
+            return map_path(self._path(key, epoch))
+        except (OSError, ValueError) as err:
+            print(f'Can not load trajectory {key}: {err}')
+            return None
+
+    def put(self, key: str, epoch: str, path: SatellitePath) -> None:
+        """Save the path and remove paths of older TLE of the session."""
+        with self._lock:
+            save_path(path, self._path(key, epoch))
+            for name in os.listdir(os.path.join(self.directory, key)):
+                if name != f'{epoch}{PATH_SUFFIX}':
+                    os.remove(os.path.join(self.directory, key, name))
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+    def prune(self, before: float | None = None) -> int:
+        """Remove paths finished before POSIX time `before` (now by default). Returns the number of removed paths."""
+        before = time.time() if before is None else before
+        removed: int = 0
+        with self._lock:
+            for key in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+                path: SatellitePath | None = self.get(key)
+                if path is None or len(path) == 0 or path.t[-1] < before:
+                    shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+                    removed += 1
+        return removed
+
+    def precompute(self, session: SessionModel, local_tle: bool = True, force: bool = False) -> SatellitePath:
+        """Path of the session window with the current TLE. It is propagated only when there is no stored path
+        or it was computed with another TLE epoch."""
+        satellite: EarthSatellite | None = current_satellite(session.sat_name, local_tle)
+        if satellite is None:
+            raise RuntimeError('Get incorrect sattelite')
+        key: str = session_key(session)
+        epoch: str = tle_epoch(satellite)
+        if not force and self.epoch(key) == epoch:
+            path: SatellitePath | None = self.get(key)
+            if path is not None:
+                return path
+        t_1: float = session.start.timestamp()
+        t_2: float = session.finish.timestamp()
+        # the same time points as angle_points_for_linspace_time() produces
+        t_points: np.ndarray = np.linspace(t_1, t_2, int((session.finish - session.start).seconds * self.sampling_rate))
+        path = propagate_path(satellite, get_context().observers[session.station], t_points)
+        self.put(key, epoch, path)
+        return path
+
+    def refresh(self, sessions: Iterable[SessionModel], local_tle: bool = True) -> int:
+        """Precompute paths of all sessions, recompute those with outdated TLE. Returns the number of sessions
+        which failed, they are propagated at session start as before."""
+        failed: int = 0
+        for session in sessions:
+            try:
+                self.precompute(session, local_tle)
+            except Exception as err:  # pylint: disable=broad-except
+                print(f'Can not precompute trajectory of {session.sat_name} at {session.start}: {err}')
+                failed += 1
+        return failed
+
+    def load_for_session(self, session: SessionModel, local_tle: bool = True) -> SatellitePath | None:
+        """Stored path when it covers the session window. The path is recomputed when the current TLE of the
+        satellite is newer than the stored one, e.g. the TLE was updated after the last refresh()."""
+        key: str = session_key(session)
+        stored_epoch: str | None = self.epoch(key)
+        if stored_epoch is None:
+            return None
+        satellite: EarthSatellite | None = current_satellite(session.sat_name, local_tle)
+        if satellite is not None and tle_epoch_posix(tle_epoch(satellite)) > tle_epoch_posix(stored_epoch):
+            print(f'Trajectory {key} of TLE epoch {stored_epoch} is outdated, recompute it')
+            try:
+                return self.precompute(session, local_tle, force=True)
+            except Exception as err:  # pylint: disable=broad-except
+                print(f'Can not recompute trajectory {key}: {err}')
+                return None
+        path: SatellitePath | None = self.get(key)
+        if path is None or len(path) == 0:
+            return None
+        if path.t[0] > session.start.timestamp() + 1 or path.t[-1] < session.finish.timestamp() - 1:
+            return None
+        return path
+
+
+_store: TrajectoryStore | None = None
+_store_lock: threading.Lock = threading.Lock()
+
+
+def get_trajectory_store() -> TrajectoryStore:
+    global _store  # pylint: disable=global-statement
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TrajectoryStore()
+    return _store
+
+
+if __name__ == '__main__':
+    # latency of the path at session start: stored memory-mapped path vs propagation
+    # python -m ground_station.propagator.trajectory_store [satellite name] [window minutes]
+    import contextlib
+    import io
+    import sys
+    import tempfile
+    from datetime import datetime, timedelta, timezone
+    from uuid import uuid4
+    from ground_station.propagator.propagate import angle_points_for_linspace_time
+
+    sat_name: str = sys.argv[1] if len(sys.argv) > 1 else 'NORBI'
+    minutes: float = float(sys.argv[2]) if len(sys.argv) > 2 else 15
+    now: datetime = datetime.now(timezone.utc).replace(microsecond=0)
+    finish: datetime = now + timedelta(minutes=minutes)
+    demo_session: SessionModel = SessionModel(
+        user_id=uuid4(), username='user', script_id=None, sat_name=sat_name, station='NSU', status='WAITING',
+        registration_time=now, result='', traceback='', time_range_id=uuid4(), priority=1, start=now,
+        duration_sec=int(minutes * 60), finish=finish, parts=1, initial_start=now,
+        initial_duration_sec=int(minutes * 60))
+    with tempfile.TemporaryDirectory() as store_dir, contextlib.redirect_stdout(io.StringIO()):
+        store: TrajectoryStore = TrajectoryStore(store_dir)
+        start_time: float = time.perf_counter()
+        store.precompute(demo_session)
+        precompute_time: float = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        stored: SatellitePath | None = store.load_for_session(demo_session)
+        assert stored is not None
+        first_point: tuple[float, float, float] = stored[0]
+        stored_time: float = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        direct: SatellitePath = angle_points_for_linspace_time(sat_name, 'NSU', now, finish)
+        direct_time: float = time.perf_counter() - start_time
+        max_difference: float = float(np.abs(np.asarray(stored.data) - direct.data).max()) \
+            if len(stored) == len(direct) else float('nan')
+    print(f'{len(stored)} points, first point {first_point}')
+    print(f'precompute: {precompute_time * 1000:8.2f} ms')
+    print(f'stored:     {stored_time * 1000:8.2f} ms')
+    print(f'propagate:  {direct_time * 1000:8.2f} ms')
+    print(f'max difference with angle_points_for_linspace_time(): {max_difference:.2e}')
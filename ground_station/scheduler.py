@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Hashable, Iterable, NamedTuple
+from ground_station.models.db import SessionModel
+
+
+class Booking(NamedTuple):
+    """Time of one station reserved for a session request. `start` and `finish` are POSIX times.
+    The greater `priority` wins. A request split around more important sessions is booked as several parts with
+    the same `key` and part numbers 0..parts-1.
+    """
+    key: Hashable  # time_range_id of the session request
+    station: str
+    start: float
+    finish: float
+    priority: int = 0
+    part: int = 0
+    parts: int = 1
+
+    @property
+    def duration_sec(self) -> float:
+        return self.finish - self.start
+
+    @classmethod
+    def from_session(cls, session: SessionModel) -> Booking:
+        """Request of the whole initial time range of the session, not of its current part."""
+        start: float = session.initial_start.timestamp()
+        return cls(session.time_range_id, session.station, start, start + session.initial_duration_sec,
+                   session.priority)
+
+
+class BookingResult(NamedTuple):
+    booked: list[Booking]  # empty when the request is rejected
+    preempted: list[Booking]  # parts of less important requests removed from the schedule
+
+    @property
+    def accepted(self) -> bool:
+        return bool(self.booked)
+
+
+class IntervalIndex:
+    """Non-overlapping intervals of one station sorted by start. As they do not overlap, finishes are sorted too,
+    so intervals intersecting a time range are found by two binary searches."""
+    def __init__(self) -> None:
+        self.starts: list[float] = []
+        self.finishes: list[float] = []
+        self.bookings: list[Booking] = []
+
+    def overlapping(self, start: float, finish: float) -> list[Booking]:
+        """Bookings intersecting [start, finish) in time order, O(log n + k)."""
+        return self.bookings[bisect_right(self.finishes, start):bisect_left(self.starts, finish)]
+
+    def insert(self, booking: Booking) -> None:
+        index: int = bisect_left(self.starts, booking.start)
+        self.starts.insert(index, booking.start)
+        self.finishes.insert(index, booking.finish)
+        self.bookings.insert(index, booking)
+
+    def remove(self, booking: Booking) -> None:
+        index: int = bisect_left(self.starts, booking.start)
+        while self.bookings[index] != booking:
+            index += 1
+        del self.starts[index], self.finishes[index], self.bookings[index]
+
+    def __len__(self) -> int:
+        return len(self.bookings)
+
+
+class SessionScheduler:
+    """Timetable of ground stations which resolves overlapped session requests by priority.
+
+    A request is booked in the free time of the station. Time of less important bookings is taken from them: such
+    requests are removed completely and returned to the caller as preempted. Time of more or equally important
+    bookings is cut out of the request, the rest is booked as parts when it is allowed, so the first come request
+    wins among equal priorities. All methods are thread safe.
+
+    Example:
+        scheduler = SessionScheduler(gap_sec=30)
+        result = scheduler.book(Booking.from_session(session))
+        for part in scheduler.parts(session.time_range_id):
+            ...
+    """
+    def __init__(self, gap_sec: float = 0.0, min_part_sec: float = 60.0) -> None:
+        """
+        Args:
+            gap_sec (float, optional): free time between sessions of the station, e.g. for rotator return.
+            Defaults to 0.0.
+            min_part_sec (float, optional): shorter parts of split requests are dropped. Defaults to 60.0.
+        """
+        self.gap_sec: float = gap_sec
+        self.min_part_sec: float = min_part_sec
+        self._stations: dict[str, IntervalIndex] = {}
+        self._parts: dict[Hashable, list[Booking]] = {}
+        self._lock: threading.RLock = threading.RLock()
+
+    def conflicts(self, station: str, start: float, finish: float) -> list[Booking]:
+        """Bookings of the station closer than `gap_sec` to [start, finish)."""
+        with self._lock:
+            index: IntervalIndex | None = self._stations.get(station)
+            if index is None:
+                return []
+            return index.overlapping(start - self.gap_sec, finish + self.gap_sec)
+
+    def is_free(self, station: str, start: float, finish: float) -> bool:
+        return not self.conflicts(station, start, finish)
+
+    def parts(self, key: Hashable) -> list[Booking]:
+        with self._lock:
+            return list(self._parts.get(key, []))
+
+    def bookings(self, station: str | None = None) -> list[Booking]:
+        """All bookings of the station or of all stations in time order."""
+        with self._lock:
+            if station is not None:
+                return list(self._stations[station].bookings) if station in self._stations else []
+            return sorted((booking for index in self._stations.values() for booking in index.bookings),
+                          key=lambda booking: booking.start)
+
+    def free_ranges(self, request: Booking, blocking: list[Booking]) -> list[tuple[float, float]]:
+        """Parts of the request window outside of `blocking` bookings (sorted by start) and gaps around them."""
+        ranges: list[tuple[float, float]] = []
+        cursor: float = request.start
+        for booking in blocking:
+            if booking.start - self.gap_sec > cursor:
+                ranges.append((cursor, min(booking.start - self.gap_sec, request.finish)))
+            cursor = max(cursor, booking.finish + self.gap_sec)
+        if cursor < request.finish:
+            ranges.append((cursor, request.finish))
+        return ranges
+
+    def book(self, request: Booking, allow_split: bool = True) -> BookingResult:
+        """Book the request window, see class description.
+
+        Args:
+            request (Booking): request window, `part` and `parts` are ignored.
+            allow_split (bool, optional): book free time around more important sessions as parts. Without it
+            the request is rejected when any more important session intersects it. Defaults to True.
+
+        Raises:
+            ValueError: when the request is already booked or its window is empty.
+
+        Returns:
+            BookingResult: booked parts and preempted bookings.
+        """
+        with self._lock:
+            if request.key in self._parts:
+                raise ValueError(f'Request {request.key} is already booked, cancel it first')
+            if request.finish <= request.start:
+                raise ValueError(f'Empty request window {request.start} - {request.finish}')
+            conflicts: list[Booking] = self.conflicts(request.station, request.start, request.finish)
+            blocking: list[Booking] = [booking for booking in conflicts if booking.priority >= request.priority]
+            if blocking and not allow_split:
+                return BookingResult([], [])
+            min_duration: float = min(self.min_part_sec, request.duration_sec)
+            ranges: list[tuple[float, float]] = [(start, finish)
+                                                 for start, finish in self.free_ranges(request, blocking)
+                                                 if finish - start >= min_duration]
+            if not ranges:
+                return BookingResult([], [])
+
+            preempted: list[Booking] = []
+            for booking in conflicts:
+                if booking.priority < request.priority and booking.key in self._parts and \
+                        any(booking.start < finish + self.gap_sec and booking.finish > start - self.gap_sec
+                            for start, finish in ranges):
+                    preempted.extend(self.cancel(booking.key))
+            index: IntervalIndex = self._stations.setdefault(request.station, IntervalIndex())
+            booked: list[Booking] = [request._replace(start=start, finish=finish, part=part, parts=len(ranges))
+                                     for part, (start, finish) in enumerate(ranges)]
+            for booking in booked:
+                index.insert(booking)
+            self._parts[request.key] = booked
+            return BookingResult(list(booked), preempted)
+
+    def cancel(self, key: Hashable) -> list[Booking]:
+        """Remove all parts of the request. Returns removed parts, empty list for unknown key."""
+        with self._lock:
+            parts: list[Booking] = self._parts.pop(key, [])
+            for booking in parts:
+                self._stations[booking.station].remove(booking)
+            return parts
+
+    def restore(self, parts: list[Booking]) -> None:
+        """Put back already booked parts of one request as they are, e.g. loaded from shared storage.
+        Conflicts are not checked, the parts are supposed to come from a consistent timetable."""
+        with self._lock:
+            index: IntervalIndex = self._stations.setdefault(parts[0].station, IntervalIndex())
+            for booking in parts:
+                index.insert(booking)
+            self._parts[parts[0].key] = list(parts)
+
+    def replan(self, requests: Iterable[Booking], allow_split: bool = True) -> list[Booking]:
+        """Build the timetable from scratch, e.g. when TLE are updated and pass windows are moved.
+        Requests are booked from the most important one, among equal priorities in time order, so nothing is
+        preempted and every request is processed once.
+
+        Returns:
+            list[Booking]: rejected requests.
+        """
+        with self._lock:
+            self._stations.clear()
+            self._parts.clear()
+            rejected: list[Booking] = []
+            for request in sorted(requests, key=lambda request: (-request.priority, request.start)):
+                if not self.book(request, allow_split).accepted:
+                    rejected.append(request)
+            return rejected
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(index) for index in self._stations.values())
+
+
+class RedisSessionScheduler:
+    """SessionScheduler over the timetable kept in Redis, so every worker process, a restarted worker and workers on
+    other hosts see the same bookings. Parts of every request are stored as a JSON list in the `prefix` hash under
+    str(time_range_id). A change holds the '<prefix>:lock' Redis lock, loads the timetable into SessionScheduler,
+    applies the change there and writes back only the changed requests. Requests which finished more than `keep_sec`
+    ago are dropped on the way. Keys of returned bookings are strings.
+
+    Example:
+        scheduler = RedisSessionScheduler('redis://localhost:6379/0', gap_sec=30)
+        result = scheduler.book(Booking.from_session(session))
+        if scheduler.booked_part(session.time_range_id, session.start.timestamp(), session.finish.timestamp()):
+            ...
+    """
+    def __init__(self, url: str = 'redis://localhost:6379/0', prefix: str = 'ground_station:bookings',
+                 gap_sec: float = 0.0, min_part_sec: float = 60.0, keep_sec: float = 86400.0,
+                 lock_timeout: float = 10.0, client: Any = None) -> None:
+        if client is None:
+            import redis  # pylint: disable=import-outside-toplevel
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix: str = prefix
+        self.gap_sec: float = gap_sec
+        self.min_part_sec: float = min_part_sec
+        self.keep_sec: float = keep_sec
+        self.lock_timeout: float = lock_timeout
+
+    def _lock(self) -> Any:
+        """Redis lock of the timetable, it expires by itself when the holder dies."""
+        return self.client.lock(f'{self.prefix}:lock', timeout=self.lock_timeout, blocking_timeout=self.lock_timeout)
+
+    @staticmethod
+    def _decode(value: bytes | str) -> list[Booking]:
+        return [Booking(**fields) for fields in json.loads(value)]
+
+    def _load(self) -> tuple[SessionScheduler, list[str]]:
+        """The whole timetable and keys of requests which finished more than `keep_sec` ago."""
+        scheduler: SessionScheduler = SessionScheduler(self.gap_sec, self.min_part_sec)
+        expired: list[str] = []
+        deadline: float = time.time() - self.keep_sec
+        for key, value in self.client.hgetall(self.prefix).items():
+            parts: list[Booking] = self._decode(value)
+            if not parts or max(booking.finish for booking in parts) < deadline:
+                expired.append(key.decode() if isinstance(key, bytes) else key)
+            else:
+                scheduler.restore(parts)
+        return scheduler, expired
+
+    def _save(self, changed: dict[str, list[Booking]], removed: Iterable[str]) -> None:
+        pipeline = self.client.pipeline()
+        removed_keys: list[str] = list(removed)
+        if removed_keys:
+            pipeline.hdel(self.prefix, *removed_keys)
+        if changed:
+            pipeline.hset(self.prefix, mapping={key: json.dumps([booking._asdict() for booking in parts])
+                                                for key, parts in changed.items()})
+        pipeline.execute()
+
+    def book(self, request: Booking, allow_split: bool = True) -> BookingResult:
+        """SessionScheduler.book() over the shared timetable."""
+        request = request._replace(key=str(request.key))
+        with self._lock():
+            scheduler, expired = self._load()
+            result: BookingResult = scheduler.book(request, allow_split)
+            self._save({request.key: result.booked} if result.accepted else {},
+                       expired + [booking.key for booking in result.preempted])
+        return result
+
+    def cancel(self, key: Hashable) -> list[Booking]:
+        """Remove all parts of the request. Returns removed parts, empty list for unknown key."""
+        with self._lock():
+            parts: list[Booking] = self.parts(key)
+            self.client.hdel(self.prefix, str(key))
+        return parts
+
+    def replan(self, requests: Iterable[Booking], allow_split: bool = True) -> list[Booking]:
+        """SessionScheduler.replan() which replaces the shared timetable. Returns rejected requests."""
+        requests = [request._replace(key=str(request.key)) for request in requests]
+        with self._lock():
+            scheduler: SessionScheduler = SessionScheduler(self.gap_sec, self.min_part_sec)
+            rejected: list[Booking] = scheduler.replan(requests, allow_split)
+            self.client.delete(self.prefix)
+            booked: dict[str, list[Booking]] = {request.key: scheduler.parts(request.key) for request in requests}
+            self._save({key: parts for key, parts in booked.items() if parts}, [])
+        return rejected
+
+    def parts(self, key: Hashable) -> list[Booking]:
+        value: bytes | None = self.client.hget(self.prefix, str(key))
+        return self._decode(value) if value is not None else []
+
+    def bookings(self, station: str | None = None) -> list[Booking]:
+        """All bookings of the station or of all stations in time order."""
+        return self._load()[0].bookings(station)
+
+    def booked_part(self, key: Hashable, start: float, finish: float, tolerance_sec: float = 1.0) -> Booking | None:
+        """Part of the request which covers [start, finish), None when the session is not booked. The tolerance
+        accepts the whole seconds of session parts."""
+        for booking in self.parts(key):
+            if booking.start - tolerance_sec <= start and finish <= booking.finish + tolerance_sec:
+                return booking
+        return None
+
+
+def session_parts(session: SessionModel, parts: list[Booking]) -> list[SessionModel]:
+    """Copies of the session for every booked part. The initial time range of the request is kept."""
+    sessions: list[SessionModel] = []
+    for booking in parts:
+        start: datetime = datetime.fromtimestamp(booking.start, timezone.utc)
+        duration_sec: int = int(booking.duration_sec)
+        sessions.append(session.copy(update={'start': start, 'finish': start + timedelta(seconds=duration_sec),
+                                             'duration_sec': duration_sec, 'parts': booking.parts}))
+    return sessions
+
+
+_scheduler: RedisSessionScheduler | None = None
+_scheduler_lock: threading.Lock = threading.Lock()
+
+
+def get_session_scheduler(url: str = 'redis://localhost:6379/0') -> RedisSessionScheduler:
+    """Timetable of the stations shared through Redis at `url` by all processes. The first call sets the url."""
+    global _scheduler  # pylint: disable=global-statement
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RedisSessionScheduler(url)
+    return _scheduler
+
+
+if __name__ == '__main__':
+    # python -m ground_station.scheduler
+    from uuid import uuid4
+
+    now: datetime = datetime.now(timezone.utc).replace(microsecond=0)
+    demo_session: SessionModel = SessionModel(
+        user_id=uuid4(), username='user', script_id=None, sat_name='NORBI', station='NSU', status='WAITING',
+        registration_time=now, result='', traceback='', time_range_id=uuid4(), priority=1, start=now,
+        duration_sec=600, finish=now + timedelta(seconds=600), parts=1, initial_start=now, initial_duration_sec=600)
+    demo_scheduler: SessionScheduler = SessionScheduler(gap_sec=30)
+    low: Booking = Booking('low', 'NSU', now.timestamp() + 100, now.timestamp() + 400, priority=0)
+    high: Booking = Booking('high', 'NSU', now.timestamp() + 200, now.timestamp() + 300, priority=5)
+    print('high:   ', demo_scheduler.book(high))
+    print('low:    ', demo_scheduler.book(low))
+    print('session:', demo_scheduler.book(Booking.from_session(demo_session)))
+    for session_part in session_parts(demo_session, demo_scheduler.parts(demo_session.time_range_id)):
+        print(session_part.start, session_part.finish, session_part.parts, session_part.initial_start)
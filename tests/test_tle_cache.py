@@ -0,0 +1,161 @@
+"""TLECache against a local stand-in of the Celestrak GP API, nothing is downloaded.
+python -m unittest discover tests  (or python -m pytest tests)
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import parse_qs, urlparse
+from skyfield.api import load
+from skyfield.timelib import Timescale
+from ground_station.propagator.celestrak_api import CelestrakSource
+from ground_station.propagator.tle_cache import TLECache
+
+
+FIXTURE_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'benchmarks', 'fixtures',
+                                 'catalog_tle.txt')
+with open(FIXTURE_PATH, 'r', encoding='utf-8') as fixture_file:
+    FIXTURE_LINES: list[str] = fixture_file.read().splitlines()
+SAT_NAME: str = FIXTURE_LINES[0]
+OLD_TLE: str = '\n'.join(FIXTURE_LINES[0:3]) + '\n'
+# the same satellite with another element set
+NEW_TLE: str = '\n'.join([SAT_NAME, *FIXTURE_LINES[4:6]]) + '\n'
+GROUP_TLE: str = '\n'.join(FIXTURE_LINES[0:12]) + '\n'
+TIMESCALE: Timescale = load.timescale()
+
+
+class StandInGPServer:
+    """HTTP server on a free local port which answers GP queries (NAME=..., GROUP=...) with TLE text.
+    `tle` and `groups` may be changed while it runs, `fail` makes it answer 503, `delay` slows every answer down.
+    """
+    def __init__(self) -> None:
+        self.tle: dict[str, str] = {}
+        self.groups: dict[str, str] = {}
+        self.fail: bool = False
+        self.delay: float = 0.0
+        self.queries: list[dict[str, str]] = []
+        self._lock: threading.Lock = threading.Lock()
+        stand_in: StandInGPServer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                query: dict[str, str] = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                with stand_in._lock:  # pylint: disable=protected-access
+                    stand_in.queries.append(query)
+                time.sleep(stand_in.delay)
+                if stand_in.fail:
+                    self.send_error(503)
+                    return
+                text: str = stand_in.tle.get(query.get('NAME', ''), '') if 'NAME' in query \
+                    else stand_in.groups.get(query.get('GROUP', ''), '')
+                body: bytes = (text or 'No GP data found').encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server: ThreadingHTTPServer = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url: str = f'http://127.0.0.1:{self._server.server_address[1]}/NORAD/elements/gp.php'
+        self._thread: threading.Thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def requests_of(self, name: str) -> int:
+        with self._lock:
+            return sum(query.get('NAME') == name for query in self.queries)
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5.0) -> bool:
+    deadline: float = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TLECacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server: StandInGPServer = StandInGPServer()
+        self.server.tle[SAT_NAME] = OLD_TLE
+        self.cache_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.server.close()
+        self.cache_dir.cleanup()
+
+    def make_cache(self, **kwargs) -> TLECache:
+        source: CelestrakSource = CelestrakSource(self.server.url, timeout=2)
+        source.session.trust_env = False  # no proxy for the local server
+        return TLECache(source, self.cache_dir.name, timescale=TIMESCALE, **kwargs)
+
+    def test_missing_entry_is_fetched_once_and_saved_to_disk(self) -> None:
+        cache: TLECache = self.make_cache(max_epoch_age=float('inf'))
+        satellite = cache.get(SAT_NAME)
+        self.assertIsNotNone(satellite)
+        self.assertIs(cache.get(SAT_NAME), satellite)
+        self.assertEqual(self.server.requests_of(SAT_NAME), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir.name, f'{SAT_NAME}.tle')))
+        self.assertIsNone(cache.get('UNKNOWN'))
+
+    def test_stale_entry_is_served_while_it_is_refreshed(self) -> None:
+        cache: TLECache = self.make_cache(ttl=0.2, max_epoch_age=float('inf'))
+        old_satellite = cache.get(SAT_NAME)
+        self.server.tle[SAT_NAME] = NEW_TLE
+        self.server.delay = 0.5
+        time.sleep(0.3)
+        start_time: float = time.monotonic()
+        self.assertIs(cache.get(SAT_NAME), old_satellite)
+        self.assertLess(time.monotonic() - start_time, 0.25, 'stale entry must not wait for the source')
+        self.assertTrue(wait_for(lambda: cache.get(SAT_NAME) is not old_satellite))
+        self.assertEqual(cache.get(SAT_NAME).model.satnum, old_satellite.model.satnum + 1)  # type: ignore
+
+    def test_refresh_of_old_epoch_is_throttled(self) -> None:
+        # fixture epochs are years old, Celestrak may have nothing newer, so they are requested once per interval
+        cache: TLECache = self.make_cache(max_epoch_age=86400, min_refresh_interval=0.3)
+        cache.get(SAT_NAME)
+        for _ in range(20):
+            cache.get(SAT_NAME)
+        time.sleep(0.1)
+        self.assertEqual(self.server.requests_of(SAT_NAME), 1)
+        time.sleep(0.3)
+        cache.get(SAT_NAME)
+        self.assertTrue(wait_for(lambda: self.server.requests_of(SAT_NAME) == 2))
+        cache.get(SAT_NAME)
+        time.sleep(0.1)
+        self.assertEqual(self.server.requests_of(SAT_NAME), 2)
+
+    def test_unreachable_source_falls_back_to_disk(self) -> None:
+        self.make_cache().get(SAT_NAME)
+        self.server.fail = True
+        cache: TLECache = self.make_cache(max_epoch_age=float('inf'))
+        satellite = cache.get(SAT_NAME)
+        self.assertIsNotNone(satellite)
+        self.assertEqual(satellite.model.satnum, 43000)  # type: ignore
+        self.assertEqual(self.server.requests_of(SAT_NAME), 2)
+        self.assertIsNone(cache.get('UNKNOWN'))
+
+    def test_group_refresh_is_one_query(self) -> None:
+        self.server.groups['cubesat'] = GROUP_TLE
+        cache: TLECache = self.make_cache(max_epoch_age=float('inf'))
+        self.assertEqual(cache.refresh_group('cubesat'), 4)
+        self.assertEqual(cache.refresh_group('cubesat', names=[SAT_NAME]), 1)
+        for line in GROUP_TLE.splitlines()[::3]:
+            self.assertIsNotNone(cache.get(line))
+        self.assertEqual(len(self.server.queries), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
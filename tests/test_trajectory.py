@@ -0,0 +1,83 @@
+"""Trajectory interpolation against direct SGP4 of frozen fixture TLE, dates are fixed so nothing depends on today.
+python -m unittest discover tests  (or python -m pytest tests)
+"""
+from __future__ import annotations
+
+import os
+import unittest
+from datetime import datetime, timezone
+import numpy as np
+from skyfield.sgp4lib import EarthSatellite
+from skyfield.toposlib import GeographicPosition
+from ground_station.propagator.context import PropagationContext, get_context, set_context
+from ground_station.propagator.frames import posix_to_time
+from ground_station.propagator.trajectory import Trajectory
+
+
+FIXTURE_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'benchmarks', 'fixtures',
+                                 'catalog_tle.txt')
+STEP: float = 0.1
+# passes over NSU: name, AOS, LOS and max altitude in degrees
+GRAZING_PASS: tuple[str, datetime, datetime, float] = (
+    'BENCH-196', datetime(2022, 12, 20, 4, 27, 51, 618816, tzinfo=timezone.utc),
+    datetime(2022, 12, 20, 4, 34, 38, 8524, tzinfo=timezone.utc), 3.01)
+OVERHEAD_PASS: tuple[str, datetime, datetime, float] = (
+    'BENCH-128', datetime(2022, 12, 21, 0, 51, 36, 124520, tzinfo=timezone.utc),
+    datetime(2022, 12, 21, 1, 5, 1, 99031, tzinfo=timezone.utc), 89.82)
+
+
+class TrajectoryTest(unittest.TestCase):
+    context: PropagationContext
+    previous_context: PropagationContext | None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.context = PropagationContext(tle_path=FIXTURE_PATH)
+        cls.previous_context = set_context(cls.context)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        set_context(cls.previous_context)  # type: ignore
+
+    def check_pass(self, sat_name: str, start: datetime, finish: datetime, max_altitude: float) -> None:
+        satellite: EarthSatellite | None = self.context.catalog.get_by_name(sat_name)
+        self.assertIsNotNone(satellite)
+        observer: GeographicPosition = self.context.observers['NSU']
+        trajectory: Trajectory = Trajectory(satellite, observer, start.timestamp(),  # type: ignore
+                                            finish.timestamp())
+        self.assertIs(get_context(), self.context)
+        t_points: np.ndarray = np.arange(trajectory.t_1, trajectory.t_2, STEP)
+        altitude, azimuth, distance = (satellite - observer).at(  # type: ignore
+            posix_to_time(self.context.timescale, t_points)).altaz()
+        estimated = trajectory.at(t_points)
+        self.assertAlmostEqual(float(altitude.degrees.max()), max_altitude, delta=0.05)  # type: ignore
+
+        altitude_error: np.ndarray = np.abs(estimated.altitude - altitude.degrees)
+        # azimuth is singular at zenith, so its error is bounded on the horizon circle of the satellite
+        azimuth_error: np.ndarray = np.abs((estimated.azimuth - azimuth.degrees + 180) % 360 - 180) * \
+            np.cos(altitude.radians)
+        distance_error: np.ndarray = np.abs(estimated.dist - distance.km)
+        self.assertLessEqual(altitude_error.max(), trajectory.tolerance_deg)
+        self.assertLessEqual(azimuth_error.max(), trajectory.tolerance_deg)
+        self.assertLessEqual(distance_error.max(), trajectory.tolerance_km)
+        # knots are much sparser than the grid, otherwise there is nothing to interpolate
+        self.assertLess(trajectory.knot_count, len(t_points) / 20)
+
+    def test_grazing_pass_is_within_tolerance(self) -> None:
+        self.check_pass(*GRAZING_PASS)
+
+    def test_overhead_pass_is_within_tolerance(self) -> None:
+        self.check_pass(*OVERHEAD_PASS)
+
+    def test_max_error_agrees_with_direct_propagation(self) -> None:
+        sat_name, start, finish, _ = OVERHEAD_PASS
+        trajectory: Trajectory = Trajectory(self.context.catalog.get_by_name(sat_name),  # type: ignore
+                                            self.context.observers['NSU'], start.timestamp(), finish.timestamp())
+        errors: dict[str, float] = trajectory.max_error(STEP)
+        self.assertLessEqual(errors['altitude_deg'], trajectory.tolerance_deg)
+        self.assertLessEqual(errors['horizontal_azimuth_deg'], trajectory.tolerance_deg)
+        self.assertLessEqual(errors['distance_km'], trajectory.tolerance_km)
+
+
+if __name__ == '__main__':
+    unittest.main()